@@ -10,6 +10,8 @@ import logging
 from datetime import datetime
 from pathlib import Path
 from services.backup_service import BackupService
+from models import sesiune
+from services.sumare import reconstruieste_sumare
 import os
 from dotenv import load_dotenv
 
@@ -66,20 +68,36 @@ def perform_daily_backup():
     logger.info("")
 
 
+def perform_refresh_sumare():
+    """Recalculează sumarele lunare pentru rapoarte (reconciliere cu modificările din afara aplicației)"""
+    logger.info("🔄 Recalculare sumare lunare pentru rapoarte...")
+    try:
+        with sesiune() as session:
+            reconstruieste_sumare(session)
+            session.commit()
+        logger.info("✅ Sumarele lunare au fost recalculate")
+    except Exception as e:
+        logger.error(f"❌ Eroare la recalcularea sumarelor: {str(e)}", exc_info=True)
+
+
 def run_scheduler():
     """Pornește scheduler-ul pentru backup-uri automate"""
     
     # Obține ora pentru backup din variabilele de mediu (implicit 02:00)
     backup_time = os.getenv("BACKUP_TIME", "02:00")
+    # Ora pentru recalcularea sumarelor lunare (implicit 03:00)
+    sumare_time = os.getenv("SUMARE_TIME", "03:00")
     
     logger.info("🚀 Backup Scheduler pornit")
     logger.info(f"⏰ Backup-uri programate zilnic la ora: {backup_time}")
+    logger.info(f"⏰ Recalculare sumare rapoarte zilnic la ora: {sumare_time}")
     logger.info(f"📁 Director backup-uri: {Path('backups').absolute()}")
     logger.info(f"🗄️  Bază de date: {os.getenv('DB_NAME', 'copy_top_db')}")
     logger.info("")
     
     # Programează backup zilnic
     schedule.every().day.at(backup_time).do(perform_daily_backup)
+    schedule.every().day.at(sumare_time).do(perform_refresh_sumare)
     
     # Opțional: Creează un backup imediat la pornire (pentru testare)
     if os.getenv("BACKUP_ON_START", "false").lower() == "true":
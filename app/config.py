@@ -1,5 +1,6 @@
 # app/config.py
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Încarcă variabilele de mediu din fișierul .env
@@ -15,6 +16,26 @@ DB_NAME = os.getenv("DB_NAME", "copy_top_db")
 # String conexiune pentru SQLAlchemy
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# Pool de conexiuni (per proces Streamlit, partajat de toate tab-urile deschise)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # secunde de așteptare pentru o conexiune liberă
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # secunde până la redeschiderea unei conexiuni
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))  # 0 = fără limită
+
+# Numerotarea comenzilor: "secventa" (rapidă, pot apărea goluri la anulări)
+# sau "fara_goluri" (contor blocat pe durata tranzacției)
+NUMEROTARE_COMENZI = os.getenv("NUMEROTARE_COMENZI", "secventa").lower()
+
+# Generarea PDF-urilor în procese separate (services/pdf_joburi.py)
+PDF_WORKERI = int(os.getenv("PDF_WORKERI", str(os.cpu_count() or 2)))
+PDF_PRAG_PARALEL = int(os.getenv("PDF_PRAG_PARALEL", "20"))  # sub acest număr de comenzi se randează direct
+
+# Cache pe disc pentru PDF-urile comenzilor (services/cache_pdf.py)
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "copytop_pdf_cache"))
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "200"))
+
 # Alte configurări
 SECRET_KEY = os.getenv("SECRET_KEY", "cheie_secreta_pentru_aplicatie")
 DEBUG = os.getenv("DEBUG", "True").lower() == "true"
\ No newline at end of file
@@ -4,6 +4,9 @@ from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
 from models import create_tables, get_session
 from models import Beneficiar, Hartie, Stoc, Comanda
+from services.calculator import sincronizeaza_compatibilitate
+from services.numerotare import sincronizeaza_numerotare
+from services.sumare import reconstruieste_sumare
 
 def create_database():
     """Creează baza de date dacă nu există"""
@@ -36,6 +39,18 @@ def init_db():
     """Inițializează baza de date și structura tabelelor"""
     create_database()
     create_tables()
+    
+    # Populează tabela compatibilitate_coala din matricea din cod
+    session = get_session()
+    try:
+        sincronizeaza_compatibilitate(session)
+        # Secvența/contorul pentru numerele de comandă continuă de la ultima comandă
+        sincronizeaza_numerotare(session)
+        # Sumarele lunare pentru rapoarte, din comenzile existente
+        reconstruieste_sumare(session)
+        session.commit()
+    finally:
+        session.close()
 
 if __name__ == "__main__":
     init_db()
\ No newline at end of file
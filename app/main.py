@@ -1,6 +1,6 @@
 # app/main.py
 import streamlit as st
-from models import get_session
+from models import statistici_pool
 
 # Configurare pagină
 st.set_page_config(
@@ -32,3 +32,12 @@ Această aplicație ajută la gestionarea operațiunilor de tipografie:
 - Facturare
 - Rapoarte și export date
 """)
+
+# Starea pool-ului de conexiuni la baza de date (per proces)
+with st.expander("🔌 Conexiuni bază de date"):
+    pool = statistici_pool()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("În folosință", pool["in_folosinta"])
+    col2.metric("Libere în pool", pool["libere"])
+    col3.metric("Peste dimensiunea pool-ului", pool["peste_limita"])
+    col4.metric("Maxim permis", pool["maxim"])
@@ -1,12 +1,32 @@
 # app/models/__init__.py
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, DDL, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from config import (DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+                    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS)
 
 # Creare engine pentru conexiunea la baza de date
-engine = create_engine(DATABASE_URL)
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args={"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"} if DB_STATEMENT_TIMEOUT_MS else {},
+)
 Base = declarative_base()
+
+def pg_trgm_disponibil(ddl, target, bind, **kw):
+    """Extensia pg_trgm face parte din contrib și poate lipsi - atunci indexurile GIN se omit"""
+    return bind.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is not None
+
+# Indexurile GIN pentru căutările ilike folosesc operatorii din extensia pg_trgm
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(callable_=pg_trgm_disponibil),
+)
 Session = sessionmaker(bind=engine)
 
 # Funcție pentru crearea tabelelor în baza de date
@@ -17,8 +37,55 @@ def create_tables():
 def get_session():
     return Session()
 
+@contextmanager
+def sesiune():
+    """
+    Sesiune cu durata unei rulări a paginii
+
+    Conexiunea se eliberează în pool la ieșirea din bloc pe orice cale -
+    final normal, excepție, `st.stop()` sau `st.rerun()` (ultimele două
+    ridică excepții derivate din BaseException). Tranzacția necomisă se anulează.
+    """
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def statistici_pool():
+    """Starea curentă a pool-ului de conexiuni al procesului"""
+    pool = engine.pool
+    return {
+        "dimensiune": pool.size(),
+        "in_folosinta": pool.checkedout(),
+        "libere": pool.checkedin(),
+        "peste_limita": max(pool.overflow(), 0),
+        "maxim": pool.size() + DB_MAX_OVERFLOW,
+    }
+
 # Importă modelele pentru a fi disponibile din app.models
 from models.beneficiari import Beneficiar
 from models.hartie import Hartie
 from models.stoc import Stoc
-from models.comenzi import Comanda
\ No newline at end of file
+from models.comenzi import Comanda
+from models.coale import CompatibilitateCoala
+from models.numerotare import ContorNumerotare
+from models.miscari_stoc import MiscareStoc
+from models.sumare import SumarLunarBeneficiar, SumarLunarHartie
+
+# Sumarele lunare pentru rapoarte se recalculează în tranzacția care modifică
+# comenzile (importul este local - services.sumare importă la rândul lui modelele)
+@event.listens_for(Session, "after_flush")
+def _inregistreaza_modificari_sumare(session, flush_context):
+    from services.sumare import inregistreaza_modificari
+    inregistreaza_modificari(session, flush_context)
+
+@event.listens_for(Session, "before_commit")
+def _actualizeaza_sumare(session):
+    from services.sumare import actualizeaza_la_commit
+    actualizeaza_la_commit(session)
+
+@event.listens_for(Session, "after_rollback")
+def _renunta_sumare(session):
+    from services.sumare import renunta_la_rollback
+    renunta_la_rollback(session)
@@ -1,10 +1,15 @@
 # app/models/beneficiari.py
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
 from sqlalchemy.orm import relationship
-from models import Base
+from models import Base, pg_trgm_disponibil
 
 class Beneficiar(Base):
     __tablename__ = 'beneficiari'
+    __table_args__ = (
+        # Căutări ilike '%text%'
+        Index('ix_beneficiari_nume_trgm', 'nume',
+              postgresql_using='gin', postgresql_ops={'nume': 'gin_trgm_ops'}).ddl_if(callable_=pg_trgm_disponibil),
+    )
     
     id = Column(Integer, primary_key=True)
     nume = Column(String(100), nullable=False)
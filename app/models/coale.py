@@ -0,0 +1,18 @@
+# app/models/coale.py
+from sqlalchemy import Column, Integer, String, UniqueConstraint
+from models import Base
+
+class CompatibilitateCoala(Base):
+    """Oglinda în baza de date a matricei format hârtie - coală tipar (services/calculator.py)"""
+    __tablename__ = 'compatibilitate_coala'
+    __table_args__ = (
+        UniqueConstraint('format_hartie', 'coala_tipar', name='uq_compatibilitate_format_coala'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    format_hartie = Column(String(50), nullable=False)
+    coala_tipar = Column(String(50), nullable=False)
+    indice = Column(Integer, nullable=False)  # Câte coli de tipar ies dintr-o coală mare
+    
+    def __repr__(self):
+        return f"<CompatibilitateCoala(format_hartie='{self.format_hartie}', coala_tipar='{self.coala_tipar}', indice={self.indice})>"
@@ -1,12 +1,88 @@
 # app/models/comenzi.py
-from sqlalchemy import Column, Integer, String, Float, Boolean, Date, ForeignKey, Text
-from sqlalchemy.orm import relationship
+import enum
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, ForeignKey, Text, Index, Computed, text
+from sqlalchemy.ext.hybrid import hybrid_method, hybrid_property
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
-import math
-from models import Base
+from models import Base, pg_trgm_disponibil
+from services import calculator
+
+# Grupul coloanelor TEXT, încărcate doar la cerere: listele și rapoartele nu le afișează,
+# iar editarea și PDF-ul le cer explicit cu undefer_group(GRUP_TEXTE)
+GRUP_TEXTE = "texte"
+
+# Coloane generate de PostgreSQL (GENERATED ALWAYS ... STORED), din câmpurile aceluiași rând.
+# O coloană generată nu poate folosi altă coloană generată, deci total_coli repetă formula.
+# Aceleași formule ca în services/calculator.py (nr_coli_tipar, total_coli).
+EXPRESIE_NR_COLI_TIPAR = (
+    "CASE WHEN nr_pagini_pe_coala > 0 "
+    "THEN CEIL(tiraj::numeric * nr_pagini / (2 * nr_pagini_pe_coala))::integer ELSE 0 END"
+)
+EXPRESIE_TOTAL_COLI = f"({EXPRESIE_NR_COLI_TIPAR}) + COALESCE(coli_prisoase, 0)"
+
+class Finisare(enum.IntFlag):
+    """Opțiunile de finisare, ca biți ai coloanei `comenzi.finisari`"""
+    BIG = 1
+    CAPSAT = 2
+    COLTURI_ROTUNDE = 4
+    PERFOR = 8
+    SPIRALARE = 16
+    STANTARE = 32
+    LIPIRE = 64
+    CODITA_WOBBLER = 128
+    LAMINARE = 256
+    TAIERE_CUTTER = 512
+
+# Etichetele afișate pentru fiecare finisare
+ETICHETE_FINISARI = {
+    Finisare.BIG: "Big",
+    Finisare.CAPSAT: "Capsat",
+    Finisare.COLTURI_ROTUNDE: "Colturi rotunde",
+    Finisare.PERFOR: "Perfor",
+    Finisare.SPIRALARE: "Spiralare",
+    Finisare.STANTARE: "Stantare",
+    Finisare.LIPIRE: "Lipire",
+    Finisare.CODITA_WOBBLER: "Codita wobbler",
+    Finisare.LAMINARE: "Laminare",
+    Finisare.TAIERE_CUTTER: "Tăiere Cutter/Plotter",
+}
+
+
+def _finisare(bit):
+    """Atribut boolean (ex: comanda.capsat) pentru un bit din `finisari`, utilizabil și în filtre SQL"""
+    @hybrid_property
+    def atribut(self):
+        return bool((self.finisari or 0) & bit)
+
+    @atribut.setter
+    def atribut(self, valoare):
+        self.finisari = ((self.finisari or 0) | bit) if valoare else ((self.finisari or 0) & ~bit)
+
+    @atribut.expression
+    def atribut(cls):
+        return cls.finisari.op("&")(int(bit)) != 0
+
+    return atribut
+
 
 class Comanda(Base):
     __tablename__ = 'comenzi'
+    __table_args__ = (
+        Index('ix_comenzi_stare_data', 'stare', 'data'),
+        Index('ix_comenzi_facturata_beneficiar', 'facturata', 'beneficiar_id'),
+        Index('ix_comenzi_hartie_data', 'hartie_id', 'data'),
+        Index('ix_comenzi_beneficiar_data', 'beneficiar_id', 'data'),
+        Index('ix_comenzi_data', 'data'),
+        Index('ix_comenzi_nr_factura', 'nr_factura'),
+        # Căutări ilike '%text%'
+        Index('ix_comenzi_nume_lucrare_trgm', 'nume_lucrare',
+              postgresql_using='gin', postgresql_ops={'nume_lucrare': 'gin_trgm_ops'}).ddl_if(callable_=pg_trgm_disponibil),
+        # Filtre pe finisări într-un interval de date (ex: lucrările cu stantare din săptămâna curentă);
+        # parțial - doar comenzile cu cel puțin o finisare
+        Index('ix_comenzi_data_finisari', 'data', 'finisari', postgresql_where=text('finisari <> 0')),
+        Index('ix_comenzi_nr_factura_trgm', 'nr_factura',
+              postgresql_using='gin', postgresql_ops={'nr_factura': 'gin_trgm_ops'}).ddl_if(callable_=pg_trgm_disponibil),
+    )
     
     id = Column(Integer, primary_key=True)
     numar_comanda = Column(Integer, nullable=False, unique=True)
@@ -16,7 +92,7 @@ class Comanda(Base):
     nume_lucrare = Column(String(300), nullable=False)  # Renamed and made longer
     po_client = Column(String(100), nullable=True)
     tiraj = Column(Integer, nullable=False)
-    descriere_lucrare = Column(Text, nullable=True)  # Nu mai e obligatoriu
+    descriere_lucrare = deferred(Column(Text, nullable=True), group=GRUP_TEXTE)  # Nu mai e obligatoriu
     latime = Column(Float, nullable=False)  # mm
     inaltime = Column(Float, nullable=False)  # mm
     nr_pagini = Column(Integer, nullable=False, default=2)
@@ -36,38 +112,62 @@ class Comanda(Base):
     
     # Câmpuri noi pentru calculul colilor
     ex_pe_coala = Column(Integer, nullable=False)  # Exemplare pe coală
-    nr_coli_tipar = Column(Integer, nullable=True)  # Calculat: tiraj/ex_pe_coala (rotunjit în sus)
+    nr_coli_tipar = Column(Integer, Computed(EXPRESIE_NR_COLI_TIPAR, persisted=True))  # (tiraj * nr_pagini) / (2 * nr_pagini_pe_coala), rotunjit în sus
     coli_prisoase = Column(Integer, nullable=False, default=0)  # Coli prisoase
-    total_coli = Column(Integer, nullable=True)  # nr_coli_tipar + coli_prisoase
+    total_coli = Column(Integer, Computed(EXPRESIE_TOTAL_COLI, persisted=True))  # nr_coli_tipar + coli_prisoase
     nr_pagini_pe_coala = Column(Integer, nullable=False, default=2)
     
+    # Depind de alte tabele (indicele colii de tipar, gramajul hârtiei) - nu pot fi coloane generate
     coli_mari = Column(Float, nullable=True)  # Pentru compatibilitate cu codul existent
     greutate = Column(Float, nullable=True)  # g - calculat
     plastifiere = Column(String(50), nullable=True)
-    big = Column(Boolean, nullable=False, default=False)
     nr_biguri = Column(Integer, nullable=True)
     
-    # Opțiuni finisare suplimentare
-    capsat = Column(Boolean, nullable=False, default=False)
-    colturi_rotunde = Column(Boolean, nullable=False, default=False)
-    perfor = Column(Boolean, nullable=False, default=False)
-    spiralare = Column(Boolean, nullable=False, default=False)
-    stantare = Column(Boolean, nullable=False, default=False)
-    lipire = Column(Boolean, nullable=False, default=False)
-    codita_wobbler = Column(Boolean, nullable=False, default=False)
+    # Opțiunile de finisare - câte un bit din Finisare; atributele booleene de mai jos le citesc și scriu
+    finisari = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    big = _finisare(Finisare.BIG)
+    capsat = _finisare(Finisare.CAPSAT)
+    colturi_rotunde = _finisare(Finisare.COLTURI_ROTUNDE)
+    perfor = _finisare(Finisare.PERFOR)
+    spiralare = _finisare(Finisare.SPIRALARE)
+    stantare = _finisare(Finisare.STANTARE)
+    lipire = _finisare(Finisare.LIPIRE)
+    codita_wobbler = _finisare(Finisare.CODITA_WOBBLER)
+    laminare = _finisare(Finisare.LAMINARE)
+    taiere_cutter = _finisare(Finisare.TAIERE_CUTTER)
     
-    laminare = Column(Boolean, nullable=False, default=False)
     format_laminare = Column(String(50), nullable=True)
     numar_laminari = Column(Integer, nullable=True)
-    taiere_cutter = Column(Boolean, nullable=False, default=False)
-    detalii_finisare = Column(Text, nullable=True)
-    detalii_livrare = Column(Text, nullable=True)
+    detalii_finisare = deferred(Column(Text, nullable=True), group=GRUP_TEXTE)
+    detalii_livrare = deferred(Column(Text, nullable=True), group=GRUP_TEXTE)
     pret = Column(Float, nullable=True)
     facturata = Column(Boolean, nullable=False, default=False)
     nr_factura = Column(String(50), nullable=True)  # Număr factură
     data_facturare = Column(Date, nullable=True)  # Data facturării
     stare = Column(String(20), nullable=False, default="In lucru")  # Stare: "In lucru", "Finalizată", "Facturată"
     
+    # Blocare optimistă - incrementată la fiecare modificare (vezi utils/concurenta.py)
+    versiune = Column(Integer, nullable=False, default=1)
+    __mapper_args__ = {"version_id_col": versiune}
+    
+    @hybrid_method
+    def are_finisari(self, masca, toate=True):
+        """
+        Comanda are finisările din mască (toate sau cel puțin una)
+
+        Funcționează și ca filtru SQL, ex: pentru finisarea din săptămâna curentă
+        `Comanda.are_finisari(Finisare.STANTARE | Finisare.LAMINARE), Comanda.data >= luni`
+        """
+        masca = int(masca)
+        comune = (self.finisari or 0) & masca
+        return comune == masca if toate else comune != 0
+
+    @are_finisari.expression
+    def are_finisari(cls, masca, toate=True):
+        masca = int(masca)
+        comune = cls.finisari.op("&")(masca)
+        return comune == masca if toate else comune != 0
+    
     # Relații
     beneficiar = relationship("Beneficiar", back_populates="comenzi")
     hartie = relationship("Hartie", back_populates="comenzi")
@@ -85,22 +185,12 @@ class Comanda(Base):
     def __repr__(self):
         return f"<Comanda(id={self.id}, numar_comanda={self.numar_comanda}, nume_lucrare='{self.nume_lucrare}')>"
     
-    def calculeaza_nr_coli_tipar(self):
-        """Calculează numărul de coli de tipar conform noii formule"""
-        if self.nr_pagini_pe_coala and self.nr_pagini_pe_coala > 0:
-            # Formula nouă: (tiraj * nr_pagini) / (2 * nr_pagini_pe_coala)
-            return math.ceil((self.tiraj * self.nr_pagini) / (2 * self.nr_pagini_pe_coala))
-        return 0
-    
-    def calculeaza_total_coli(self):
-        """Calculează totalul colilor (coli tipar + prisoase)"""
-        nr_coli = self.calculeaza_nr_coli_tipar()
-        return nr_coli + (self.coli_prisoase or 0)
-    
     def calculeaza_greutate(self):
-        """Calculează greutatea comenzii în grame - formula corectată"""
+        """Calculează greutatea comenzii în kg - formula corectată"""
         if self.hartie and hasattr(self.hartie, 'gramaj'):
             gramaj = self.hartie.gramaj
         else:
             gramaj = 80  # Valoare implicită dacă nu există gramaj
-        return self.latime * self.inaltime * self.nr_pagini * self.indice_corectie * gramaj * self.tiraj / (2 * 10**9)
+        return float(calculator.greutate_lucrare(
+            self.latime, self.inaltime, self.nr_pagini, self.indice_corectie, gramaj, self.tiraj
+        )[0])
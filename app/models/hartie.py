@@ -1,10 +1,18 @@
 # app/models/hartie.py
-from sqlalchemy import Column, Integer, String, Float, Boolean
+from sqlalchemy import Column, Integer, String, Float, Boolean, Index, Computed
 from sqlalchemy.orm import relationship
-from models import Base
+from models import Base, pg_trgm_disponibil
+
+# Greutatea stocului în kg, generată de PostgreSQL: (dim_1 * dim_2 * gramaj * stoc) / 10^7, dimensiuni în cm
+EXPRESIE_GREUTATE = "dimensiune_1 * dimensiune_2 * gramaj * stoc / 10000000.0"
 
 class Hartie(Base):
     __tablename__ = 'hartie'
+    __table_args__ = (
+        # Căutări ilike '%text%'
+        Index('ix_hartie_sortiment_trgm', 'sortiment',
+              postgresql_using='gin', postgresql_ops={'sortiment': 'gin_trgm_ops'}).ddl_if(callable_=pg_trgm_disponibil),
+    )
     
     id = Column(Integer, primary_key=True)
     sortiment = Column(String(100), nullable=False)
@@ -13,7 +21,7 @@ class Hartie(Base):
     gramaj = Column(Float, nullable=False)  # g
     format_hartie = Column(String(50), nullable=False)
     stoc = Column(Float, nullable=False, default=0)
-    greutate = Column(Float, nullable=False)  # kg - calculat automat
+    greutate = Column(Float, Computed(EXPRESIE_GREUTATE, persisted=True))  # kg - generată din stoc
     
     # Certificare FSC materie primă (Input Product Type)
     fsc_materie_prima = Column(Boolean, nullable=False, default=False)
@@ -22,13 +30,13 @@ class Hartie(Base):
     furnizor = Column(String(200), nullable=True)  # Furnizor hârtie
     cod_certificare = Column(String(100), nullable=True)  # Cod certificare furnizor
     
+    # Blocare optimistă - incrementată și de mișcările de stoc (vezi utils/concurenta.py)
+    versiune = Column(Integer, nullable=False, default=1)
+    __mapper_args__ = {"version_id_col": versiune}
+    
     # Relații
     intrari_stoc = relationship("Stoc", back_populates="hartie")
     comenzi = relationship("Comanda", back_populates="hartie")
     
     def __repr__(self):
         return f"<Hartie(id={self.id}, sortiment='{self.sortiment}', gramaj={self.gramaj})>"
-    
-    def calculeaza_greutate(self):
-        """Calculează greutatea totală a hârtiei în stoc"""
-        return self.dimensiune_1 * self.dimensiune_2 * self.gramaj * self.stoc / 10**7
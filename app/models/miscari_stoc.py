@@ -0,0 +1,43 @@
+# app/models/miscari_stoc.py
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import date, datetime
+from models import Base
+
+# Tipurile de mișcări din registrul de stoc
+TIPURI_MISCARE = {
+    "sold_initial": "Sold inițial",
+    "intrare": "Intrare",
+    "modificare_intrare": "Modificare intrare",
+    "anulare_intrare": "Anulare intrare",
+    "consum": "Consum comandă",
+    "restituire": "Restituire comandă",
+    "corectie": "Corecție stoc",
+}
+
+class MiscareStoc(Base):
+    """Registru de stoc append-only: fiecare modificare a stocului unei hârtii, cu soldul rezultat"""
+    __tablename__ = 'miscari_stoc'
+    __table_args__ = (
+        # Stocul la o dată = soldul ultimei mișcări a hârtiei până la acea dată
+        Index('ix_miscari_stoc_hartie_data_id', 'hartie_id', 'data', 'id'),
+        Index('ix_miscari_stoc_data', 'data'),
+        Index('ix_miscari_stoc_comanda', 'comanda_id'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    hartie_id = Column(Integer, ForeignKey('hartie.id'), nullable=False)
+    data = Column(Date, nullable=False, default=date.today)  # Data înregistrării
+    tip = Column(String(30), nullable=False)  # Cheie din TIPURI_MISCARE
+    cantitate = Column(Float, nullable=False)  # Coli; pozitiv = intrare, negativ = ieșire
+    sold = Column(Float, nullable=False)  # Stocul hârtiei după această mișcare
+    comanda_id = Column(Integer, ForeignKey('comenzi.id', ondelete='SET NULL'), nullable=True)
+    stoc_id = Column(Integer, ForeignKey('stoc.id', ondelete='SET NULL'), nullable=True)
+    descriere = Column(String(200), nullable=True)
+    creat_la = Column(DateTime, nullable=False, default=datetime.now)
+    
+    # Relații
+    hartie = relationship("Hartie")
+    
+    def __repr__(self):
+        return f"<MiscareStoc(id={self.id}, hartie_id={self.hartie_id}, tip='{self.tip}', cantitate={self.cantitate}, sold={self.sold})>"
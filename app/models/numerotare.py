@@ -0,0 +1,19 @@
+# app/models/numerotare.py
+from sqlalchemy import Column, Integer, String, Sequence
+from models import Base
+
+# Numerotarea comenzilor începe de la 3033
+NUMAR_COMANDA_START = 3033
+
+# Secvența PostgreSQL pentru numerele de comandă (alocare O(1), fără blocări)
+SECVENTA_NUMAR_COMANDA = Sequence('comenzi_numar_seq', start=NUMAR_COMANDA_START, metadata=Base.metadata)
+
+class ContorNumerotare(Base):
+    """Contor cu ultimul număr alocat - pentru numerotarea fără goluri (rând blocat FOR UPDATE)"""
+    __tablename__ = 'contor_numerotare'
+    
+    nume = Column(String(50), primary_key=True)  # ex: "comenzi"
+    valoare = Column(Integer, nullable=False)  # Ultimul număr alocat
+    
+    def __repr__(self):
+        return f"<ContorNumerotare(nume='{self.nume}', valoare={self.valoare})>"
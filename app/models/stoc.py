@@ -1,11 +1,20 @@
 # app/models/stoc.py
-from sqlalchemy import Column, Integer, Float, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from models import Base
+from models import Base, pg_trgm_disponibil
 
 class Stoc(Base):
     __tablename__ = 'stoc'
+    __table_args__ = (
+        Index('ix_stoc_hartie_data', 'hartie_id', 'data'),
+        Index('ix_stoc_data_id', 'data', 'id'),
+        # Căutări ilike în selectorul de intrări (services/cautare.py)
+        Index('ix_stoc_nr_factura_trgm', 'nr_factura',
+              postgresql_using='gin', postgresql_ops={'nr_factura': 'gin_trgm_ops'}).ddl_if(callable_=pg_trgm_disponibil),
+        Index('ix_stoc_furnizor_trgm', 'furnizor',
+              postgresql_using='gin', postgresql_ops={'furnizor': 'gin_trgm_ops'}).ddl_if(callable_=pg_trgm_disponibil),
+    )
     
     id = Column(Integer, primary_key=True)
     hartie_id = Column(Integer, ForeignKey('hartie.id'), nullable=False)
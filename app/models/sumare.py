@@ -0,0 +1,38 @@
+# app/models/sumare.py
+from sqlalchemy import Column, Integer, Float, Boolean, Date, ForeignKey
+from models import Base
+
+# Sumare lunare pentru rapoarte, întreținute de services/sumare.py
+# Cheie: luna (prima zi a lunii) × dimensiune × facturată
+
+class SumarLunarBeneficiar(Base):
+    """Totalurile comenzilor pe lună și beneficiar"""
+    __tablename__ = 'sumar_lunar_beneficiar'
+
+    luna = Column(Date, primary_key=True)
+    beneficiar_id = Column(Integer, ForeignKey('beneficiari.id', ondelete='CASCADE'), primary_key=True)
+    facturata = Column(Boolean, primary_key=True)
+    nr_comenzi = Column(Integer, nullable=False, default=0)
+    tiraj = Column(Integer, nullable=False, default=0)
+    total_coli = Column(Integer, nullable=False, default=0)
+    consum = Column(Float, nullable=False, default=0.0)  # Coli mari (total_coli / indicele colii de tipar)
+    valoare = Column(Float, nullable=False, default=0.0)  # RON
+
+    def __repr__(self):
+        return f"<SumarLunarBeneficiar(luna={self.luna}, beneficiar_id={self.beneficiar_id}, facturata={self.facturata})>"
+
+class SumarLunarHartie(Base):
+    """Totalurile comenzilor pe lună și sortiment de hârtie"""
+    __tablename__ = 'sumar_lunar_hartie'
+
+    luna = Column(Date, primary_key=True)
+    hartie_id = Column(Integer, ForeignKey('hartie.id', ondelete='CASCADE'), primary_key=True)
+    facturata = Column(Boolean, primary_key=True)
+    nr_comenzi = Column(Integer, nullable=False, default=0)
+    tiraj = Column(Integer, nullable=False, default=0)
+    total_coli = Column(Integer, nullable=False, default=0)
+    consum = Column(Float, nullable=False, default=0.0)  # Coli mari
+    valoare = Column(Float, nullable=False, default=0.0)  # RON
+
+    def __repr__(self):
+        return f"<SumarLunarHartie(luna={self.luna}, hartie_id={self.hartie_id}, facturata={self.facturata})>"
@@ -2,12 +2,19 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from models import get_session
+from models import sesiune
 from models.comenzi import Comanda
 from models.beneficiari import Beneficiar
 from models.hartie import Hartie
-import tomli
-from pathlib import Path
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager, joinedload, load_only
+from sqlalchemy.orm.exc import StaleDataError
+from utils.paginare import PaginareKeyset
+from services.cache_referinte import lista_beneficiari
+from services.cautare import cauta_comenzi
+from utils.concurenta import MESAJ_CONFLICT
+from utils.navigare import afiseaza_sectiunea
+from utils.cautare import selector_cautare
 import io
 import os
 from dotenv import load_dotenv
@@ -15,37 +22,6 @@ from dotenv import load_dotenv
 # Încarcă variabilele de mediu
 load_dotenv()
 
-# Încărcare indici coală tipar pentru calcul consum hartie
-try:
-    config_path = Path(__file__).parent.parent / "data" / "coale_tipar.toml"
-    with open(config_path, "rb") as f:
-        indici_coala = tomli.load(f)["coale"]
-except:
-    # Valori implicite pentru indici coală tipar conform documentației
-    indici_coala = {
-        "330 x 480 mm": 4,
-        "SRA3 - 320 x 450 mm": 4, 
-        "345 x 330 mm": 6,
-        "330 x 700 mm": 3,
-        "230 x 480 mm": 6,
-        "SRA4 – 225 x 320 mm": 8,
-        "230 x 330 mm": 9,
-        "330 X 250 mm": 8,
-        "250 x 700 mm": 4,
-        "230 x 250 mm": 12,
-        "250 x 350 mm": 8,
-        "A4 – 210 x 297 mm": 8,
-        "210 x 450 mm": 6,
-        "225 x 640 mm": 4,
-        "300 x 640 mm": 3,
-        "300 x 320 mm": 6,
-        "A3 – 297 x 420 mm": 4,
-        "305 x 430 mm": 4,
-        "215 x 305 mm": 8,
-        "280 x 610 mm": 3,
-        "200 x 430 mm": 6
-    }
-
 st.set_page_config(page_title="Facturare Comenzi", page_icon="💵", layout="wide")
 
 # Adăugare protecție cu parolă
@@ -89,32 +65,26 @@ def check_password():
 if not check_password():
     st.stop()  # Oprește execuția dacă parola este incorectă
 
-# Inițializare sesiune
-session = get_session()
-
-st.title("Facturare Comenzi")
-
-# Tabs pentru diferite funcționalități
-tab1, tab2, tab3 = st.tabs(["📝 Facturare Comenzi", "📊 Rapoarte Facturi", "🔄 Modificare Factură"])
 
-with tab1:
+def tab_facturare_comenzi(session):
+    """Selectarea și facturarea comenzilor nefacturate"""
     st.subheader("Selectare și Facturare Comenzi")
-    
+
     # Afișează mesajele de succes/eroare din session state
     if 'facturare_success_msg' in st.session_state:
         st.success(st.session_state.facturare_success_msg)
         del st.session_state.facturare_success_msg
-    
+
     if 'facturare_error_msg' in st.session_state:
         for eroare in st.session_state.facturare_error_msg:
             st.error(eroare)
         del st.session_state.facturare_error_msg
-    
+
     # Obține doar beneficiarii care au comenzi nefacturate
     beneficiari_cu_comenzi = session.query(Beneficiar).join(Comanda).filter(
         Comanda.facturata == False
     ).distinct().order_by(Beneficiar.nume).all()
-    
+
     if not beneficiari_cu_comenzi:
         st.info("Nu există beneficiari cu comenzi nefacturate.")
         st.stop()
@@ -123,21 +93,21 @@ with tab1:
     with col1:
         beneficiar_options = ["Toți beneficiarii"] + [b.nume for b in beneficiari_cu_comenzi]
         selected_beneficiar = st.selectbox("Selectează beneficiar:", beneficiar_options)
-    
+
     with col2:
         stare_filter = st.selectbox(
             "Stare comenzi:",
             ["Finalizată", "In lucru", "Toate (Finalizată + In lucru)"],
             help="Selectează starea comenzilor de afișat"
         )
-    
+
     with col3:
         pret_filter = st.selectbox(
             "Filtrare preț:",
             ["Toate", "Cu preț setat", "Fără preț setat"],
             help="Filtrează comenzile după preț"
         )
-    
+
     # Resetează session state dacă s-a schimbat beneficiarul, filtrul de stare sau filtrul de preț
     if ('last_beneficiar' not in st.session_state or st.session_state.last_beneficiar != selected_beneficiar or
         'last_stare_filter' not in st.session_state or st.session_state.last_stare_filter != stare_filter or
@@ -151,40 +121,51 @@ with tab1:
     # Obține comenzile nefacturate conform filtrului de stare
     # Refresh explicit al sesiunii pentru a obține date actualizate
     session.expire_all()
-    
+
+    # Doar coloanele afișate și cele modificate la facturare (plus versiunea, pentru blocarea
+    # optimistă); beneficiarul vine în același SELECT
+    comenzi_query = session.query(Comanda).options(
+        load_only(
+            Comanda.numar_comanda, Comanda.data, Comanda.beneficiar_id, Comanda.nume_lucrare, Comanda.tiraj,
+            Comanda.pret, Comanda.po_client, Comanda.cod_fsc_produs, Comanda.tip_certificare_fsc_produs,
+            Comanda.stare, Comanda.facturata, Comanda.nr_factura, Comanda.data_facturare, Comanda.versiune,
+        ),
+        joinedload(Comanda.beneficiar),
+    )
+
     # Construire query bazat pe filtrul de stare
     if selected_beneficiar == "Toți beneficiarii":
         if stare_filter == "Finalizată":
-            comenzi_nefacturate = session.query(Comanda).filter(
+            comenzi_nefacturate = comenzi_query.filter(
                 Comanda.facturata == False,
                 Comanda.stare == "Finalizată"
             ).order_by(Comanda.numar_comanda.desc()).all()
         elif stare_filter == "In lucru":
-            comenzi_nefacturate = session.query(Comanda).filter(
+            comenzi_nefacturate = comenzi_query.filter(
                 Comanda.facturata == False,
                 Comanda.stare == "In lucru"
             ).order_by(Comanda.numar_comanda.desc()).all()
         else:  # Toate
-            comenzi_nefacturate = session.query(Comanda).filter(
+            comenzi_nefacturate = comenzi_query.filter(
                 Comanda.facturata == False,
                 Comanda.stare.in_(["Finalizată", "In lucru"])
             ).order_by(Comanda.numar_comanda.desc()).all()
     else:
         beneficiar_id = next((b.id for b in beneficiari_cu_comenzi if b.nume == selected_beneficiar), None)
         if stare_filter == "Finalizată":
-            comenzi_nefacturate = session.query(Comanda).filter(
+            comenzi_nefacturate = comenzi_query.filter(
                 Comanda.beneficiar_id == beneficiar_id,
                 Comanda.facturata == False,
                 Comanda.stare == "Finalizată"
             ).order_by(Comanda.numar_comanda.desc()).all()
         elif stare_filter == "In lucru":
-            comenzi_nefacturate = session.query(Comanda).filter(
+            comenzi_nefacturate = comenzi_query.filter(
                 Comanda.beneficiar_id == beneficiar_id,
                 Comanda.facturata == False,
                 Comanda.stare == "In lucru"
             ).order_by(Comanda.numar_comanda.desc()).all()
         else:  # Toate
-            comenzi_nefacturate = session.query(Comanda).filter(
+            comenzi_nefacturate = comenzi_query.filter(
                 Comanda.beneficiar_id == beneficiar_id,
                 Comanda.facturata == False,
                 Comanda.stare.in_(["Finalizată", "In lucru"])
@@ -195,12 +176,12 @@ with tab1:
         comenzi_nefacturate = [c for c in comenzi_nefacturate if c.pret and c.pret > 0]
     elif pret_filter == "Fără preț setat":
         comenzi_nefacturate = [c for c in comenzi_nefacturate if not c.pret or c.pret == 0]
-    
+
     if not comenzi_nefacturate:
         st.info("Nu există comenzi nefacturate pentru acest beneficiar și filtrele selectate.")
     else:
         st.markdown("### Comenzi disponibile pentru facturare")
-        
+
         # Creează un DataFrame pentru afișare și selecție
         comenzi_data = []
         for idx, comanda in enumerate(comenzi_nefacturate):
@@ -217,14 +198,14 @@ with tab1:
                 "Cod FSC": comanda.cod_fsc_produs or "-",
                 "Certificare FSC": comanda.tip_certificare_fsc_produs or "-"
             })
-        
+
         # Afișează comenzile cu posibilitate de selecție
         df_comenzi = pd.DataFrame(comenzi_data)
-        
+
         # Inițializare session state pentru selecțiile checkbox-urilor
         if 'selectii_comenzi' not in st.session_state:
             st.session_state.selectii_comenzi = {}
-        
+
         # Buton pentru selectare toate comenzile - PLASAT ÎNAINTE DE DATA_EDITOR
         col_select_all, col_deselecteaza, col_info = st.columns([1, 1, 2])
         with col_select_all:
@@ -234,29 +215,29 @@ with tab1:
                     comanda_id = row["ID"]
                     st.session_state.selectii_comenzi[comanda_id] = True
                 st.rerun()
-        
+
         with col_deselecteaza:
             if st.button("❌ Deselectează toate", key="deselect_all_btn"):
                 # Deselectează toate comenzile
                 st.session_state.selectii_comenzi = {}
                 st.rerun()
-        
+
         # Actualizează DataFrame-ul cu selecțiile din session state
         for idx, row in df_comenzi.iterrows():
             comanda_id = row["ID"] 
             df_comenzi.at[idx, "✓"] = st.session_state.selectii_comenzi.get(comanda_id, False)
-        
+
         # Stilizare pentru prețuri - adăugăm CSS pentru a face prețurile roșii și bold
         st.markdown("""
-            <style>
-            /* Stilizare pentru coloana Preț */
-            [data-testid="stDataFrameResizable"] [data-testid="column-Preț"] {
-                color: #dc3545 !important;
-                font-weight: bold !important;
-            }
-            </style>
-        """, unsafe_allow_html=True)
-        
+        <style>
+        /* Stilizare pentru coloana Preț */
+        [data-testid="stDataFrameResizable"] [data-testid="column-Preț"] {
+            color: #dc3545 !important;
+            font-weight: bold !important;
+        }
+        </style>
+    """, unsafe_allow_html=True)
+
         # Editare DataFrame pentru selecție
         edited_df = st.data_editor(
             df_comenzi,
@@ -293,27 +274,27 @@ with tab1:
             disabled=["Nr. Comandă", "Beneficiar", "Data Comandă", "Nume Lucrare", "Tiraj", "Cod FSC", "Certificare FSC"],
             key="comenzi_selector"
         )
-        
+
         # Actualizează session state cu selecțiile din data_editor
         for idx, row in edited_df.iterrows():
             comanda_id = row["ID"]
             st.session_state.selectii_comenzi[comanda_id] = row["✓"]
-        
+
         # Comenzi selectate
         comenzi_selectate = edited_df[edited_df["✓"] == True]
-        
+
         with col_info:
             if len(comenzi_selectate) > 0:
                 st.success(f"✅ {len(comenzi_selectate)} comenzi selectate pentru facturare")
-        
+
         if len(comenzi_selectate) > 0:
             # Calculează total
             total_factura = comenzi_selectate["Preț"].sum()
             st.metric("Total factură", f"{total_factura:.2f} RON")
-            
+
             # Butoane acțiuni
             col1, col2, col3 = st.columns(3)
-            
+
             with col1:
                 if st.button("💾 Salvează prețuri și PO", type="secondary"):
                     # Salvează prețurile și PO Client actualizate
@@ -331,14 +312,17 @@ with tab1:
                         st.session_state.comenzi_editor_data = edited_df
                         st.success("Prețurile și PO Client au fost salvate!")
                         st.rerun()
+                    except StaleDataError:
+                        session.rollback()
+                        st.error(MESAJ_CONFLICT.format("Una dintre comenzile selectate"))
                     except Exception as e:
                         session.rollback()
                         st.error(f"Eroare la salvare: {e}")
-            
+
             with col2:
                 # Export Excel pentru comenzile selectate
                 buffer = io.BytesIO()
-                
+
                 # Pregătește datele pentru export
                 export_data = []
                 for idx, row in comenzi_selectate.iterrows():
@@ -351,17 +335,17 @@ with tab1:
                         "Certificare FSC": row["Certificare FSC"],
                         "PO Client": row["PO Client"]
                     })
-                
+
                 df_export = pd.DataFrame(export_data)
-                
+
                 # Scrie în buffer
                 with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
                     df_export.to_excel(writer, sheet_name='Facturi', index=False)
-                    
+
                     # Formatare
                     workbook = writer.book
                     worksheet = writer.sheets['Facturi']
-                    
+
                     # Format pentru preț - roșu și bold
                     money_format = workbook.add_format({
                         'num_format': '#,##0.00 RON',
@@ -369,7 +353,7 @@ with tab1:
                         'font_color': 'red'
                     })
                     worksheet.set_column('D:D', 15, money_format)
-                    
+
                     # Ajustare lățime coloane
                     worksheet.set_column('A:A', 15)  # Data Comandă
                     worksheet.set_column('B:B', 40)  # Nume Lucrare
@@ -377,8 +361,8 @@ with tab1:
                     worksheet.set_column('E:E', 15)  # Cod FSC
                     worksheet.set_column('F:F', 20)  # Certificare FSC
                     worksheet.set_column('G:G', 20)  # PO Client
-                
-            
+
+
             with col3:
                 st.download_button(
                     label="📊 Export Excel",
@@ -386,17 +370,17 @@ with tab1:
                     file_name=f"factura_{selected_beneficiar}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
-            
+
             # Câmpuri pentru facturare - plasate în afara coloanelor
             st.markdown("---")
             st.markdown("### Detalii factură")
-            
+
             col_fact1, col_fact2 = st.columns(2)
             with col_fact1:
                 nr_factura_input = st.text_input("Număr factură:", key="nr_factura_input")
             with col_fact2:
                 data_facturare_input = st.date_input("Data facturare:", value=datetime.now(), key="data_facturare_input")
-            
+
             if st.button("✅ Facturează comenzile selectate", type="primary", use_container_width=True):
                     # Verifică prețurile
                     comenzi_fara_pret = comenzi_selectate[comenzi_selectate["Preț"] == 0]
@@ -409,16 +393,19 @@ with tab1:
                         try:
                             comenzi_procesate = 0
                             erori = []
-                            
+
                             # Creează un placeholder pentru mesaje
                             status_placeholder = st.empty()
                             status_placeholder.info("⏳ Se procesează facturarea...")
-                            
+
                             for idx, row in comenzi_selectate.iterrows():
                                 comanda_id = row["ID"]
                                 comanda = session.query(Comanda).get(comanda_id)
-                                
-                                if comanda:
+
+                                if comanda and comanda.facturata:
+                                    # Lista afișată este mai veche decât starea comenzii
+                                    erori.append(f"Comanda #{int(comanda.numar_comanda)} a fost deja facturată de alt utilizator (factura {comanda.nr_factura})")
+                                elif comanda:
                                     # Marchează ca facturată și salvează detaliile facturii
                                     # NOTĂ: Stocul de hârtie este deja actualizat când comanda a fost finalizată
                                     comanda.facturata = True
@@ -426,49 +413,54 @@ with tab1:
                                     comanda.data_facturare = data_facturare_input
                                     comanda.stare = "Facturată"  # Schimbă starea automat la Facturată
                                     comenzi_procesate += 1
-                            
+
                             session.commit()
-                            
+
                             # Salvează mesajul în session state pentru a-l afișa după rerun
                             if comenzi_procesate > 0:
                                 st.session_state.facturare_success_msg = f"✅ {comenzi_procesate} comenzi au fost facturate cu succes cu factura {nr_factura_input}!"
                                 # Resetează session state după facturare cu succes
                                 if 'comenzi_editor_data' in st.session_state:
                                     del st.session_state.comenzi_editor_data
-                            
+
                             if erori:
                                 st.session_state.facturare_error_msg = erori
-                            
+
                             st.rerun()
-                            
+
+                        except StaleDataError:
+                            session.rollback()
+                            st.error(MESAJ_CONFLICT.format("Una dintre comenzile selectate"))
                         except Exception as e:
                             session.rollback()
                             st.error(f"Eroare la facturare: {e}")
 
-with tab2:
+
+def tab_rapoarte_facturi(session):
+    """Rapoartele facturilor pe perioadă"""
     st.subheader("Rapoarte Facturi")
-    
+
     # Filtre pentru rapoarte
     col1, col2, col3 = st.columns(3)
-    
+
     with col1:
         perioada = st.selectbox(
             "Perioada:",
             ["Luna curentă", "Luna precedentă", "Ultimele 3 luni", "An curent", "Personalizat"]
         )
-    
+
     with col2:
         if perioada == "Personalizat":
             data_start = st.date_input("De la:", value=datetime.now().replace(day=1))
         else:
             data_start = None
-    
+
     with col3:
         if perioada == "Personalizat":
             data_sfarsit = st.date_input("Până la:", value=datetime.now())
         else:
             data_sfarsit = None
-    
+
     # Calculează perioada efectivă
     now = datetime.now()
     if perioada == "Luna curentă":
@@ -490,58 +482,58 @@ with tab2:
     else:  # Personalizat
         start_date = data_start
         end_date = data_sfarsit
-    
+
     # Filtrare beneficiar - sortați alfabetic
     beneficiar_raport = st.selectbox(
         "Beneficiar:",
-        ["Toți beneficiarii"] + [b.nume for b in session.query(Beneficiar).order_by(Beneficiar.nume).all()]
+        ["Toți beneficiarii"] + [b.nume for b in lista_beneficiari(session)]
     )
-    
+
     # Construire query cu sortare după numărul facturii
-    query = session.query(Comanda).join(Beneficiar).filter(
+    conditii_facturi = [
         Comanda.facturata == True,
         Comanda.data >= start_date,
         Comanda.data <= end_date
-    )
-    
+    ]
+
     if beneficiar_raport != "Toți beneficiarii":
         beneficiar = session.query(Beneficiar).filter(Beneficiar.nume == beneficiar_raport).first()
         if beneficiar:
-            query = query.filter(Comanda.beneficiar_id == beneficiar.id)
-    
-    # Sortare după numărul facturii (crescător) - facturile fără nr vor fi la final
-    comenzi_facturate = query.order_by(Comanda.nr_factura.asc().nulls_last()).all()
-    
+            conditii_facturi.append(Comanda.beneficiar_id == beneficiar.id)
+
+    query = session.query(Comanda).join(Beneficiar).options(
+        contains_eager(Comanda.beneficiar),
+        load_only(
+            Comanda.numar_comanda, Comanda.data, Comanda.nr_factura, Comanda.data_facturare, Comanda.nume_lucrare,
+            Comanda.tiraj, Comanda.po_client, Comanda.certificare_fsc_produs, Comanda.pret,
+        ),
+    ).filter(*conditii_facturi)
+
+    # Sortare după numărul facturii (crescător) - facturile fără nr vor fi la final.
+    # Cheia de paginare keyset: (fără factură, nr. factură, nr. comandă)
+    chei_facturi = [Comanda.nr_factura.is_(None), func.coalesce(Comanda.nr_factura, ""), Comanda.numar_comanda]
+    paginare_facturi = PaginareKeyset("paginare_facturi", chei_facturi, descrescator=False)
+    comenzi_facturate = paginare_facturi.pagina(
+        query, lambda c: (c.nr_factura is None, c.nr_factura or "", c.numar_comanda)
+    )
+
+    def rand_factura(comanda):
+        return {
+            "Data": comanda.data.strftime("%d-%m-%Y"),
+            "Nr. Comandă": comanda.numar_comanda,
+            "Nr. Factură": comanda.nr_factura or "-",
+            "Data Factură": comanda.data_facturare.strftime("%d-%m-%Y") if comanda.data_facturare else "-",
+            "Beneficiar": comanda.beneficiar.nume,
+            "Nume Lucrare": comanda.nume_lucrare,
+            "Tiraj": comanda.tiraj,
+            "PO Client": comanda.po_client or "-",
+            "FSC": "Da" if comanda.certificare_fsc_produs else "Nu",
+            "Preț": comanda.pret or 0
+        }
+
     if comenzi_facturate:
-        # Pregătește datele pentru afișare
-        raport_data = []
-        suma_totala = 0
-        suma_beneficiari = {}
-        
-        for comanda in comenzi_facturate:
-            nume_beneficiar = comanda.beneficiar.nume
-            pret = comanda.pret or 0
-            
-            raport_data.append({
-                "Data": comanda.data.strftime("%d-%m-%Y"),
-                "Nr. Comandă": comanda.numar_comanda,
-                "Nr. Factură": comanda.nr_factura or "-",
-                "Data Factură": comanda.data_facturare.strftime("%d-%m-%Y") if comanda.data_facturare else "-",
-                "Beneficiar": nume_beneficiar,
-                "Nume Lucrare": comanda.nume_lucrare,
-                "Tiraj": comanda.tiraj,
-                "PO Client": comanda.po_client or "-",
-                "FSC": "Da" if comanda.certificare_fsc_produs else "Nu",
-                "Preț": pret
-            })
-            
-            suma_totala += pret
-            if nume_beneficiar not in suma_beneficiari:
-                suma_beneficiari[nume_beneficiar] = 0
-            suma_beneficiari[nume_beneficiar] += pret
-        
-        # Afișare tabel
-        df_raport = pd.DataFrame(raport_data)
+        # Afișare tabel - doar pagina curentă
+        df_raport = pd.DataFrame([rand_factura(comanda) for comanda in comenzi_facturate])
         st.dataframe(
             df_raport,
             use_container_width=True,
@@ -552,18 +544,30 @@ with tab2:
                 )
             }
         )
-        
+        paginare_facturi.controale()
+
+        # Totalurile pe beneficiari se calculează în baza de date, pentru toată perioada
+        suma_beneficiari = dict(
+            session.query(Beneficiar.nume, func.coalesce(func.sum(Comanda.pret), 0.0))
+            .select_from(Comanda)
+            .join(Beneficiar)
+            .filter(*conditii_facturi)
+            .group_by(Beneficiar.nume)
+            .all()
+        )
+        suma_totala = sum(suma_beneficiari.values())
+
         # Metrici
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric("Total facturat", f"{suma_totala:.2f} RON")
         with col2:
-            st.metric("Număr facturi", len(comenzi_facturate))
+            st.metric("Număr facturi", paginare_facturi.total)
         with col3:
             if len(suma_beneficiari) > 0:
                 top_client = max(suma_beneficiari.items(), key=lambda x: x[1])
                 st.metric("Top client", f"{top_client[0]} ({top_client[1]:.2f} RON)")
-        
+
         # Grafic pe beneficiari
         if len(suma_beneficiari) > 1:
             st.subheader("Distribuție pe beneficiari")
@@ -572,34 +576,37 @@ with tab2:
                 columns=["Beneficiar", "Total"]
             )
             st.bar_chart(df_beneficiari.set_index("Beneficiar"))
-        
+
         # Export raport complet
         if st.button("📊 Export raport complet Excel"):
             buffer = io.BytesIO()
-            
+
             with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                # Sheet 1: Toate facturile
-                df_raport.to_excel(writer, sheet_name='Facturi', index=False)
-                
+                # Sheet 1: Toate facturile din perioadă
+                toate_facturile = query.order_by(*[c.asc() for c in chei_facturi]).all()
+                pd.DataFrame([rand_factura(comanda) for comanda in toate_facturile]).to_excel(
+                    writer, sheet_name='Facturi', index=False
+                )
+
                 # Sheet 2: Sumar pe beneficiari
                 df_sumar = pd.DataFrame(
                     list(suma_beneficiari.items()),
                     columns=["Beneficiar", "Total facturat (RON)"]
                 )
                 df_sumar.to_excel(writer, sheet_name='Sumar Beneficiari', index=False)
-                
+
                 # Formatare
                 workbook = writer.book
-                
+
                 # Format pentru Facturi sheet
                 worksheet1 = writer.sheets['Facturi']
                 money_format = workbook.add_format({'num_format': '#,##0.00 RON'})
                 worksheet1.set_column('H:H', 15, money_format)
-                
+
                 # Format pentru Sumar sheet
                 worksheet2 = writer.sheets['Sumar Beneficiari']
                 worksheet2.set_column('B:B', 20, money_format)
-            
+
             st.download_button(
                 label="Descarcă raport",
                 data=buffer.getvalue(),
@@ -609,122 +616,131 @@ with tab2:
     else:
         st.info("Nu există facturi în perioada selectată.")
 
-with tab3:
+
+def tab_modificare_factura(session):
+    """Modificarea sau anularea unei facturi"""
     st.subheader("Modificare sau Anulare Factură")
     st.info("ℹ️ Anularea unei facturi o readuce la starea 'Finalizată' (stocul rămâne consumat)")
-    
-    # Selectare comandă facturată
-    comenzi_facturate = session.query(Comanda).join(Beneficiar).filter(
-        Comanda.facturata == True
-    ).order_by(Comanda.data.desc()).limit(100).all()
-    
-    if comenzi_facturate:
-        comanda_options = [
-            f"#{c.numar_comanda} - {c.beneficiar.nume} - {c.nume_lucrare} ({c.data.strftime('%d-%m-%Y')})"
-            for c in comenzi_facturate
-        ]
-        
-        selected_comanda_str = st.selectbox("Selectează factura de modificat:", comanda_options)
-        
-        if selected_comanda_str:
-            numar_comanda = int(selected_comanda_str.split("#")[1].split(" ")[0])
-            comanda = session.query(Comanda).filter(Comanda.numar_comanda == numar_comanda).first()
-            
-            if comanda:
-                # Afișare detalii comandă
-                col1, col2, col3 = st.columns(3)
+
+    # Selectare comandă facturată - doar primele potriviri ale căutării
+    comanda_id = selector_cautare(
+        "modificare_factura", "Selectează factura de modificat:",
+        lambda text, limita: cauta_comenzi(session, text, [Comanda.facturata == True], limita),
+        placeholder="Nr. comandă, factură, lucrare sau beneficiar...",
+    )
+
+    if comanda_id is not None:
+        comanda = session.get(Comanda, comanda_id)
+
+        if comanda:
+            # Afișare detalii comandă
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.write(f"**Beneficiar:** {comanda.beneficiar.nume}")
+                st.write(f"**Data:** {comanda.data.strftime('%d-%m-%Y')}")
+            with col2:
+                st.write(f"**Lucrare:** {comanda.nume_lucrare}")
+                st.write(f"**Tiraj:** {comanda.tiraj}")
+            with col3:
+                st.write(f"**Preț actual:** {comanda.pret:.2f} RON" if comanda.pret else "**Preț actual:** Nesetat")
+                st.write(f"**PO Client:** {comanda.po_client or '-'}")
+
+            st.markdown("---")
+
+            # Opțiuni de modificare
+            actiune = st.radio(
+                "Acțiune:",
+                ["Modifică detalii factură", "Anulează factura"]
+            )
+
+            if actiune == "Modifică detalii factură":
+                st.markdown("### Modificare detalii")
+
+                col1, col2 = st.columns(2)
                 with col1:
-                    st.write(f"**Beneficiar:** {comanda.beneficiar.nume}")
-                    st.write(f"**Data:** {comanda.data.strftime('%d-%m-%Y')}")
+                    pret_nou = st.number_input(
+                        "Preț nou (RON):",
+                        min_value=0.0,
+                        value=float(comanda.pret or 0),
+                        step=10.0
+                    )
+                    nr_factura_nou = st.text_input(
+                        "Număr factură:",
+                        value=comanda.nr_factura or ""
+                    )
+
                 with col2:
-                    st.write(f"**Lucrare:** {comanda.nume_lucrare}")
-                    st.write(f"**Tiraj:** {comanda.tiraj}")
-                with col3:
-                    st.write(f"**Preț actual:** {comanda.pret:.2f} RON" if comanda.pret else "**Preț actual:** Nesetat")
-                    st.write(f"**PO Client:** {comanda.po_client or '-'}")
-                
-                st.markdown("---")
-                
-                # Opțiuni de modificare
-                actiune = st.radio(
-                    "Acțiune:",
-                    ["Modifică detalii factură", "Anulează factura"]
-                )
-                
-                if actiune == "Modifică detalii factură":
-                    st.markdown("### Modificare detalii")
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        pret_nou = st.number_input(
-                            "Preț nou (RON):",
-                            min_value=0.0,
-                            value=float(comanda.pret or 0),
-                            step=10.0
-                        )
-                        nr_factura_nou = st.text_input(
-                            "Număr factură:",
-                            value=comanda.nr_factura or ""
-                        )
-                    
-                    with col2:
-                        data_facturare_noua = st.date_input(
-                            "Data facturare:",
-                            value=comanda.data_facturare if comanda.data_facturare else datetime.now()
-                        )
-                    
-                    if st.button("💾 Salvează modificările", type="primary"):
-                        try:
-                            comanda.pret = pret_nou
-                            comanda.nr_factura = nr_factura_nou if nr_factura_nou.strip() else None
-                            comanda.data_facturare = data_facturare_noua
-                            session.commit()
-                            st.success(f"✅ Detaliile facturii au fost actualizate!")
-                            st.rerun()
-                        except Exception as e:
-                            session.rollback()
-                            st.error(f"Eroare: {e}")
-                
-                else:  # Anulează factura
-                    st.error("⚠️ Această acțiune va anula factura!")
-                    st.info("ℹ️ Comanda va reveni la starea 'Finalizată' (stocul de hârtie rămâne consumat)")
-                    
-                    # Folosim session state pentru confirmarea anulării
-                    if f"cancel_invoice_confirm_{comanda.id}" not in st.session_state:
-                        st.session_state[f"cancel_invoice_confirm_{comanda.id}"] = False
-                    
-                    if not st.session_state[f"cancel_invoice_confirm_{comanda.id}"]:
-                        if st.button("🚫 Anulează factura", type="secondary", key=f"cancel_invoice_{comanda.id}"):
-                            st.session_state[f"cancel_invoice_confirm_{comanda.id}"] = True
-                            st.rerun()
-                    else:
-                        st.warning("⚠️ Ești sigur că vrei să anulezi această factură?")
-                        col_yes, col_no = st.columns(2)
-                        with col_yes:
-                            if st.button("✅ Da, anulează", key=f"confirm_cancel_yes_{comanda.id}", type="primary"):
-                                try:
-                                    # Anulează factura și șterge detaliile facturii
-                                    # NOTĂ: Stocul NU se restituie - a fost deja scăzut la finalizare
-                                    comanda.facturata = False
-                                    comanda.pret = None
-                                    comanda.nr_factura = None
-                                    comanda.data_facturare = None
-                                    comanda.stare = "Finalizată"  # Revine la starea Finalizată când se anulează factura
-                                    
-                                    session.commit()
-                                    st.session_state[f"cancel_invoice_confirm_{comanda.id}"] = False
-                                    st.success("✅ Factura a fost anulată! Comanda este acum 'Finalizată'.")
-                                    st.rerun()
-                                    
-                                except Exception as e:
-                                    session.rollback()
-                                    st.error(f"Eroare la anulare: {e}")
-                        with col_no:
-                            if st.button("❌ Nu, renunță", key=f"confirm_cancel_no_{comanda.id}"):
+                    data_facturare_noua = st.date_input(
+                        "Data facturare:",
+                        value=comanda.data_facturare if comanda.data_facturare else datetime.now()
+                    )
+
+                if st.button("💾 Salvează modificările", type="primary"):
+                    try:
+                        comanda.pret = pret_nou
+                        comanda.nr_factura = nr_factura_nou if nr_factura_nou.strip() else None
+                        comanda.data_facturare = data_facturare_noua
+                        session.commit()
+                        st.success(f"✅ Detaliile facturii au fost actualizate!")
+                        st.rerun()
+                    except StaleDataError:
+                        session.rollback()
+                        st.error(MESAJ_CONFLICT.format(f"Comanda #{int(comanda.numar_comanda)}"))
+                    except Exception as e:
+                        session.rollback()
+                        st.error(f"Eroare: {e}")
+
+            else:  # Anulează factura
+                st.error("⚠️ Această acțiune va anula factura!")
+                st.info("ℹ️ Comanda va reveni la starea 'Finalizată' (stocul de hârtie rămâne consumat)")
+
+                # Folosim session state pentru confirmarea anulării
+                if f"cancel_invoice_confirm_{comanda.id}" not in st.session_state:
+                    st.session_state[f"cancel_invoice_confirm_{comanda.id}"] = False
+
+                if not st.session_state[f"cancel_invoice_confirm_{comanda.id}"]:
+                    if st.button("🚫 Anulează factura", type="secondary", key=f"cancel_invoice_{comanda.id}"):
+                        st.session_state[f"cancel_invoice_confirm_{comanda.id}"] = True
+                        st.rerun()
+                else:
+                    st.warning("⚠️ Ești sigur că vrei să anulezi această factură?")
+                    col_yes, col_no = st.columns(2)
+                    with col_yes:
+                        if st.button("✅ Da, anulează", key=f"confirm_cancel_yes_{comanda.id}", type="primary"):
+                            try:
+                                # Anulează factura și șterge detaliile facturii
+                                # NOTĂ: Stocul NU se restituie - a fost deja scăzut la finalizare
+                                comanda.facturata = False
+                                comanda.pret = None
+                                comanda.nr_factura = None
+                                comanda.data_facturare = None
+                                comanda.stare = "Finalizată"  # Revine la starea Finalizată când se anulează factura
+
+                                session.commit()
                                 st.session_state[f"cancel_invoice_confirm_{comanda.id}"] = False
+                                st.success("✅ Factura a fost anulată! Comanda este acum 'Finalizată'.")
                                 st.rerun()
-    else:
-        st.info("Nu există facturi de modificat.")
 
-# Închidere sesiune
-session.close()
+                            except StaleDataError:
+                                session.rollback()
+                                st.error(MESAJ_CONFLICT.format(f"Comanda #{int(comanda.numar_comanda)}"))
+                            except Exception as e:
+                                session.rollback()
+                                st.error(f"Eroare la anulare: {e}")
+                    with col_no:
+                        if st.button("❌ Nu, renunță", key=f"confirm_cancel_no_{comanda.id}"):
+                            st.session_state[f"cancel_invoice_confirm_{comanda.id}"] = False
+                            st.rerun()
+
+
+# Sesiune cu baza de date - închisă automat la orice ieșire din pagină (inclusiv st.stop/st.rerun)
+with sesiune() as session:
+
+    st.title("Facturare Comenzi")
+
+    # Doar secțiunea activă se execută (vezi utils/navigare.py)
+    afiseaza_sectiunea("sectiune_facturare", {
+        "📝 Facturare Comenzi": tab_facturare_comenzi,
+        "📊 Rapoarte Facturi": tab_rapoarte_facturi,
+        "🔄 Modificare Factură": tab_modificare_factura,
+    }, session)
@@ -2,8 +2,15 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from models import get_session
+from models import sesiune
 from models.hartie import Hartie
+from sqlalchemy.orm.exc import StaleDataError
+from services.cache_referinte import lista_hartii, invalideaza_referinte
+from services.registru_stoc import inregistreaza_miscare, corecteaza_stoc
+from services.cautare import cauta_intrari_stoc
+from utils.concurenta import retine_versiune, uita_versiune, modificat_intre_timp, raporteaza_conflict
+from utils.navigare import afiseaza_sectiunea
+from utils.cautare import selector_cautare
 from constants import CODURI_FSC_MATERIE_PRIMA, CERTIFICARI_FSC_MATERIE_PRIMA, FURNIZORI_CERTIFICARE
 import os
 from dotenv import load_dotenv
@@ -72,19 +79,15 @@ if not check_password():
 
 st.title("Gestiune Hârtie")
 
-# Inițializarea sesiunii cu baza de date
-session = get_session()
 
-# Tabs pentru diferite acțiuni
-tab1, tab2, tab3, tab4 = st.tabs(["Lista Hârtie", "Adaugă Hârtie", "Editează Hârtie", "Intrări Hârtie"])
-
-with tab1:
+def tab_lista_hartie(session):
+    """Lista sortimentelor de hârtie"""
     # Cod pentru listare hârtie
     st.subheader("Lista Sortimente de Hârtie")
-    
+
     # Opțiuni căutare
     search_query = st.text_input("Caută după sortiment:")
-    
+
     # Obținere date - sortate alfabetic după sortiment
     if search_query:
         hartii = session.query(Hartie).filter(
@@ -92,7 +95,7 @@ with tab1:
         ).order_by(Hartie.sortiment).all()
     else:
         hartii = session.query(Hartie).order_by(Hartie.sortiment).all()
-    
+
     # Construire DataFrame pentru afișare
     if hartii:
         data = []
@@ -110,11 +113,11 @@ with tab1:
                 "Cod FSC": hartie.cod_fsc_materie_prima or "-",
                 "Certificare": hartie.certificare_fsc_materie_prima or "-"
             })
-        
+
         # Afișare tabel
         df = pd.DataFrame(data)
         st.dataframe(df, use_container_width=True)
-        
+
         # Export opțiuni
         if st.button("Export Excel"):
             df.to_excel("hartie.xlsx", index=False)
@@ -122,16 +125,18 @@ with tab1:
     else:
         st.info("Nu există sortimente de hârtie în baza de date sau care să corespundă criteriilor de căutare.")
 
-with tab2:
+
+def tab_adauga_hartie(session):
+    """Formularul pentru un sortiment nou"""
     # Cod pentru adăugare hârtie
     st.subheader("Adaugă Sortiment de Hârtie Nou")
     # Certificare FSC materie primă - ÎN AFARA formularului pentru a fi dinamic
     st.markdown("### Certificare FSC Materie Primă")
     has_fsc = st.checkbox("Hârtie certificată FSC (materie primă)")
-    
+
     cod_fsc = None
     certificare_fsc = None
-    
+
     if has_fsc:
         col1, col2 = st.columns(2)
         with col1:
@@ -139,32 +144,32 @@ with tab2:
             st.info(f"Descriere: {CODURI_FSC_MATERIE_PRIMA[cod_fsc]}")
         with col2:
             certificare_fsc = st.selectbox("Certificare FSC*:", CERTIFICARI_FSC_MATERIE_PRIMA, key="cert_fsc_add")
-    
+
     # Formular pentru restul datelor
     with st.form("add_hartie_form"):
         sortiment = st.text_input("Sortiment Hârtie*:")
-        
+
         col1, col2 = st.columns(2)
         with col1:
             format_hartie = st.selectbox("Format Hârtie*:", list(formate_hartie.keys()))
             dimensiune_1 = formate_hartie[format_hartie][0]
             dimensiune_2 = formate_hartie[format_hartie][1]
             st.write(f"Dimensiuni: {dimensiune_1} x {dimensiune_2} cm")
-        
+
         with col2:
             gramaj = st.number_input("Gramaj (g/m²)*:", min_value=1, value=80)
             stoc = st.number_input("Stoc (coli)*:", min_value=0.0, value=0.0, step=1.0)
-        
+
         # Calculare greutate
         greutate = dimensiune_1 * dimensiune_2 * gramaj * stoc / 10**7
         st.write(f"Greutate calculată: {greutate:.3f} kg")
-        
+
         # Afișare informații FSC selectate (dacă există)
         if has_fsc and cod_fsc and certificare_fsc:
             st.info(f"🌿 FSC selectat: {cod_fsc} - {certificare_fsc}")
-        
+
         submitted = st.form_submit_button("Adaugă Hârtie")
-        
+
         if submitted:
             # Validare date
             if not sortiment or gramaj <= 0:
@@ -180,65 +185,72 @@ with tab2:
                         dimensiune_2=dimensiune_2,
                         gramaj=gramaj,
                         format_hartie=format_hartie,
-                        stoc=stoc,
-                        greutate=greutate,
+                        stoc=0,
                         fsc_materie_prima=has_fsc,
                         cod_fsc_materie_prima=cod_fsc,
                         certificare_fsc_materie_prima=certificare_fsc
                     )
                     session.add(hartie)
+                    session.flush()
+                    # Stocul inițial intră prin registrul de stoc
+                    if stoc > 0:
+                        inregistreaza_miscare(session, hartie.id, stoc, "sold_initial")
                     session.commit()
+                    invalideaza_referinte()
                     st.success(f"Sortimentul de hârtie '{sortiment}' a fost adăugat cu succes!")
                 except Exception as e:
                     session.rollback()
                     st.error(f"Eroare la adăugarea sortimentului de hârtie: {e}")
 
-with tab3:
+
+def tab_editeaza_hartie(session):
+    """Editarea unui sortiment de hârtie"""
     # Cod pentru editare hârtie
     st.subheader("Editează Sortiment de Hârtie")
-    
+
     st.warning("⚠️ **Atenție**: Editarea sortimentelor de hârtie poate afecta comenzile existente!")
     st.info("ℹ️ Pentru modificări de stoc, folosește tab-ul 'Intrări Hârtie'")
-    
+
     # Toggle pentru a permite editarea
     allow_edit = st.toggle("🔓 Permite editare sortiment", key="allow_hartie_edit")
-    
+
     if not allow_edit:
         st.info("👆 Activează 'Permite editare sortiment' pentru a modifica datele")
-    
+
     # Selectare hârtie
-    hartii = session.query(Hartie).order_by(Hartie.sortiment).all()
+    hartii = lista_hartii(session)
     if not hartii:
         st.info("Nu există sortimente de hârtie în baza de date.")
     else:
         hartie_options = [f"{h.id} - {h.sortiment} ({h.format_hartie}, {h.gramaj}g)" for h in hartii]
         selected_hartie = st.selectbox("Selectează hârtie:", hartie_options)
-        
+
         if selected_hartie:
             hartie_id = int(selected_hartie.split(" - ")[0])
             hartie = session.query(Hartie).get(hartie_id)
-            
+
             # Formular pentru editare (doar dacă editarea este permisă)
             if allow_edit:
+                retine_versiune("versiune_edit_hartie", hartie)
                 with st.form("edit_hartie_form"):
                     sortiment = st.text_input("Sortiment Hârtie*:", value=hartie.sortiment)
-                
+
                     col1, col2 = st.columns(2)
                     with col1:
                         format_hartie = st.selectbox("Format Hârtie*:", list(formate_hartie.keys()), index=list(formate_hartie.keys()).index(hartie.format_hartie) if hartie.format_hartie in formate_hartie else 0)
                         dimensiune_1 = formate_hartie[format_hartie][0]
                         dimensiune_2 = formate_hartie[format_hartie][1]
                         st.write(f"Dimensiuni: {dimensiune_1} x {dimensiune_2} cm")
-                    
+
                     with col2:
                         gramaj = st.number_input("Gramaj (g/m²)*:", min_value=1, value=int(hartie.gramaj))
                         stoc = st.number_input("Stoc (coli)*:", min_value=0.0, value=float(hartie.stoc), step=1.0)
 
-                    
+
                     # Certificare FSC materie primă
                     st.markdown("### Certificare FSC Materie Primă")
                     has_fsc = st.checkbox("Hârtie certificată FSC (materie primă)", value=hartie.fsc_materie_prima)
-                    
+
                     if has_fsc:
                         col1, col2 = st.columns(2)
                         with col1:
@@ -251,16 +263,19 @@ with tab3:
                     else:
                         cod_fsc = None
                         certificare_fsc = None
-                    
+
                     # Calculare greutate
                     greutate = dimensiune_1 * dimensiune_2 * gramaj * stoc / 10**7
                     st.write(f"Greutate calculată: {greutate:.3f} kg")
-                    
+
                     update_button = st.form_submit_button("Actualizează Hârtie", type="primary", use_container_width=True)
-                    
+
                     if update_button:
                         # Validare date
-                        if not sortiment or gramaj <= 0:
+                        if modificat_intre_timp("versiune_edit_hartie", hartie):
+                            # Stocul din formular nu mai include mișcările făcute între timp
+                            raporteaza_conflict(session, "versiune_edit_hartie", f"Hârtia '{hartie.sortiment}'")
+                        elif not sortiment or gramaj <= 0:
                             st.error("Completează toate câmpurile obligatorii!")
                         elif has_fsc and (not cod_fsc or not certificare_fsc):
                             st.error("Pentru hârtie certificată FSC, trebuie completate Cod FSC și Certificare FSC!")
@@ -272,21 +287,26 @@ with tab3:
                                 hartie.dimensiune_2 = dimensiune_2
                                 hartie.gramaj = gramaj
                                 hartie.format_hartie = format_hartie
-                                hartie.stoc = stoc
-                                hartie.greutate = greutate
                                 hartie.fsc_materie_prima = has_fsc
                                 hartie.cod_fsc_materie_prima = cod_fsc
                                 hartie.certificare_fsc_materie_prima = certificare_fsc
-                                
+                                # Stocul modificat manual se înregistrează ca o corecție
+                                corecteaza_stoc(session, hartie.id, stoc, "Modificare din fișa hârtiei")
+
                                 session.commit()
+                                uita_versiune("versiune_edit_hartie")
+                                invalideaza_referinte()
                                 st.success(f"Sortimentul de hârtie '{sortiment}' a fost actualizat cu succes!")
+                            except StaleDataError:
+                                raporteaza_conflict(session, "versiune_edit_hartie", f"Hârtia '{sortiment}'")
                             except Exception as e:
                                 session.rollback()
                                 st.error(f"Eroare la actualizarea sortimentului de hârtie: {e}")
-                    
+
                     # Avertisment despre ștergere
                     st.warning("⚠️ **Notă:** Ștergerea sortimentelor de hârtie este dezactivată pentru a preveni conflictele cu comenzile existente.")
             else:
+                uita_versiune("versiune_edit_hartie")
                 # Afișare date read-only când editarea nu este permisă
                 st.markdown("### Informații sortiment (read-only)")
                 col1, col2 = st.columns(2)
@@ -298,37 +318,39 @@ with tab3:
                     st.write(f"**Gramaj:** {hartie.gramaj} g/m²")
                     st.write(f"**Stoc:** {hartie.stoc:.2f} coli")
                     st.write(f"**Greutate:** {hartie.greutate:.3f} kg")
-                
+
                 if hartie.fsc_materie_prima:
                     st.success(f"🌿 **FSC Materie Primă:** {hartie.certificare_fsc_materie_prima or '-'} ({hartie.cod_fsc_materie_prima or '-'})")
 
-with tab4:
+
+def tab_intrari_hartie(session):
+    """Intrările de hârtie: înregistrare, istoric, editare și ștergere"""
     # Cod pentru înregistrare intrări hârtie
     st.subheader("Înregistrare Intrare Hârtie")
-    
+
     # Afișează mesajul de succes din session state
     if 'intrare_success_msg' in st.session_state:
         st.success(st.session_state.intrare_success_msg)
         del st.session_state.intrare_success_msg
-    
+
     from models.stoc import Stoc
     from datetime import datetime
-    
+
     # Selectare sortiment hârtie
-    hartii = session.query(Hartie).order_by(Hartie.sortiment).all()
+    hartii = lista_hartii(session)
     if not hartii:
         st.warning("Nu există sortimente de hârtie în baza de date. Adaugă mai întâi un sortiment.")
     else:
         hartie_options = [f"{h.id} - {h.sortiment} ({h.format_hartie}, {h.gramaj}g)" for h in hartii]
         selected_hartie_intrare = st.selectbox("Selectează sortiment hârtie*:", hartie_options, key="hartie_intrare")
-        
+
         if selected_hartie_intrare:
             hartie_id_intrare = int(selected_hartie_intrare.split(" - ")[0])
             hartie_selectata = session.query(Hartie).get(hartie_id_intrare)
-            
+
             # Afișare informații sortiment
             st.info(f"📄 **Sortiment selectat:** {hartie_selectata.sortiment} | **Stoc actual:** {hartie_selectata.stoc:.2f} coli")
-            
+
             # Selectare furnizor ÎNAINTE de formular pentru a fi dinamic
             st.markdown("### Selectare Furnizor")
             furnizor_selectat = st.selectbox(
@@ -336,35 +358,35 @@ with tab4:
                 options=[""] + list(FURNIZORI_CERTIFICARE.keys()),
                 help="Selectează furnizorul din listă"
             )
-            
+
             # Auto-completare cod certificare bazat pe furnizor
             cod_certificare_auto = ""
             if furnizor_selectat and furnizor_selectat in FURNIZORI_CERTIFICARE:
                 cod_certificare_auto = FURNIZORI_CERTIFICARE[furnizor_selectat]
                 st.success(f"✅ Cod certificare asociat automat: **{cod_certificare_auto}**")
-            
+
             # Formular pentru intrare
             with st.form("intrare_hartie_form"):
                 st.markdown("### Detalii Intrare")
-                
+
                 col1, col2 = st.columns(2)
                 with col1:
                     data_intrare = st.date_input("Data intrare*:", value=datetime.now(), help="Data primirii hârtiei")
                     nr_factura = st.text_input("Număr factură*:", placeholder="Ex: FAC-2024-001")
-                
+
                 with col2:
                     # Afișare furnizor selectat (read-only în formular)
                     st.text_input("Furnizor selectat:", value=furnizor_selectat, disabled=True)
                     st.text_input("Cod certificare:", value=cod_certificare_auto, disabled=True)
-                
+
                 nr_coli = st.number_input("Număr coli*:", min_value=0.0, value=0.0, step=1.0, help="Numărul de coli primite")
-                
+
                 # Calculare greutate nouă
                 if nr_coli > 0:
                     greutate_noua = hartie_selectata.dimensiune_1 * hartie_selectata.dimensiune_2 * hartie_selectata.gramaj * nr_coli / 10**7
                     stoc_nou = hartie_selectata.stoc + nr_coli
                     greutate_totala = hartie_selectata.greutate + greutate_noua
-                    
+
                     st.markdown("### Previzualizare")
                     col1, col2, col3 = st.columns(3)
                     with col1:
@@ -373,16 +395,16 @@ with tab4:
                         st.metric("Stoc nou", f"{stoc_nou:.2f} coli", delta=f"+{nr_coli:.2f}")
                     with col3:
                         st.metric("Greutate totală", f"{greutate_totala:.3f} kg", delta=f"+{greutate_noua:.3f}")
-                
+
                 col1, col2 = st.columns(2)
                 with col1:
                     submitted = st.form_submit_button("✅ Validează Intrarea", type="primary", use_container_width=True)
                 with col2:
                     reset_button = st.form_submit_button("🔄 Resetează formular", use_container_width=True)
-                
+
                 if reset_button:
                     st.rerun()
-                
+
                 if submitted:
                     # Validare date
                     if not nr_factura or not nr_factura.strip():
@@ -397,7 +419,7 @@ with tab4:
                             Stoc.hartie_id == hartie_id_intrare,
                             Stoc.nr_factura == nr_factura.strip()
                         ).first()
-                        
+
                         if intrare_existenta:
                             st.error(f"❌ Acest sortiment ({hartie_selectata.sortiment}) a fost deja înregistrat pe factura {nr_factura}! Verifică dacă nu ai introdus deja această intrare.")
                         else:
@@ -412,31 +434,35 @@ with tab4:
                                     data=data_intrare
                                 )
                                 session.add(intrare_stoc)
-                                
-                                # Actualizează stocul hârtiei și furnizorul
-                                hartie_selectata.stoc += nr_coli
-                                hartie_selectata.greutate = hartie_selectata.calculeaza_greutate()
+                                session.flush()
+
+                                # Actualizează stocul hârtiei (cu registrul de stoc) și furnizorul
+                                inregistreaza_miscare(
+                                    session, hartie_id_intrare, nr_coli, "intrare", stoc_id=intrare_stoc.id,
+                                    descriere=f"Factura {nr_factura.strip()} - {furnizor_selectat.strip()}",
+                                )
                                 hartie_selectata.furnizor = furnizor_selectat.strip()
                                 hartie_selectata.cod_certificare = cod_certificare_auto if cod_certificare_auto else None
-                                
+
                                 session.commit()
-                                
+                                invalideaza_referinte()
+
                                 # Salvează mesajul în session state pentru a-l afișa după rerun
                                 st.session_state.intrare_success_msg = f"✅ Intrarea de {nr_coli:.2f} coli pentru '{hartie_selectata.sortiment}' a fost înregistrată cu succes!"
-                                
+
                                 st.balloons()
                                 st.rerun()  # Resetează formularul
                             except Exception as e:
                                 session.rollback()
                                 st.error(f"Eroare la înregistrarea intrării: {e}")
-    
+
     # Afișare istoric intrări
     st.markdown("---")
     st.markdown("### Istoric Intrări Recente")
-    
+
     from models.stoc import Stoc
     intrari_recente = session.query(Stoc).join(Hartie).order_by(Stoc.data.desc()).limit(20).all()
-    
+
     if intrari_recente:
         data_intrari = []
         for intrare in intrari_recente:
@@ -448,203 +474,206 @@ with tab4:
                 "Furnizor": intrare.furnizor,
                 "Cod Certificare": intrare.cod_certificare or "-"
             })
-        
+
         df_intrari = pd.DataFrame(data_intrari)
         st.dataframe(df_intrari, use_container_width=True)
     else:
         st.info("Nu există intrări înregistrate.")
 
-with st.expander("🔧 Editează/Șterge Intrări Existente", expanded=False):
-    st.warning("⚠️ **Atenție**: Editarea/ștergerea intrărilor va afecta stocul de hârtie!")
-    
-    # Toggle pentru a permite editarea
-    allow_edit_intrari = st.toggle("🔓 Permite editare intrări", key="allow_intrari_edit")
-    
-    if not allow_edit_intrari:
-        st.info("👆 Activează 'Permite editare intrări' pentru a modifica/șterge intrările")
-    else:
-        # Obține toate intrările, sortate descrescător după dată
-        toate_intrarile = session.query(Stoc).join(Hartie).order_by(Stoc.data.desc()).all()
-        
-        if toate_intrarile:
-            # Creează opțiuni pentru selectbox
-            intrare_options = []
-            for intrare in toate_intrarile:
-                intrare_options.append(
-                    f"{intrare.id} - {intrare.data.strftime('%d-%m-%Y')} - {intrare.hartie.sortiment} - {intrare.cantitate:.2f} coli - {intrare.nr_factura}"
-                )
-            
-            selected_intrare = st.selectbox(
-                "Selectează intrarea de modificat/șters:",
-                [""] + intrare_options,
-                help="Selectează intrarea pe care vrei să o modifici sau să o ștergi"
+    with st.expander("🔧 Editează/Șterge Intrări Existente", expanded=False):
+        st.warning("⚠️ **Atenție**: Editarea/ștergerea intrărilor va afecta stocul de hârtie!")
+
+        # Toggle pentru a permite editarea
+        allow_edit_intrari = st.toggle("🔓 Permite editare intrări", key="allow_intrari_edit")
+
+        if not allow_edit_intrari:
+            st.info("👆 Activează 'Permite editare intrări' pentru a modifica/șterge intrările")
+        else:
+            # Doar primele potriviri ale căutării, cele mai recente primele
+            intrare_id = selector_cautare(
+                "intrari_hartie", "Selectează intrarea de modificat/șters:",
+                lambda text, limita: cauta_intrari_stoc(session, text, limita),
+                optional=True, placeholder="Id, sortiment, factură sau furnizor...",
+                help="Selectează intrarea pe care vrei să o modifici sau să o ștergi",
             )
-            
-            if selected_intrare and selected_intrare != "":
-                intrare_id = int(selected_intrare.split(" - ")[0])
-                intrare_selectata = session.query(Stoc).get(intrare_id)
-                
-                # Afișare detalii intrare
-                st.markdown("### Detalii Intrare Selectată")
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.write(f"**Data:** {intrare_selectata.data.strftime('%d-%m-%Y')}")
-                    st.write(f"**Sortiment:** {intrare_selectata.hartie.sortiment}")
-                with col2:
-                    st.write(f"**Cantitate:** {intrare_selectata.cantitate:.2f} coli")
-                    st.write(f"**Nr. Factură:** {intrare_selectata.nr_factura}")
-                with col3:
-                    st.write(f"**Furnizor:** {intrare_selectata.furnizor}")
-                    st.write(f"**Cod Certificare:** {intrare_selectata.cod_certificare or '-'}")
-                
-                # Butoane acțiuni
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if st.button("✏️ Editează Intrarea", key="edit_intrare_btn", use_container_width=True):
-                        st.session_state.edit_intrare_id = intrare_id
-                        st.session_state.show_edit_form = True
-                        st.rerun()
-                
-                with col2:
-                    if st.button("🗑️ Șterge Intrarea", key="delete_intrare_btn", type="secondary", use_container_width=True):
-                        st.session_state.delete_intrare_id = intrare_id
-                        st.session_state.show_delete_confirm = True
-                        st.rerun()
-                
-                # Formular de editare (dacă a fost activat)
-                if st.session_state.get('show_edit_form', False) and st.session_state.get('edit_intrare_id') == intrare_id:
-                    st.markdown("---")
-                    st.markdown("### 📝 Editează Intrarea")
-                    
-                    with st.form("edit_intrare_form"):
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            new_data = st.date_input("Data intrare:", value=intrare_selectata.data)
-                            new_nr_factura = st.text_input("Număr factură:", value=intrare_selectata.nr_factura)
-                        
-                        with col2:
-                            new_cantitate = st.number_input(
-                                "Cantitate (coli):", 
-                                min_value=0.0, 
-                                value=float(intrare_selectata.cantitate), 
-                                step=1.0
-                            )
-                            new_furnizor = st.text_input("Furnizor:", value=intrare_selectata.furnizor)
-                        
-                        new_cod_certificare = st.text_input("Cod certificare:", value=intrare_selectata.cod_certificare or "")
-                        
-                        # Calculează impactul asupra stocului
-                        diferenta_cantitate = new_cantitate - intrare_selectata.cantitate
-                        stoc_actual = intrare_selectata.hartie.stoc
-                        stoc_nou = stoc_actual + diferenta_cantitate
-                        
-                        if diferenta_cantitate != 0:
-                            st.markdown("### 📊 Impact asupra stocului")
-                            col1, col2, col3 = st.columns(3)
+
+            if intrare_id is not None:
+                intrare_selectata = session.get(Stoc, intrare_id)
+
+                if intrare_selectata:
+                    # Afișare detalii intrare
+                    st.markdown("### Detalii Intrare Selectată")
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.write(f"**Data:** {intrare_selectata.data.strftime('%d-%m-%Y')}")
+                        st.write(f"**Sortiment:** {intrare_selectata.hartie.sortiment}")
+                    with col2:
+                        st.write(f"**Cantitate:** {intrare_selectata.cantitate:.2f} coli")
+                        st.write(f"**Nr. Factură:** {intrare_selectata.nr_factura}")
+                    with col3:
+                        st.write(f"**Furnizor:** {intrare_selectata.furnizor}")
+                        st.write(f"**Cod Certificare:** {intrare_selectata.cod_certificare or '-'}")
+
+                    # Butoane acțiuni
+                    col1, col2 = st.columns(2)
+
+                    with col1:
+                        if st.button("✏️ Editează Intrarea", key="edit_intrare_btn", use_container_width=True):
+                            st.session_state.edit_intrare_id = intrare_id
+                            st.session_state.show_edit_form = True
+                            st.rerun()
+
+                    with col2:
+                        if st.button("🗑️ Șterge Intrarea", key="delete_intrare_btn", type="secondary", use_container_width=True):
+                            st.session_state.delete_intrare_id = intrare_id
+                            st.session_state.show_delete_confirm = True
+                            st.rerun()
+
+                    # Formular de editare (dacă a fost activat)
+                    if st.session_state.get('show_edit_form', False) and st.session_state.get('edit_intrare_id') == intrare_id:
+                        st.markdown("---")
+                        st.markdown("### 📝 Editează Intrarea")
+
+                        with st.form("edit_intrare_form"):
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                new_data = st.date_input("Data intrare:", value=intrare_selectata.data)
+                                new_nr_factura = st.text_input("Număr factură:", value=intrare_selectata.nr_factura)
+
+                            with col2:
+                                new_cantitate = st.number_input(
+                                    "Cantitate (coli):", 
+                                    min_value=0.0, 
+                                    value=float(intrare_selectata.cantitate), 
+                                    step=1.0
+                                )
+                                new_furnizor = st.text_input("Furnizor:", value=intrare_selectata.furnizor)
+
+                            new_cod_certificare = st.text_input("Cod certificare:", value=intrare_selectata.cod_certificare or "")
+
+                            # Calculează impactul asupra stocului
+                            diferenta_cantitate = new_cantitate - intrare_selectata.cantitate
+                            stoc_actual = intrare_selectata.hartie.stoc
+                            stoc_nou = stoc_actual + diferenta_cantitate
+
+                            if diferenta_cantitate != 0:
+                                st.markdown("### 📊 Impact asupra stocului")
+                                col1, col2, col3 = st.columns(3)
+                                with col1:
+                                    st.metric("Stoc actual", f"{stoc_actual:.2f} coli")
+                                with col2:
+                                    st.metric("Stoc nou", f"{stoc_nou:.2f} coli", delta=f"{diferenta_cantitate:+.2f}")
+                                with col3:
+                                    if diferenta_cantitate > 0:
+                                        st.success(f"+{diferenta_cantitate:.2f} coli")
+                                    else:
+                                        st.error(f"{diferenta_cantitate:.2f} coli")
+
+                            col1, col2 = st.columns(2)
                             with col1:
-                                st.metric("Stoc actual", f"{stoc_actual:.2f} coli")
+                                save_changes = st.form_submit_button("💾 Salvează modificările", type="primary", use_container_width=True)
                             with col2:
-                                st.metric("Stoc nou", f"{stoc_nou:.2f} coli", delta=f"{diferenta_cantitate:+.2f}")
-                            with col3:
-                                if diferenta_cantitate > 0:
-                                    st.success(f"+{diferenta_cantitate:.2f} coli")
+                                cancel_edit = st.form_submit_button("❌ Anulează", use_container_width=True)
+
+                            if cancel_edit:
+                                st.session_state.show_edit_form = False
+                                if 'edit_intrare_id' in st.session_state:
+                                    del st.session_state.edit_intrare_id
+                                st.rerun()
+
+                            if save_changes:
+                                if not new_nr_factura.strip():
+                                    st.error("Numărul facturii este obligatoriu!")
+                                elif not new_furnizor.strip():
+                                    st.error("Furnizorul este obligatoriu!")
+                                elif new_cantitate <= 0:
+                                    st.error("Cantitatea trebuie să fie mai mare decât 0!")
+                                elif stoc_nou < 0:
+                                    st.error(f"Stocul nu poate deveni negativ! Stoc actual: {stoc_actual:.2f}, încerci să scazi {abs(diferenta_cantitate):.2f}")
                                 else:
-                                    st.error(f"{diferenta_cantitate:.2f} coli")
-                        
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            save_changes = st.form_submit_button("💾 Salvează modificările", type="primary", use_container_width=True)
-                        with col2:
-                            cancel_edit = st.form_submit_button("❌ Anulează", use_container_width=True)
-                        
-                        if cancel_edit:
-                            st.session_state.show_edit_form = False
-                            if 'edit_intrare_id' in st.session_state:
-                                del st.session_state.edit_intrare_id
-                            st.rerun()
-                        
-                        if save_changes:
-                            if not new_nr_factura.strip():
-                                st.error("Numărul facturii este obligatoriu!")
-                            elif not new_furnizor.strip():
-                                st.error("Furnizorul este obligatoriu!")
-                            elif new_cantitate <= 0:
-                                st.error("Cantitatea trebuie să fie mai mare decât 0!")
-                            elif stoc_nou < 0:
-                                st.error(f"Stocul nu poate deveni negativ! Stoc actual: {stoc_actual:.2f}, încerci să scazi {abs(diferenta_cantitate):.2f}")
-                            else:
-                                try:
-                                    # Actualizează intrarea
-                                    intrare_selectata.data = new_data
-                                    intrare_selectata.nr_factura = new_nr_factura.strip()
-                                    intrare_selectata.cantitate = new_cantitate
-                                    intrare_selectata.furnizor = new_furnizor.strip()
-                                    intrare_selectata.cod_certificare = new_cod_certificare.strip() if new_cod_certificare.strip() else None
-                                    
-                                    # Actualizează stocul hârtiei
-                                    hartie_afectata = intrare_selectata.hartie
-                                    hartie_afectata.stoc = stoc_nou
-                                    hartie_afectata.greutate = hartie_afectata.calculeaza_greutate()
-                                    
-                                    session.commit()
-                                    
-                                    # Reset form
-                                    st.session_state.show_edit_form = False
-                                    if 'edit_intrare_id' in st.session_state:
-                                        del st.session_state.edit_intrare_id
-                                    
-                                    st.success(f"✅ Intrarea a fost actualizată cu succes!")
-                                    st.balloons()
-                                    st.rerun()
-                                    
-                                except Exception as e:
-                                    session.rollback()
-                                    st.error(f"Eroare la actualizare: {e}")
-                
-                # Confirmare ștergere (dacă a fost activată)
-                if st.session_state.get('show_delete_confirm', False) and st.session_state.get('delete_intrare_id') == intrare_id:
-                    st.markdown("---")
-                    st.error("### ⚠️ Confirmare Ștergere")
-                    st.warning(f"Ești sigur că vrei să ștergi această intrare de **{intrare_selectata.cantitate:.2f} coli**?")
-                    st.info(f"Stocul pentru '{intrare_selectata.hartie.sortiment}' va scădea de la **{intrare_selectata.hartie.stoc:.2f}** la **{intrare_selectata.hartie.stoc - intrare_selectata.cantitate:.2f}** coli.")
-                    
-                    if intrare_selectata.hartie.stoc - intrare_selectata.cantitate < 0:
-                        st.error("❌ **NU SE POATE ȘTERGE!** Ștergerea acestei intrări ar face stocul să devină negativ!")
-                    else:
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if st.button("✅ Da, șterge intrarea", key="confirm_delete", type="primary", use_container_width=True):
-                                try:
-                                    # Actualizează stocul hârtiei înainte de ștergere
-                                    hartie_afectata = intrare_selectata.hartie
-                                    hartie_afectata.stoc -= intrare_selectata.cantitate
-                                    hartie_afectata.greutate = hartie_afectata.calculeaza_greutate()
-                                    
-                                    # Șterge intrarea
-                                    session.delete(intrare_selectata)
-                                    session.commit()
-                                    
-                                    # Reset state
+                                    try:
+                                        # Actualizează stocul hârtiei cu diferența, în registrul de stoc
+                                        inregistreaza_miscare(
+                                            session, intrare_selectata.hartie_id, diferenta_cantitate, "modificare_intrare",
+                                            stoc_id=intrare_selectata.id,
+                                            descriere=f"Modificare intrare: factura {new_nr_factura.strip()} - {new_furnizor.strip()}",
+                                        )
+
+                                        # Actualizează intrarea
+                                        intrare_selectata.data = new_data
+                                        intrare_selectata.nr_factura = new_nr_factura.strip()
+                                        intrare_selectata.cantitate = new_cantitate
+                                        intrare_selectata.furnizor = new_furnizor.strip()
+                                        intrare_selectata.cod_certificare = new_cod_certificare.strip() if new_cod_certificare.strip() else None
+
+                                        session.commit()
+                                        invalideaza_referinte()
+
+                                        # Reset form
+                                        st.session_state.show_edit_form = False
+                                        if 'edit_intrare_id' in st.session_state:
+                                            del st.session_state.edit_intrare_id
+
+                                        st.success(f"✅ Intrarea a fost actualizată cu succes!")
+                                        st.balloons()
+                                        st.rerun()
+
+                                    except Exception as e:
+                                        session.rollback()
+                                        st.error(f"Eroare la actualizare: {e}")
+
+                    # Confirmare ștergere (dacă a fost activată)
+                    if st.session_state.get('show_delete_confirm', False) and st.session_state.get('delete_intrare_id') == intrare_id:
+                        st.markdown("---")
+                        st.error("### ⚠️ Confirmare Ștergere")
+                        st.warning(f"Ești sigur că vrei să ștergi această intrare de **{intrare_selectata.cantitate:.2f} coli**?")
+                        st.info(f"Stocul pentru '{intrare_selectata.hartie.sortiment}' va scădea de la **{intrare_selectata.hartie.stoc:.2f}** la **{intrare_selectata.hartie.stoc - intrare_selectata.cantitate:.2f}** coli.")
+
+                        if intrare_selectata.hartie.stoc - intrare_selectata.cantitate < 0:
+                            st.error("❌ **NU SE POATE ȘTERGE!** Ștergerea acestei intrări ar face stocul să devină negativ!")
+                        else:
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                if st.button("✅ Da, șterge intrarea", key="confirm_delete", type="primary", use_container_width=True):
+                                    try:
+                                        # Actualizează stocul hârtiei înainte de ștergere
+                                        inregistreaza_miscare(
+                                            session, intrare_selectata.hartie_id, -intrare_selectata.cantitate, "anulare_intrare",
+                                            stoc_id=intrare_selectata.id,
+                                            descriere=f"Ștergere intrare: factura {intrare_selectata.nr_factura} - {intrare_selectata.furnizor}",
+                                        )
+
+                                        # Șterge intrarea
+                                        session.delete(intrare_selectata)
+                                        session.commit()
+                                        invalideaza_referinte()
+
+                                        # Reset state
+                                        st.session_state.show_delete_confirm = False
+                                        if 'delete_intrare_id' in st.session_state:
+                                            del st.session_state.delete_intrare_id
+
+                                        st.success(f"✅ Intrarea a fost ștearsă cu succes!")
+                                        st.rerun()
+
+                                    except Exception as e:
+                                        session.rollback()
+                                        st.error(f"Eroare la ștergere: {e}")
+
+                            with col2:
+                                if st.button("❌ Nu, anulează", key="cancel_delete", use_container_width=True):
                                     st.session_state.show_delete_confirm = False
                                     if 'delete_intrare_id' in st.session_state:
                                         del st.session_state.delete_intrare_id
-                                    
-                                    st.success(f"✅ Intrarea a fost ștearsă cu succes!")
                                     st.rerun()
-                                    
-                                except Exception as e:
-                                    session.rollback()
-                                    st.error(f"Eroare la ștergere: {e}")
-                        
-                        with col2:
-                            if st.button("❌ Nu, anulează", key="cancel_delete", use_container_width=True):
-                                st.session_state.show_delete_confirm = False
-                                if 'delete_intrare_id' in st.session_state:
-                                    del st.session_state.delete_intrare_id
-                                st.rerun()
-        else:
-            st.info("Nu există intrări înregistrate pentru editare/ștergere.")
 
-# Închidere sesiune
-session.close()
+
+# Sesiune cu baza de date - închisă automat la orice ieșire din pagină (inclusiv st.stop/st.rerun)
+with sesiune() as session:
+    # Doar secțiunea activă se execută (vezi utils/navigare.py)
+    afiseaza_sectiunea("sectiune_hartie", {
+        "Lista Hârtie": tab_lista_hartie,
+        "Adaugă Hârtie": tab_adauga_hartie,
+        "Editează Hârtie": tab_editeaza_hartie,
+        "Intrări Hârtie": tab_intrari_hartie,
+    }, session)
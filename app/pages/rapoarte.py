@@ -7,13 +7,17 @@ from datetime import datetime, timedelta
 from calendar import monthrange
 import io
 import numpy as np
-from models import get_session
+from models import sesiune
 from models.beneficiari import Beneficiar
 from models.hartie import Hartie
 from models.stoc import Stoc
 from models.comenzi import Comanda
-import tomli
-from pathlib import Path
+from sqlalchemy.orm import contains_eager, load_only
+from services.cache_referinte import lista_beneficiari
+from services.sumare import totaluri_pe_perioada
+from services.rapoarte import raport_beneficiari
+from utils.navigare import afiseaza_sectiunea
+from services import calculator
 import os
 from dotenv import load_dotenv
 
@@ -53,153 +57,133 @@ if not check_password():
 
 st.title("Rapoarte")
 
-# Inițializare sesiune
-session = get_session()
 
-# Tabs pentru diferite tipuri de rapoarte
-tab1, tab2, tab3, tab4 = st.tabs(["Consum Hârtie", "Comenzi", "Stoc", "Beneficiari"])
-
-# Raport Consum Hârtie
-with tab1:
+def tab_consum_hartie(session):
+    """Raport consum hârtie"""
     st.subheader("Raport Consum Hârtie")
-    
+
     # Selecție perioadă
     col1, col2 = st.columns(2)
     with col1:
         start_date = st.date_input("De la data:", value=datetime.now().replace(day=1))
     with col2:
         end_date = st.date_input("Până la data:", value=datetime.now())
-    
+
     # Verifică dacă perioada e validă
     if start_date > end_date:
         st.error("Data de început trebuie să fie anterioară datei de sfârșit!")
     else:
-        # Obține comenzile din perioada selectată
-        comenzi = session.query(Comanda).filter(
-            Comanda.data >= start_date,
-            Comanda.data <= end_date,
-            Comanda.facturata == True
-        ).all()
-        
-        if not comenzi:
-            st.info("Nu există comenzi facturate în perioada selectată.")
+        # Totalurile pe sortiment vin din sumarele lunare (doar marginile perioadei din comenzi)
+        totaluri = [t for t in totaluri_pe_perioada(session, "hartie", start_date, end_date, facturata=True) if t.consum > 0]
+        hartii_raport = {
+            h.id: h for h in session.query(
+                Hartie.id, Hartie.sortiment, Hartie.format_hartie, Hartie.gramaj, Hartie.dimensiune_1, Hartie.dimensiune_2
+            ).filter(Hartie.id.in_([t.id for t in totaluri])).all()
+        } if totaluri else {}
+
+        if not totaluri:
+            st.info("Nu există date de consum pentru perioada selectată.")
         else:
-            # Calculează consumul de hârtie pentru fiecare tip
-            hartii_consumate = {}
-            
-            # Încărcare indici coală tipar
-            try:
-                config_path = Path(__file__).parent.parent / "data" / "coale_tipar.toml"
-                with open(config_path, "rb") as f:
-                    indici_coala = tomli.load(f)["coale"]
-            except:
-                indici_coala = {
-                    "330 x 480 mm": 4,
-                    "SRA3 - 320 x 450 mm": 4,
-                    # și așa mai departe...
-                }
-            
-            for comanda in comenzi:
-                # CORECTAT: folosește total_coli în loc de nr_coli
-                if comanda.total_coli and comanda.total_coli > 0 and comanda.coala_tipar in indici_coala:
-                    hartie = session.query(Hartie).get(comanda.hartie_id)
-                    if hartie:
-                        consum = comanda.total_coli / indici_coala[comanda.coala_tipar]
-                        
-                        key = f"{hartie.sortiment} ({hartie.format_hartie}, {hartie.gramaj}g)"
-                        if key in hartii_consumate:
-                            hartii_consumate[key]["cantitate"] += consum
-                            hartii_consumate[key]["greutate"] += (hartie.dimensiune_1 * hartie.dimensiune_2 * hartie.gramaj * consum) / 10**7
-                            hartii_consumate[key]["comenzi"].append(comanda.numar_comanda)
-                        else:
-                            hartii_consumate[key] = {
-                                "cantitate": consum,
-                                "greutate": (hartie.dimensiune_1 * hartie.dimensiune_2 * hartie.gramaj * consum) / 10**7,
-                                "comenzi": [comanda.numar_comanda]
-                            }
-            
+            sumar = pd.DataFrame({
+                "hartie_id": [t.id for t in totaluri],
+                "hartie": [f"{hartii_raport[t.id].sortiment} ({hartii_raport[t.id].format_hartie}, {hartii_raport[t.id].gramaj}g)"
+                           for t in totaluri],
+                "cantitate": [t.consum for t in totaluri],
+                "comenzi": [t.nr_comenzi for t in totaluri],
+            }).sort_values("hartie", ignore_index=True)
+            # Consumul în kg pentru toate sortimentele deodată
+            sumar["greutate"] = calculator.greutate_coli(
+                [hartii_raport[h_id].dimensiune_1 for h_id in sumar["hartie_id"]],
+                [hartii_raport[h_id].dimensiune_2 for h_id in sumar["hartie_id"]],
+                [hartii_raport[h_id].gramaj for h_id in sumar["hartie_id"]],
+                sumar["cantitate"],
+            )
+
             # Construiește DataFrame pentru afișare
-            if hartii_consumate:
-                data = []
-                for hartie, info in hartii_consumate.items():
-                    data.append({
-                        "Sortiment Hârtie": hartie,
-                        "Cantitate (coli)": f"{info['cantitate']:.2f}",
-                        "Greutate (kg)": f"{info['greutate']:.3f}",
-                        "Comenzi": len(set(info["comenzi"]))
-                    })
-                
-                df = pd.DataFrame(data)
-                st.dataframe(df, use_container_width=True)
-                
-                # Vizualizări grafice
-                st.subheader("Vizualizări")
-                
-                # Grafic consum cantitativ (coli)
-                fig_cantitate = px.bar(
-                    df, 
-                    x="Sortiment Hârtie", 
-                    y=[float(x) for x in df["Cantitate (coli)"]],
-                    title="Consum Hârtie (Coli)",
-                    labels={"y": "Cantitate (coli)", "x": "Sortiment Hârtie"}
+            df = pd.DataFrame({
+                "Sortiment Hârtie": sumar["hartie"],
+                "Cantitate (coli)": sumar["cantitate"].map("{:.2f}".format),
+                "Greutate (kg)": sumar["greutate"].map("{:.3f}".format),
+                "Comenzi": sumar["comenzi"]
+            })
+            st.dataframe(df, use_container_width=True)
+
+            # Vizualizări grafice
+            st.subheader("Vizualizări")
+
+            # Grafic consum cantitativ (coli)
+            fig_cantitate = px.bar(
+                df, 
+                x="Sortiment Hârtie", 
+                y=[float(x) for x in df["Cantitate (coli)"]],
+                title="Consum Hârtie (Coli)",
+                labels={"y": "Cantitate (coli)", "x": "Sortiment Hârtie"}
+            )
+            st.plotly_chart(fig_cantitate, use_container_width=True)
+
+            # Grafic consum masic (kg)
+            fig_greutate = px.pie(
+                df, 
+                values=[float(x) for x in df["Greutate (kg)"]],
+                names="Sortiment Hârtie",
+                title="Distribuție Consum Hârtie (kg)",
+                hole=0.4
+            )
+            st.plotly_chart(fig_greutate, use_container_width=True)
+
+            # Export raport - detaliile pe comenzi se citesc doar la export
+            if st.button("Export Raport Consum"):
+                coloane_consum = ["numar_comanda", "data", "beneficiar", "nume_lucrare", "coala_tipar", "total_coli",
+                                  "hartie_id", "format_hartie"]
+                df_consum = pd.DataFrame.from_records(
+                    session.query(
+                        Comanda.numar_comanda, Comanda.data, Beneficiar.nume, Comanda.nume_lucrare,
+                        Comanda.coala_tipar, Comanda.total_coli, Comanda.hartie_id, Hartie.format_hartie
+                    ).join(Beneficiar, Comanda.beneficiar_id == Beneficiar.id)
+                    .join(Hartie, Comanda.hartie_id == Hartie.id)
+                    .filter(
+                        Comanda.data >= start_date,
+                        Comanda.data <= end_date,
+                        Comanda.facturata == True
+                    ).order_by(Comanda.numar_comanda).all(),
+                    columns=coloane_consum
                 )
-                st.plotly_chart(fig_cantitate, use_container_width=True)
-                
-                # Grafic consum masic (kg)
-                fig_greutate = px.pie(
-                    df, 
-                    values=[float(x) for x in df["Greutate (kg)"]],
-                    names="Sortiment Hârtie",
-                    title="Distribuție Consum Hârtie (kg)",
-                    hole=0.4
+                df_consum["consum"] = calculator.consum_hartie(df_consum["total_coli"], df_consum["format_hartie"], df_consum["coala_tipar"])
+                hartii_consumate = df_consum[df_consum["consum"] > 0]
+
+                buffer = io.BytesIO()
+                with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+                    df.to_excel(writer, sheet_name="Consum Hartie", index=False)
+
+                    # Adaugă un sheet cu detalii pentru fiecare sortiment
+                    for hartie_id, hartie in zip(sumar["hartie_id"], sumar["hartie"]):
+                        comenzi_pentru_hartie = hartii_consumate[hartii_consumate["hartie_id"] == hartie_id]
+                        df_comenzi = pd.DataFrame({
+                            "Nr. Comandă": comenzi_pentru_hartie["numar_comanda"],
+                            "Data": pd.to_datetime(comenzi_pentru_hartie["data"]).dt.strftime("%d-%m-%Y"),
+                            "Beneficiar": comenzi_pentru_hartie["beneficiar"],
+                            "Nume Lucrare": comenzi_pentru_hartie["nume_lucrare"],
+                            "Coală Tipar": comenzi_pentru_hartie["coala_tipar"],
+                            "Total Coli": comenzi_pentru_hartie["total_coli"],
+                            "Consum Efectiv": comenzi_pentru_hartie["consum"]
+                        })
+                        hartie_safe = hartie.replace("/", "-").replace(":", "-")
+                        # Excel are limitare de 31 caractere pentru numele sheet-ului
+                        df_comenzi.to_excel(writer, sheet_name=f"Detalii {hartie_safe}"[:31], index=False)
+
+                buffer.seek(0)
+                st.download_button(
+                    label="Descarcă Excel",
+                    data=buffer,
+                    file_name=f"raport_consum_hartie_{start_date.strftime('%Y-%m-%d')}_{end_date.strftime('%Y-%m-%d')}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
-                st.plotly_chart(fig_greutate, use_container_width=True)
-                
-                # Export raport
-                if st.button("Export Raport Consum"):
-                    buffer = io.BytesIO()
-                    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                        df.to_excel(writer, sheet_name="Consum Hartie", index=False)
-                        
-                        # Adaugă un sheet cu detalii pentru fiecare sortiment
-                        for hartie, info in hartii_consumate.items():
-                            comenzi_pentru_hartie = session.query(Comanda).filter(
-                                Comanda.numar_comanda.in_(info["comenzi"]),
-                                Comanda.data >= start_date,
-                                Comanda.data <= end_date
-                            ).all()
-                            
-                            if comenzi_pentru_hartie:
-                                comenzi_data = []
-                                for cmd in comenzi_pentru_hartie:
-                                    comenzi_data.append({
-                                        "Nr. Comandă": cmd.numar_comanda,
-                                        "Data": cmd.data.strftime("%d-%m-%Y"),
-                                        "Beneficiar": session.query(Beneficiar).get(cmd.beneficiar_id).nume,
-                                        "Nume Lucrare": cmd.nume_lucrare,  # CORECTAT
-                                        "Coală Tipar": cmd.coala_tipar,
-                                        "Total Coli": cmd.total_coli,  # CORECTAT
-                                        "Consum Efectiv": cmd.total_coli / indici_coala[cmd.coala_tipar] if cmd.coala_tipar in indici_coala else 0  # CORECTAT
-                                    })
-                                
-                                df_comenzi = pd.DataFrame(comenzi_data)
-                                hartie_safe = hartie.replace("/", "-").replace(":", "-")[:31]  # Excel are limitare de 31 caractere pentru numele sheet-ului
-                                df_comenzi.to_excel(writer, sheet_name=f"Detalii {hartie_safe}", index=False)
-                    
-                    buffer.seek(0)
-                    st.download_button(
-                        label="Descarcă Excel",
-                        data=buffer,
-                        file_name=f"raport_consum_hartie_{start_date.strftime('%Y-%m-%d')}_{end_date.strftime('%Y-%m-%d')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-            else:
-                st.info("Nu există date de consum pentru perioada selectată.")
-
-# Raport Comenzi
-with tab2:
+
+
+def tab_comenzi(session):
+    """Raport comenzi"""
     st.subheader("Raport Comenzi")
-    
+
     # Filtrare
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -208,37 +192,45 @@ with tab2:
         end_date_comenzi = st.date_input("Până la data:", value=datetime.now(), key="end_date_comenzi")
     with col3:
         status_comenzi = st.selectbox("Status:", ["Toate", "Doar facturate", "Doar nefacturate"])
-    
-    beneficiari = session.query(Beneficiar).all()
+
+    beneficiari = lista_beneficiari(session)
     beneficiar_options = ["Toți beneficiarii"] + [b.nume for b in beneficiari]
     selected_beneficiar = st.selectbox("Beneficiar:", beneficiar_options)
-    
+
     # Construire condiții de filtrare
     conditii = [
         Comanda.data >= start_date_comenzi,
         Comanda.data <= end_date_comenzi
     ]
-    
+
     if selected_beneficiar != "Toți beneficiarii":
         beneficiar_id = next((b.id for b in beneficiari if b.nume == selected_beneficiar), None)
         if beneficiar_id:
             conditii.append(Comanda.beneficiar_id == beneficiar_id)
-    
+
     if status_comenzi == "Doar facturate":
         conditii.append(Comanda.facturata == True)
     elif status_comenzi == "Doar nefacturate":
         conditii.append(Comanda.facturata == False)
-    
+
     # Obținere comenzi
-    comenzi = session.query(Comanda).join(Beneficiar).join(Hartie).filter(*conditii).all()
-    
+    # Doar coloanele afișate; beneficiarul și hârtia din același JOIN
+    comenzi = session.query(Comanda).join(Beneficiar).join(Hartie).options(
+        contains_eager(Comanda.beneficiar),
+        contains_eager(Comanda.hartie),
+        load_only(
+            Comanda.numar_comanda, Comanda.data, Comanda.nume_lucrare, Comanda.tiraj, Comanda.nr_pagini,
+            Comanda.ex_pe_coala, Comanda.total_coli, Comanda.pret, Comanda.facturata,
+        ),
+    ).filter(*conditii).all()
+
     if not comenzi:
         st.info("Nu există comenzi care să corespundă criteriilor selectate.")
     else:
         # Construire DataFrame
         data = []
         total_valoare = 0
-        
+
         for comanda in comenzi:
             data.append({
                 "Nr. Comandă": comanda.numar_comanda,
@@ -254,10 +246,10 @@ with tab2:
                 "Status": "Facturată" if comanda.facturata else "Nefacturată"
             })
             total_valoare += comanda.pret or 0
-        
+
         df = pd.DataFrame(data)
         st.dataframe(df, use_container_width=True)
-        
+
         # Statistici
         st.metric("Total comenzi", len(comenzi))
         col1, col2 = st.columns(2)
@@ -265,23 +257,25 @@ with tab2:
             st.metric("Comenzi facturate", len([c for c in comenzi if c.facturata]))
         with col2:
             st.metric("Valoare totală", f"{total_valoare:.2f} RON")
-        
+
         # Vizualizări
         st.subheader("Vizualizări")
-        
-        # Comenzi pe beneficiari
+
+        # Comenzi pe beneficiari - numărate în baza de date, primii 20
         if selected_beneficiar == "Toți beneficiarii":
-            comenzi_per_beneficiar = {}
-            for comanda in comenzi:
-                benef = comanda.beneficiar.nume
-                comenzi_per_beneficiar[benef] = comenzi_per_beneficiar.get(benef, 0) + 1
+            facturata = {"Doar facturate": True, "Doar nefacturate": False}.get(status_comenzi)
+            comenzi_per_beneficiar = raport_beneficiari(
+                session, start_date_comenzi, end_date_comenzi, limita=20, ordonare="nr_comenzi", facturata=facturata
+            )
 
-            df_viz = pd.DataFrame(list(comenzi_per_beneficiar.items()), columns=["Beneficiar", "Număr comenzi"])
-            fig = px.bar(df_viz, x="Beneficiar", y="Număr comenzi", title="Comenzi pe beneficiari")
+            df_viz = pd.DataFrame([(t.nume, t.nr_comenzi) for t in comenzi_per_beneficiar],
+                                  columns=["Beneficiar", "Număr comenzi"])
+            fig = px.bar(df_viz, x="Beneficiar", y="Număr comenzi", title="Comenzi pe beneficiari (top 20)")
             st.plotly_chart(fig, use_container_width=True)
 
-# Tab3 - raport stoc
-with tab3:
+
+def tab_stoc(session):
+    """Raport stoc"""
     st.subheader("Raport stoc hârtie")
     hartii = session.query(Hartie).all()
 
@@ -306,47 +300,73 @@ with tab3:
         fig_stoc = px.bar(df_stoc, x="Sortiment", y="Stoc (coli)", title="Stoc curent pe sortiment")
         st.plotly_chart(fig_stoc, use_container_width=True)
 
-# Tab4 - raport beneficiari
-with tab4:
+
+def tab_beneficiari(session):
+    """Raport beneficiari"""
     st.subheader("Raport beneficiari activi")
-    comenzi = session.query(Comanda).join(Beneficiar).all()
 
-    if not comenzi:
-        st.info("Nu există comenzi înregistrate.")
+    # Filtre: perioadă opțională și numărul de beneficiari afișați
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        filtru_perioada = st.checkbox("Doar pentru o perioadă", key="filtru_perioada_beneficiari")
+    with col2:
+        start_date_beneficiari = st.date_input("De la data:", value=datetime.now().replace(day=1, month=1),
+                                               key="start_date_beneficiari", disabled=not filtru_perioada)
+    with col3:
+        end_date_beneficiari = st.date_input("Până la data:", value=datetime.now(),
+                                             key="end_date_beneficiari", disabled=not filtru_perioada)
+    top_beneficiari = st.selectbox("Afișează:", ["Top 10", "Top 20", "Top 50", "Toți beneficiarii"],
+                                   key="top_beneficiari")
+    limita_beneficiari = None if top_beneficiari == "Toți beneficiarii" else int(top_beneficiari.split()[1])
+
+    if filtru_perioada and start_date_beneficiari > end_date_beneficiari:
+        st.error("Data de început trebuie să fie anterioară datei de sfârșit!")
     else:
-        beneficiari_stats = {}
-        for comanda in comenzi:
-            benef = comanda.beneficiar.nume
-            if benef not in beneficiari_stats:
-                beneficiari_stats[benef] = {"nr_comenzi": 0, "valoare": 0.0}
-            beneficiari_stats[benef]["nr_comenzi"] += 1
-            beneficiari_stats[benef]["valoare"] += comanda.pret or 0.0
-
-        df_beneficiari = pd.DataFrame([
-            {"Beneficiar": k, "Număr comenzi": v["nr_comenzi"], "Valoare totală (RON)": round(v["valoare"], 2)}
-            for k, v in beneficiari_stats.items()
-        ])
-        st.dataframe(df_beneficiari, use_container_width=True)
-
-        fig = px.pie(
-            df_beneficiari,
-            values="Valoare totală (RON)",
-            names="Beneficiar",
-            title="Distribuție valoare comenzi pe beneficiari",
-            hole=0.4
+        # Agregarea se face în baza de date - se citesc doar rândurile pe beneficiar
+        totaluri_beneficiari = raport_beneficiari(
+            session,
+            data_inceput=start_date_beneficiari if filtru_perioada else None,
+            data_sfarsit=end_date_beneficiari if filtru_perioada else None,
+            limita=limita_beneficiari,
         )
-        st.plotly_chart(fig, use_container_width=True)
-
-        if st.button("Export raport beneficiari"):
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                df_beneficiari.to_excel(writer, sheet_name="Beneficiari", index=False)
-            buffer.seek(0)
-            st.download_button(
-                label="Descarcă Excel",
-                data=buffer,
-                file_name="raport_beneficiari.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+        if not totaluri_beneficiari:
+            st.info("Nu există comenzi pentru criteriile selectate.")
+        else:
+            df_beneficiari = pd.DataFrame([
+                {"Beneficiar": t.nume, "Număr comenzi": t.nr_comenzi, "Valoare totală (RON)": round(t.valoare, 2)}
+                for t in totaluri_beneficiari
+            ])
+            st.dataframe(df_beneficiari, use_container_width=True)
+
+            fig = px.pie(
+                df_beneficiari,
+                values="Valoare totală (RON)",
+                names="Beneficiar",
+                title="Distribuție valoare comenzi pe beneficiari",
+                hole=0.4
             )
+            st.plotly_chart(fig, use_container_width=True)
+
+            if st.button("Export raport beneficiari"):
+                buffer = io.BytesIO()
+                with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+                    df_beneficiari.to_excel(writer, sheet_name="Beneficiari", index=False)
+                buffer.seek(0)
+                st.download_button(
+                    label="Descarcă Excel",
+                    data=buffer,
+                    file_name="raport_beneficiari.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+
 
-session.close()
+# Sesiune cu baza de date - închisă automat la orice ieșire din pagină (inclusiv st.stop/st.rerun)
+with sesiune() as session:
+    # Doar secțiunea activă se execută (vezi utils/navigare.py)
+    afiseaza_sectiunea("sectiune_rapoarte", {
+        "Consum Hârtie": tab_consum_hartie,
+        "Comenzi": tab_comenzi,
+        "Stoc": tab_stoc,
+        "Beneficiari": tab_beneficiari,
+    }, session)
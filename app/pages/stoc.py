@@ -2,9 +2,16 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from models import get_session
+from models import sesiune
 from models.stoc import Stoc
 from models.hartie import Hartie
+from sqlalchemy.orm import contains_eager
+from utils.paginare import PaginareKeyset
+from services.cache_referinte import lista_hartii, invalideaza_referinte
+from services.registru_stoc import inregistreaza_miscare, StocInsuficient
+from services.cautare import cauta_intrari_stoc
+from utils.navigare import afiseaza_sectiunea
+from utils.cautare import selector_cautare
 import os
 from dotenv import load_dotenv
 
@@ -56,64 +63,65 @@ if not check_password():
 
 st.title("Gestiune Stoc")
 
-# Inițializarea sesiunii cu baza de date
-session = get_session()
 
-# Tabs pentru diferite acțiuni
-tab1, tab2, tab3 = st.tabs(["Lista Intrări Stoc", "Adaugă Intrare", "Șterge Intrare"])
-
-with tab1:
+def tab_lista_intrari(session):
+    """Lista intrărilor în stoc"""
     # Cod pentru listare intrări stoc
     st.subheader("Lista Intrări Stoc")
-    
+
     # Filtrare după dată
     col1, col2 = st.columns(2)
     with col1:
         data_inceput = st.date_input("De la data:", value=datetime.now().replace(day=1))
     with col2:
         data_sfarsit = st.date_input("Până la data:", value=datetime.now())
-    
-    # Obținere date
-    intrari = session.query(Stoc).join(Hartie).filter(
+
+    # Obținere date - paginat keyset pe (data, id), cele mai noi intrări primele
+    query_intrari = session.query(Stoc).join(Hartie).options(contains_eager(Stoc.hartie)).filter(
         Stoc.data >= data_inceput,
         Stoc.data <= data_sfarsit
-    ).all()
-    
+    )
+    paginare_intrari = PaginareKeyset("paginare_intrari_stoc", [Stoc.data, Stoc.id])
+    intrari = paginare_intrari.pagina(query_intrari, lambda i: (i.data, i.id))
+
+    def rand_intrare(intrare):
+        return {
+            "ID": intrare.id,
+            "Data": intrare.data.strftime("%d-%m-%Y"),
+            "Sortiment Hârtie": intrare.hartie.sortiment,
+            "Format": intrare.hartie.format_hartie,
+            "Gramaj": f"{intrare.hartie.gramaj} g/m²",
+            "Cantitate Intrată": f"{int(intrare.cantitate) if intrare.cantitate == int(intrare.cantitate) else intrare.cantitate} coli",
+            "Nr. Factură": intrare.nr_factura,
+            "Furnizor": intrare.furnizor,
+            "Cod Certificare": intrare.cod_certificare or "-"
+        }
+
     # Construire DataFrame pentru afișare
     if intrari:
-        data = []
-        for intrare in intrari:
-            data.append({
-                "ID": intrare.id,
-                "Data": intrare.data.strftime("%d-%m-%Y"),
-                "Sortiment Hârtie": intrare.hartie.sortiment,
-                "Format": intrare.hartie.format_hartie,
-                "Gramaj": f"{intrare.hartie.gramaj} g/m²",
-                "Cantitate Intrată": f"{int(intrare.cantitate) if intrare.cantitate == int(intrare.cantitate) else intrare.cantitate} coli",
-                "Nr. Factură": intrare.nr_factura,
-                "Furnizor": intrare.furnizor,
-                "Cod Certificare": intrare.cod_certificare or "-"
-            })
-        
         # Afișare tabel
-        df = pd.DataFrame(data)
+        df = pd.DataFrame([rand_intrare(intrare) for intrare in intrari])
         st.dataframe(df, use_container_width=True)
-        
-        # Export opțiuni
+        paginare_intrari.controale()
+
+        # Export opțiuni - exportul cuprinde toată perioada, nu doar pagina curentă
         if st.button("Export Excel"):
-            df.to_excel("intrari_stoc.xlsx", index=False)
+            toate = query_intrari.order_by(Stoc.data.desc(), Stoc.id.desc()).all()
+            pd.DataFrame([rand_intrare(intrare) for intrare in toate]).to_excel("intrari_stoc.xlsx", index=False)
             st.success("Datele au fost exportate în fișierul intrari_stoc.xlsx!")
     else:
         st.info("Nu există intrări de stoc pentru perioada selectată.")
 
-with tab2:
+
+def tab_adauga_intrare(session):
+    """Formularul pentru o intrare nouă în stoc"""
     # Cod pentru adăugare intrare stoc
     st.subheader("Adaugă Intrare Stoc Nouă")
-    
+
     # Formular pentru intrare stoc
     with st.form("add_stoc_form"):
         # Selectare hârtie
-        hartii = session.query(Hartie).all()
+        hartii = lista_hartii(session)
         if not hartii:
             st.warning("Nu există sortimente de hârtie definite. Adaugă mai întâi un sortiment de hârtie.")
             submitted = st.form_submit_button("Adaugă Intrare", disabled=True)
@@ -121,39 +129,39 @@ with tab2:
             hartie_options = [f"{h.id} - {h.sortiment} ({h.format_hartie}, {h.gramaj}g)" for h in hartii]
             selected_hartie = st.selectbox("Selectează sortiment hârtie*:", hartie_options)
             hartie_id = int(selected_hartie.split(" - ")[0])
-            
+
             # Detalii intrare
             col1, col2 = st.columns(2)
             with col1:
                 cantitate = st.number_input("Cantitate (coli)*:", min_value=0.1, step=0.1, value=100.0)
             with col2:
                 nr_factura = st.text_input("Număr factură achiziție*:")
-            
+
             # Lista furnizorilor
             furnizori = ["Antalis International SRL", "Glass-Co Industries SRL", "Romanian Paper Distribution SRL", 
                         "AKI-Labels Bucharest SRL", "Europapier Romania S.R.L.", "Alt furnizor"]
             furnizor_selectat = st.selectbox("Furnizor*:", furnizori)
-            
+
             # Dacă selectează "Alt furnizor", permite introducere manuală
             if furnizor_selectat == "Alt furnizor":
                 furnizor = st.text_input("Introduceți numele furnizorului*:")
             else:
                 furnizor = furnizor_selectat
-            
+
             col1, col2 = st.columns(2)
             with col1:
                 data = st.date_input("Data intrare*:", value=datetime.now())
             with col2:
                 cod_certificare = st.text_input("Cod certificare furnizor:", placeholder="Ex: GV-COC-101533")
-            
+
             # Info hartie selectată
             hartie = session.query(Hartie).get(hartie_id)
             if hartie:
                 st.info(f"Stoc actual: {hartie.stoc} coli")
                 st.info(f"Stoc după adăugare: {hartie.stoc + cantitate} coli")
-            
+
             submitted = st.form_submit_button("Adaugă Intrare")
-        
+
         if submitted:
             # Validare date
             if not nr_factura:
@@ -175,64 +183,77 @@ with tab2:
                         data=data
                     )
                     session.add(intrare)
-                    
-                    # Actualizează stocul hârtiei
-                    hartie = session.query(Hartie).get(hartie_id)
-                    hartie.stoc += cantitate
-                    hartie.greutate = hartie.calculeaza_greutate()  # Recalculare greutate
-                    
+                    session.flush()
+
+                    # Actualizează stocul hârtiei și registrul de stoc
+                    inregistreaza_miscare(
+                        session, hartie_id, cantitate, "intrare",
+                        stoc_id=intrare.id, descriere=f"Factura {nr_factura} - {furnizor}",
+                    )
+
                     session.commit()
+                    invalideaza_referinte()
                     st.success(f"Intrarea de {cantitate} coli pentru '{hartie.sortiment}' a fost adăugată cu succes!")
                 except Exception as e:
                     session.rollback()
                     st.error(f"Eroare la adăugarea intrării în stoc: {e}")
 
-with tab3:
+
+def tab_sterge_intrare(session):
+    """Ștergerea unei intrări din stoc"""
     # Cod pentru ștergere intrare stoc
     st.subheader("Șterge Intrare Stoc")
-    
-    # Obținere lista intrări
-    intrari = session.query(Stoc).join(Hartie).all()
-    
-    if not intrari:
-        st.info("Nu există intrări de stoc în baza de date.")
-    else:
-        intrare_options = [f"{i.id} - {i.data.strftime('%d-%m-%Y')} - {i.hartie.sortiment} - {i.cantitate} coli - {i.furnizor}" for i in intrari]
-        selected_intrare = st.selectbox("Selectează intrarea de șters:", intrare_options)
-        
-        intrare_id = int(selected_intrare.split(" - ")[0])
-        intrare = session.query(Stoc).get(intrare_id)
-        
+
+    # Doar primele potriviri ale căutării, nu toate intrările
+    intrare_id = selector_cautare(
+        "sterge_intrare", "Selectează intrarea de șters:",
+        lambda text, limita: cauta_intrari_stoc(session, text, limita),
+        placeholder="Id, sortiment, factură sau furnizor...",
+    )
+
+    if intrare_id is not None:
+        intrare = session.get(Stoc, intrare_id)
+
         st.warning(f"""
-        **Atenție!** Vei șterge următoarea intrare:
-        - Data: {intrare.data.strftime('%d-%m-%Y')}
-        - Hârtie: {intrare.hartie.sortiment}
-        - Cantitate: {intrare.cantitate} coli
-        - Nr. Factură: {intrare.nr_factura}
-        - Furnizor: {intrare.furnizor}
-        
-        Stocul hârtiei va fi actualizat corespunzător.
-        """)
-        
+    **Atenție!** Vei șterge următoarea intrare:
+    - Data: {intrare.data.strftime('%d-%m-%Y')}
+    - Hârtie: {intrare.hartie.sortiment}
+    - Cantitate: {intrare.cantitate} coli
+    - Nr. Factură: {intrare.nr_factura}
+    - Furnizor: {intrare.furnizor}
+
+    Stocul hârtiei va fi actualizat corespunzător.
+    """)
+
         if st.button("Șterge Intrare", type="primary"):
             try:
-                # Actualizează stocul hârtiei
-                hartie = session.query(Hartie).get(intrare.hartie_id)
-                if hartie.stoc >= intrare.cantitate:
-                    hartie.stoc -= intrare.cantitate
-                    hartie.greutate = hartie.calculeaza_greutate()  # Recalculare greutate
-                else:
+                # Actualizează stocul hârtiei și registrul de stoc
+                try:
+                    inregistreaza_miscare(
+                        session, intrare.hartie_id, -intrare.cantitate, "anulare_intrare",
+                        stoc_id=intrare.id, descriere=f"Ștergere intrare: factura {intrare.nr_factura} - {intrare.furnizor}",
+                    )
+                except StocInsuficient:
+                    session.rollback()
                     st.error("Nu se poate șterge intrarea deoarece ar rezulta un stoc negativ!")
                     st.stop()
-                
+
                 # Șterge intrarea
                 session.delete(intrare)
                 session.commit()
+                invalideaza_referinte()
                 st.success("Intrarea a fost ștearsă cu succes și stocul a fost actualizat!")
                 st.rerun()
             except Exception as e:
                 session.rollback()
                 st.error(f"Eroare la ștergerea intrării: {e}")
 
-# Închidere sesiune
-session.close()
+
+# Sesiune cu baza de date - închisă automat la orice ieșire din pagină (inclusiv st.stop/st.rerun)
+with sesiune() as session:
+    # Doar secțiunea activă se execută (vezi utils/navigare.py)
+    afiseaza_sectiunea("sectiune_stoc", {
+        "Lista Intrări Stoc": tab_lista_intrari,
+        "Adaugă Intrare": tab_adauga_intrare,
+        "Șterge Intrare": tab_sterge_intrare,
+    }, session)
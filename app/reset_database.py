@@ -50,9 +50,19 @@ def reset_database():
         comenzi_count = cursor.rowcount
         logger.info(f"✅ {comenzi_count} comenzi șterse")
         
+        # Sumarele lunare pentru rapoarte rămân goale odată cu comenzile
+        for tabela in ("sumar_lunar_beneficiar", "sumar_lunar_hartie"):
+            cursor.execute("SELECT to_regclass(%s)", (tabela,))
+            if cursor.fetchone()[0]:
+                cursor.execute(f"DELETE FROM {tabela}")
+        
         # Resetează secvența pentru ID-uri comenzi
         logger.info("🔄 Resetare secvență comenzi...")
         cursor.execute("ALTER SEQUENCE comenzi_id_seq RESTART WITH 1")
+        cursor.execute("ALTER SEQUENCE IF EXISTS comenzi_numar_seq RESTART WITH 3033")
+        cursor.execute("SELECT to_regclass('contor_numerotare')")
+        if cursor.fetchone()[0]:
+            cursor.execute("UPDATE contor_numerotare SET valoare = 3032 WHERE nume = 'comenzi'")
         logger.info("✅ Secvență resetată")
         
         logger.info("🎉 Comenzile au fost șterse cu succes!")
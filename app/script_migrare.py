@@ -7,6 +7,11 @@ Modificări conform cerințelor din Aplicatie Copy Top_2.docx
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
+from services.calculator import randuri_compatibilitate
+from models import get_session
+from services.sumare import reconstruieste_sumare
+from models.comenzi import EXPRESIE_NR_COLI_TIPAR, EXPRESIE_TOTAL_COLI, Finisare
+from models.hartie import EXPRESIE_GREUTATE
 import logging
 
 # Configurare logging
@@ -33,6 +38,16 @@ def check_column_exists(cursor, table_name, column_name):
     """, (table_name, column_name))
     return cursor.fetchone()[0]
 
+def check_column_generated(cursor, table_name, column_name):
+    """Verifică dacă o coloană este generată (GENERATED ALWAYS AS ... STORED)"""
+    cursor.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns 
+            WHERE table_name = %s AND column_name = %s AND is_generated = 'ALWAYS'
+        )
+    """, (table_name, column_name))
+    return cursor.fetchone()[0]
+
 def migrate_comenzi_table_v3(cursor):
     """Adaugă câmpul nr_pagini_pe_coala în tabela comenzi"""
     logger.info("🔄 Migrare tabelă 'comenzi' - V3...")
@@ -129,6 +144,312 @@ def migrate_hartie_table_v7(cursor):
         cursor.execute("ALTER TABLE hartie ADD COLUMN furnizor VARCHAR(200)")
         logger.info("✅ Adăugată coloana 'furnizor' în tabela hartie")
 
+def migrate_compatibilitate_coala_v8(cursor):
+    """Creează tabela compatibilitate_coala (oglinda matricei format hârtie - coală tipar)"""
+    logger.info("🔄 Creare tabelă 'compatibilitate_coala' - V8...")
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS compatibilitate_coala (
+            id SERIAL PRIMARY KEY,
+            format_hartie VARCHAR(50) NOT NULL,
+            coala_tipar VARCHAR(50) NOT NULL,
+            indice INTEGER NOT NULL,
+            CONSTRAINT uq_compatibilitate_format_coala UNIQUE (format_hartie, coala_tipar)
+        )
+    """)
+    logger.info("✅ Creată tabela 'compatibilitate_coala'")
+
+def migrate_numerotare_comenzi_v9(cursor):
+    """Creează secvența și contorul pentru alocarea atomică a numerelor de comandă"""
+    logger.info("🔄 Creare secvență și contor numerotare comenzi - V9...")
+    
+    cursor.execute("CREATE SEQUENCE IF NOT EXISTS comenzi_numar_seq START WITH 3033")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contor_numerotare (
+            nume VARCHAR(50) PRIMARY KEY,
+            valoare INTEGER NOT NULL
+        )
+    """)
+    
+    # Ambele pornesc de la cel mai mare număr de comandă existent
+    cursor.execute("SELECT MAX(numar_comanda) FROM comenzi")
+    ultimul = cursor.fetchone()[0]
+    if ultimul is not None and ultimul >= 3033:
+        cursor.execute("SELECT setval('comenzi_numar_seq', %s)", (ultimul,))
+        cursor.execute("""
+            INSERT INTO contor_numerotare (nume, valoare) VALUES ('comenzi', %s)
+            ON CONFLICT (nume) DO UPDATE SET valoare = GREATEST(contor_numerotare.valoare, EXCLUDED.valoare)
+        """, (ultimul,))
+    else:
+        cursor.execute("""
+            INSERT INTO contor_numerotare (nume, valoare) VALUES ('comenzi', 3032)
+            ON CONFLICT (nume) DO NOTHING
+        """)
+    logger.info("✅ Creată secvența 'comenzi_numar_seq' și tabela 'contor_numerotare'")
+
+# Indexurile declarate pe modele (nume, tabelă, definiție)
+INDEXURI_V10 = [
+    ("ix_comenzi_stare_data", "comenzi", "(stare, data)"),
+    ("ix_comenzi_facturata_beneficiar", "comenzi", "(facturata, beneficiar_id)"),
+    ("ix_comenzi_hartie_data", "comenzi", "(hartie_id, data)"),
+    ("ix_comenzi_beneficiar_data", "comenzi", "(beneficiar_id, data)"),
+    ("ix_comenzi_data", "comenzi", "(data)"),
+    ("ix_comenzi_nr_factura", "comenzi", "(nr_factura)"),
+    ("ix_comenzi_nume_lucrare_trgm", "comenzi", "USING gin (nume_lucrare gin_trgm_ops)"),
+    ("ix_stoc_hartie_data", "stoc", "(hartie_id, data)"),
+    ("ix_stoc_data_id", "stoc", "(data, id)"),
+    ("ix_hartie_sortiment_trgm", "hartie", "USING gin (sortiment gin_trgm_ops)"),
+    ("ix_beneficiari_nume_trgm", "beneficiari", "USING gin (nume gin_trgm_ops)"),
+]
+
+def creeaza_indexuri(cursor, indexuri):
+    """Creează indexurile (nume, tabelă, definiție) care lipsesc, fără a bloca scrierile"""
+    trgm_disponibil = False
+    if any("gin_trgm_ops" in definitie for _, _, definitie in indexuri):
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        trgm_disponibil = cursor.fetchone() is not None
+        if trgm_disponibil:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        else:
+            logger.warning("⚠️ Extensia pg_trgm nu este disponibilă - indexurile pentru căutare se omit")
+    
+    for nume, tabela, definitie in indexuri:
+        if "gin_trgm_ops" in definitie and not trgm_disponibil:
+            continue
+        
+        # Un CREATE INDEX CONCURRENTLY întrerupt lasă un index invalid - se recreează
+        cursor.execute("""
+            SELECT i.indisvalid FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s
+        """, (nume,))
+        rand = cursor.fetchone()
+        if rand and rand[0]:
+            continue
+        if rand:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nume}")
+        
+        # CONCURRENTLY necesită autocommit (nu poate rula într-o tranzacție)
+        cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nume} ON {tabela} {definitie}")
+        logger.info(f"✅ Creat indexul '{nume}'")
+    
+    # Statistici actualizate pentru planificator
+    for tabela in sorted({tabela for _, tabela, _ in indexuri}):
+        cursor.execute(f"ANALYZE {tabela}")
+
+def migrate_indexuri_v10(cursor):
+    """Creează indexurile pentru filtrele și căutările uzuale, fără a bloca scrierile"""
+    logger.info("🔄 Creare indexuri - V10...")
+    creeaza_indexuri(cursor, INDEXURI_V10)
+
+def migrate_sumare_lunare_v11(cursor):
+    """Creează tabelele cu sumarele lunare pentru rapoarte (umplute de reconstruieste_sumare)"""
+    logger.info("🔄 Creare tabele sumare lunare - V11...")
+    
+    for tabela, dimensiune, referinta in (
+        ("sumar_lunar_beneficiar", "beneficiar_id", "beneficiari"),
+        ("sumar_lunar_hartie", "hartie_id", "hartie"),
+    ):
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {tabela} (
+                luna DATE NOT NULL,
+                {dimensiune} INTEGER NOT NULL REFERENCES {referinta}(id) ON DELETE CASCADE,
+                facturata BOOLEAN NOT NULL,
+                nr_comenzi INTEGER NOT NULL DEFAULT 0,
+                tiraj INTEGER NOT NULL DEFAULT 0,
+                total_coli INTEGER NOT NULL DEFAULT 0,
+                consum FLOAT NOT NULL DEFAULT 0,
+                valoare FLOAT NOT NULL DEFAULT 0,
+                PRIMARY KEY (luna, {dimensiune}, facturata)
+            )
+        """)
+        logger.info(f"✅ Creată tabela '{tabela}'")
+
+def migrate_registru_stoc_v12(cursor):
+    """Creează registrul de stoc și îl inițializează din intrările de stoc și comenzile finalizate"""
+    logger.info("🔄 Creare registru de stoc - V12...")
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS miscari_stoc (
+            id SERIAL PRIMARY KEY,
+            hartie_id INTEGER NOT NULL REFERENCES hartie(id),
+            data DATE NOT NULL,
+            tip VARCHAR(30) NOT NULL,
+            cantitate FLOAT NOT NULL,
+            sold FLOAT NOT NULL,
+            comanda_id INTEGER REFERENCES comenzi(id) ON DELETE SET NULL,
+            stoc_id INTEGER REFERENCES stoc(id) ON DELETE SET NULL,
+            descriere VARCHAR(200),
+            creat_la TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_miscari_stoc_hartie_data_id ON miscari_stoc (hartie_id, data, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_miscari_stoc_data ON miscari_stoc (data)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_miscari_stoc_comanda ON miscari_stoc (comanda_id)")
+    logger.info("✅ Creată tabela 'miscari_stoc'")
+    
+    cursor.execute("SELECT 1 FROM miscari_stoc LIMIT 1")
+    if cursor.fetchone():
+        logger.info("ℹ️  Registrul de stoc conține deja mișcări")
+        return
+    
+    # Consumul se calculează cu indicii din matrice - la prima rulare tabela este încă goală
+    sincronizeaza_compatibilitate_coala(cursor)
+    
+    # Istoricul reconstituit: intrările de stoc și consumul comenzilor finalizate/facturate
+    # (indicele 1 pentru combinațiile necunoscute, ca la scăderea stocului; datele viitoare
+    # se aduc la ziua curentă), precedate de un sold inițial ales astfel încât soldul
+    # final să fie stocul curent al hârtiei
+    cursor.execute("""
+        WITH miscari AS (
+            SELECT s.hartie_id, LEAST(s.data, CURRENT_DATE) AS data, 1 AS ordine, s.id AS ref, 'intrare' AS tip,
+                   s.cantitate::float AS cantitate, NULL::integer AS comanda_id, s.id AS stoc_id,
+                   LEFT('Factura ' || COALESCE(s.nr_factura, '') || ' - ' || COALESCE(s.furnizor, ''), 200) AS descriere
+            FROM stoc s
+            UNION ALL
+            SELECT c.hartie_id, LEAST(c.data, CURRENT_DATE), 2, c.id, 'consum',
+                   -(c.total_coli::float / COALESCE(NULLIF(cc.indice, 0), 1)), c.id, NULL,
+                   'Comanda #' || c.numar_comanda::bigint
+            FROM comenzi c
+            JOIN hartie h ON h.id = c.hartie_id
+            LEFT JOIN compatibilitate_coala cc
+                   ON cc.format_hartie = h.format_hartie AND cc.coala_tipar = c.coala_tipar
+            WHERE c.stare IN ('Finalizată', 'Facturată') AND c.total_coli > 0 AND c.coala_tipar IS NOT NULL
+        ),
+        initiale AS (
+            SELECT h.id AS hartie_id,
+                   LEAST(COALESCE(MIN(m.data), CURRENT_DATE), CURRENT_DATE) AS data,
+                   0 AS ordine, 0 AS ref, 'sold_initial' AS tip,
+                   COALESCE(h.stoc, 0) - COALESCE(SUM(m.cantitate), 0) AS cantitate,
+                   NULL::integer AS comanda_id, NULL::integer AS stoc_id,
+                   'Sold reconstituit la migrare' AS descriere
+            FROM hartie h
+            LEFT JOIN miscari m ON m.hartie_id = h.id
+            GROUP BY h.id, h.stoc
+        ),
+        toate AS (
+            SELECT * FROM initiale
+            UNION ALL
+            SELECT * FROM miscari
+        )
+        INSERT INTO miscari_stoc (hartie_id, data, tip, cantitate, sold, comanda_id, stoc_id, descriere, creat_la)
+        SELECT hartie_id, data, tip, cantitate,
+               SUM(cantitate) OVER (PARTITION BY hartie_id ORDER BY data, ordine, ref
+                                    ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW),
+               comanda_id, stoc_id, descriere, now()
+        FROM toate
+        ORDER BY hartie_id, data, ordine, ref
+    """)
+    logger.info(f"✅ Registrul de stoc inițializat ({cursor.rowcount} mișcări)")
+
+def migrate_versiuni_v13(cursor):
+    """Adaugă coloana versiune (blocare optimistă) în tabelele hartie și comenzi"""
+    logger.info("🔄 Migrare coloane 'versiune' - V13...")
+    
+    for tabela in ("hartie", "comenzi"):
+        if not check_column_exists(cursor, tabela, 'versiune'):
+            cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN versiune INTEGER NOT NULL DEFAULT 1")
+            logger.info(f"✅ Adăugată coloana 'versiune' în '{tabela}'")
+
+def migrate_coloane_generate_v14(cursor):
+    """Transformă cantitățile derivate în coloane generate de PostgreSQL"""
+    logger.info("🔄 Migrare coloane generate - V14...")
+    
+    if not check_column_generated(cursor, 'comenzi', 'total_coli'):
+        # Valorile salvate anterior de aplicație pot diferi de formulă - se raportează înainte de recalculare
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM comenzi
+            WHERE nr_coli_tipar IS DISTINCT FROM ({EXPRESIE_NR_COLI_TIPAR})
+               OR total_coli IS DISTINCT FROM ({EXPRESIE_TOTAL_COLI})
+        """)
+        diferite = cursor.fetchone()[0]
+        if diferite:
+            logger.warning(f"⚠️ {diferite} comenzi aveau nr_coli_tipar/total_coli diferite de formulă - se recalculează")
+        
+        # O coloană existentă nu poate deveni generată - se recreează (o singură rescriere a tabelei)
+        cursor.execute(f"""
+            ALTER TABLE comenzi
+                DROP COLUMN IF EXISTS total_coli,
+                DROP COLUMN IF EXISTS nr_coli_tipar,
+                ADD COLUMN nr_coli_tipar INTEGER GENERATED ALWAYS AS ({EXPRESIE_NR_COLI_TIPAR}) STORED,
+                ADD COLUMN total_coli INTEGER GENERATED ALWAYS AS ({EXPRESIE_TOTAL_COLI}) STORED
+        """)
+        logger.info("✅ Coloanele 'nr_coli_tipar' și 'total_coli' sunt generate")
+    
+    if not check_column_generated(cursor, 'hartie', 'greutate'):
+        cursor.execute(f"""
+            ALTER TABLE hartie
+                DROP COLUMN IF EXISTS greutate,
+                ADD COLUMN greutate FLOAT GENERATED ALWAYS AS ({EXPRESIE_GREUTATE}) STORED
+        """)
+        logger.info("✅ Coloana 'greutate' din 'hartie' este generată")
+
+# Coloanele căutate de selectoarele cu căutare pe server (services/cautare.py)
+INDEXURI_V15 = [
+    ("ix_comenzi_nr_factura_trgm", "comenzi", "USING gin (nr_factura gin_trgm_ops)"),
+    ("ix_stoc_nr_factura_trgm", "stoc", "USING gin (nr_factura gin_trgm_ops)"),
+    ("ix_stoc_furnizor_trgm", "stoc", "USING gin (furnizor gin_trgm_ops)"),
+]
+
+def migrate_indexuri_cautare_v15(cursor):
+    """Indexuri pg_trgm pentru căutarea după factură și furnizor"""
+    logger.info("🔄 Creare indexuri pentru căutare - V15...")
+    creeaza_indexuri(cursor, INDEXURI_V15)
+
+def migrate_finisari_v16(cursor):
+    """Înlocuiește coloanele booleene de finisare cu biții coloanei finisari"""
+    logger.info("🔄 Migrare finisări în coloana 'finisari' - V16...")
+    
+    # Coloanele vechi poartă numele biților (big, capsat, ..., taiere_cutter)
+    vechi = [f for f in Finisare if check_column_exists(cursor, 'comenzi', f.name.lower())]
+    
+    # Adăugare, copiere și ștergere într-o singură tranzacție - conexiunea este în autocommit
+    cursor.execute("BEGIN")
+    try:
+        cursor.execute("ALTER TABLE comenzi ADD COLUMN IF NOT EXISTS finisari INTEGER NOT NULL DEFAULT 0")
+        if vechi:
+            biti = " | ".join(f"(CASE WHEN {f.name.lower()} THEN {f.value} ELSE 0 END)" for f in vechi)
+            cursor.execute(f"UPDATE comenzi SET finisari = finisari | {biti}")
+            logger.info(f"✅ Copiate finisările pentru {cursor.rowcount} comenzi")
+            cursor.execute("ALTER TABLE comenzi " + ", ".join(f"DROP COLUMN {f.name.lower()}" for f in vechi))
+            logger.info(f"✅ Șterse coloanele {', '.join(f.name.lower() for f in vechi)}")
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    
+    creeaza_indexuri(cursor, [
+        ("ix_comenzi_data_finisari", "comenzi", "(data, finisari) WHERE finisari <> 0"),
+    ])
+
+def reconstruieste_sumare_lunare():
+    """Recalculează sumarele lunare (consumul depinde de matricea de compatibilitate)"""
+    session = get_session()
+    try:
+        reconstruieste_sumare(session)
+        session.commit()
+    finally:
+        session.close()
+    logger.info("✅ Sumarele lunare pentru rapoarte au fost recalculate")
+
+def sincronizeaza_compatibilitate_coala(cursor):
+    """Aduce tabela compatibilitate_coala la zi cu matricea din services/calculator.py"""
+    randuri = randuri_compatibilitate()
+    for format_hartie, coala_tipar, indice in randuri:
+        cursor.execute("""
+            INSERT INTO compatibilitate_coala (format_hartie, coala_tipar, indice)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (format_hartie, coala_tipar) DO UPDATE SET indice = EXCLUDED.indice
+        """, (format_hartie, coala_tipar, indice))
+    
+    # Elimină combinațiile care nu mai există în matrice
+    cursor.execute("SELECT id, format_hartie, coala_tipar FROM compatibilitate_coala")
+    existente = {(f, c) for f, c, _ in randuri}
+    for id_rand, format_hartie, coala_tipar in cursor.fetchall():
+        if (format_hartie, coala_tipar) not in existente:
+            cursor.execute("DELETE FROM compatibilitate_coala WHERE id = %s", (id_rand,))
+    logger.info(f"✅ Sincronizată matricea de compatibilitate ({len(randuri)} combinații)")
+
 def main():
     """Funcția principală de migrare V3"""
     logger.info("🚀 Începe migrarea bazei de date Copy Top v3.0")
@@ -246,6 +567,172 @@ def main():
         else:
             logger.info("✅ Migrarea v7.0 a fost deja aplicată")
         
+        # Verifică dacă migrarea v8 a fost deja aplicată
+        cursor.execute("SELECT version FROM migration_history WHERE version = 'v8.0'")
+        if not cursor.fetchone():
+            logger.info("🔄 Aplicare migrare v8.0...")
+            
+            # Aplicare migrări v8
+            migrate_compatibilitate_coala_v8(cursor)
+            
+            # Înregistrează migrarea v8
+            cursor.execute("""
+                INSERT INTO migration_history (version, description) 
+                VALUES ('v8.0', 'Adăugare tabelă compatibilitate_coala pentru rapoartele SQL de consum hârtie')
+            """)
+            logger.info("📝 Migrarea v8.0 înregistrată în istoric")
+            logger.info("🎉 Migrarea v8.0 s-a finalizat cu succes!")
+        else:
+            logger.info("✅ Migrarea v8.0 a fost deja aplicată")
+        
+        # Verifică dacă migrarea v9 a fost deja aplicată
+        cursor.execute("SELECT version FROM migration_history WHERE version = 'v9.0'")
+        if not cursor.fetchone():
+            logger.info("🔄 Aplicare migrare v9.0...")
+            
+            # Aplicare migrări v9
+            migrate_numerotare_comenzi_v9(cursor)
+            
+            # Înregistrează migrarea v9
+            cursor.execute("""
+                INSERT INTO migration_history (version, description) 
+                VALUES ('v9.0', 'Secvență și contor pentru alocarea numerelor de comandă')
+            """)
+            logger.info("📝 Migrarea v9.0 înregistrată în istoric")
+            logger.info("🎉 Migrarea v9.0 s-a finalizat cu succes!")
+        else:
+            logger.info("✅ Migrarea v9.0 a fost deja aplicată")
+        
+        # Verifică dacă migrarea v10 a fost deja aplicată
+        cursor.execute("SELECT version FROM migration_history WHERE version = 'v10.0'")
+        if not cursor.fetchone():
+            logger.info("🔄 Aplicare migrare v10.0...")
+            
+            # Aplicare migrări v10
+            migrate_indexuri_v10(cursor)
+            
+            # Înregistrează migrarea v10
+            cursor.execute("""
+                INSERT INTO migration_history (version, description) 
+                VALUES ('v10.0', 'Indexuri pentru filtre (stare, dată, facturare, hârtie) și căutări pg_trgm')
+            """)
+            logger.info("📝 Migrarea v10.0 înregistrată în istoric")
+            logger.info("🎉 Migrarea v10.0 s-a finalizat cu succes!")
+        else:
+            logger.info("✅ Migrarea v10.0 a fost deja aplicată")
+        
+        # Verifică dacă migrarea v11 a fost deja aplicată
+        cursor.execute("SELECT version FROM migration_history WHERE version = 'v11.0'")
+        if not cursor.fetchone():
+            logger.info("🔄 Aplicare migrare v11.0...")
+            
+            # Aplicare migrări v11
+            migrate_sumare_lunare_v11(cursor)
+            
+            # Înregistrează migrarea v11
+            cursor.execute("""
+                INSERT INTO migration_history (version, description) 
+                VALUES ('v11.0', 'Sumare lunare pe beneficiar și pe hârtie pentru rapoarte')
+            """)
+            logger.info("📝 Migrarea v11.0 înregistrată în istoric")
+            logger.info("🎉 Migrarea v11.0 s-a finalizat cu succes!")
+        else:
+            logger.info("✅ Migrarea v11.0 a fost deja aplicată")
+        
+        # Verifică dacă migrarea v12 a fost deja aplicată
+        cursor.execute("SELECT version FROM migration_history WHERE version = 'v12.0'")
+        if not cursor.fetchone():
+            logger.info("🔄 Aplicare migrare v12.0...")
+            
+            # Aplicare migrări v12
+            migrate_registru_stoc_v12(cursor)
+            
+            # Înregistrează migrarea v12
+            cursor.execute("""
+                INSERT INTO migration_history (version, description) 
+                VALUES ('v12.0', 'Registru de stoc (miscari_stoc) cu solduri curente')
+            """)
+            logger.info("📝 Migrarea v12.0 înregistrată în istoric")
+            logger.info("🎉 Migrarea v12.0 s-a finalizat cu succes!")
+        else:
+            logger.info("✅ Migrarea v12.0 a fost deja aplicată")
+        
+        # Verifică dacă migrarea v13 a fost deja aplicată
+        cursor.execute("SELECT version FROM migration_history WHERE version = 'v13.0'")
+        if not cursor.fetchone():
+            logger.info("🔄 Aplicare migrare v13.0...")
+            
+            # Aplicare migrări v13
+            migrate_versiuni_v13(cursor)
+            
+            # Înregistrează migrarea v13
+            cursor.execute("""
+                INSERT INTO migration_history (version, description) 
+                VALUES ('v13.0', 'Coloana versiune pentru blocarea optimistă a hârtiilor și comenzilor')
+            """)
+            logger.info("📝 Migrarea v13.0 înregistrată în istoric")
+            logger.info("🎉 Migrarea v13.0 s-a finalizat cu succes!")
+        else:
+            logger.info("✅ Migrarea v13.0 a fost deja aplicată")
+        
+        # Verifică dacă migrarea v14 a fost deja aplicată
+        cursor.execute("SELECT version FROM migration_history WHERE version = 'v14.0'")
+        if not cursor.fetchone():
+            logger.info("🔄 Aplicare migrare v14.0...")
+            
+            # Aplicare migrări v14
+            migrate_coloane_generate_v14(cursor)
+            
+            # Înregistrează migrarea v14
+            cursor.execute("""
+                INSERT INTO migration_history (version, description) 
+                VALUES ('v14.0', 'Coloane generate: nr_coli_tipar și total_coli (comenzi), greutate (hartie)')
+            """)
+            logger.info("📝 Migrarea v14.0 înregistrată în istoric")
+            logger.info("🎉 Migrarea v14.0 s-a finalizat cu succes!")
+        else:
+            logger.info("✅ Migrarea v14.0 a fost deja aplicată")
+        
+        # Verifică dacă migrarea v15 a fost deja aplicată
+        cursor.execute("SELECT version FROM migration_history WHERE version = 'v15.0'")
+        if not cursor.fetchone():
+            logger.info("🔄 Aplicare migrare v15.0...")
+            
+            # Aplicare migrări v15
+            migrate_indexuri_cautare_v15(cursor)
+            
+            # Înregistrează migrarea v15
+            cursor.execute("""
+                INSERT INTO migration_history (version, description) 
+                VALUES ('v15.0', 'Indexuri pg_trgm pentru căutarea comenzilor și intrărilor de stoc după factură și furnizor')
+            """)
+            logger.info("📝 Migrarea v15.0 înregistrată în istoric")
+            logger.info("🎉 Migrarea v15.0 s-a finalizat cu succes!")
+        else:
+            logger.info("✅ Migrarea v15.0 a fost deja aplicată")
+        
+        # Verifică dacă migrarea v16 a fost deja aplicată
+        cursor.execute("SELECT version FROM migration_history WHERE version = 'v16.0'")
+        if not cursor.fetchone():
+            logger.info("🔄 Aplicare migrare v16.0...")
+            
+            # Aplicare migrări v16
+            migrate_finisari_v16(cursor)
+            
+            # Înregistrează migrarea v16
+            cursor.execute("""
+                INSERT INTO migration_history (version, description) 
+                VALUES ('v16.0', 'Opțiunile de finisare ca biți în coloana finisari')
+            """)
+            logger.info("📝 Migrarea v16.0 înregistrată în istoric")
+            logger.info("🎉 Migrarea v16.0 s-a finalizat cu succes!")
+        else:
+            logger.info("✅ Migrarea v16.0 a fost deja aplicată")
+        
+        # Matricea din cod este sursa de adevăr - se resincronizează la fiecare rulare
+        sincronizeaza_compatibilitate_coala(cursor)
+        reconstruieste_sumare_lunare()
+        
         logger.info("🎉 Toate migrările s-au finalizat cu succes!")
         
         cursor.close()
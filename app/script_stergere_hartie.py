@@ -8,6 +8,7 @@ NU șterge: beneficiarii, lista de hârtii, comenzile
 from models import get_session
 from models.stoc import Stoc
 from models.hartie import Hartie
+from services.registru_stoc import corecteaza_stoc
 
 def sterge_intrari_hartie():
     """Șterge toate intrările de hârtie din tabelul Stoc"""
@@ -39,10 +40,9 @@ def sterge_intrari_hartie():
         # IMPORTANT: Resetează stocul hârtiilor la 0
         # (deoarece intrările de stoc au fost șterse)
         print("\n📊 Resetare stoc hârtii la 0...")
-        hartii = session.query(Hartie).all()
-        for hartie in hartii:
-            hartie.stoc = 0
-            hartie.greutate = 0
+        # Registrul de stoc păstrează istoricul: resetarea este o corecție
+        for (hartie_id,) in session.query(Hartie.id).order_by(Hartie.id).all():
+            corecteaza_stoc(session, hartie_id, 0, "Resetare stoc (ștergere intrări)")
         
         session.commit()
         
@@ -0,0 +1,127 @@
+# app/services/cache_pdf.py
+"""
+Cache pe disc pentru PDF-urile comenzilor, adresat după conținut.
+
+Cheia este un SHA-256 al câmpurilor randate (comandă, beneficiar, hârtie -
+aceleași date simple trimise proceselor de randare) plus versiunea
+șablonului din utils/pdf_utils.py. Orice modificare a comenzii schimbă
+cheia, deci nu este nevoie de invalidare explicită; intrările vechi ies
+din cache prin evacuare LRU când dimensiunea depășește PDF_CACHE_MAX_MB.
+
+Ultima accesare este marcată prin mtime-ul fișierului; scrierile sunt
+atomice (fișier temporar + os.replace), deci cache-ul poate fi folosit
+simultan de mai multe sesiuni și procese.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from config import PDF_CACHE_DIR, PDF_CACHE_MAX_MB
+from utils.pdf_utils import genereaza_comanda_pdf, date_comanda, obiecte_comanda, VERSIUNE_SABLON
+
+_LIMITA_OCTETI = PDF_CACHE_MAX_MB * 1024 * 1024
+
+_lock = threading.Lock()
+_dimensiune_estimata = None
+
+
+def cheie_pdf(date):
+    """
+    Cheia de cache pentru datele simple ale unei comenzi (vezi `date_comanda`)
+
+    Returns:
+        str: SHA-256 hex al câmpurilor randate și al versiunii șablonului
+    """
+    continut = json.dumps({"sablon": VERSIUNE_SABLON, "date": date}, sort_keys=True, default=str)
+    return hashlib.sha256(continut.encode("utf-8")).hexdigest()
+
+
+def _cale(cheie):
+    # Subdirectoare după primele caractere, pentru directoare de dimensiune rezonabilă
+    return os.path.join(PDF_CACHE_DIR, cheie[:2], f"{cheie}.pdf")
+
+
+def _fisiere():
+    for radacina, _, nume_fisiere in os.walk(PDF_CACHE_DIR):
+        for nume in nume_fisiere:
+            if nume.endswith(".pdf"):
+                cale = os.path.join(radacina, nume)
+                try:
+                    yield cale, os.stat(cale)
+                except OSError:
+                    pass
+
+
+def _evacueaza():
+    """Șterge cele mai vechi intrări (după ultima accesare) până sub 90% din limită"""
+    global _dimensiune_estimata
+    fisiere = sorted(_fisiere(), key=lambda f: f[1].st_mtime)
+    total = sum(stat.st_size for _, stat in fisiere)
+    tinta = _LIMITA_OCTETI * 0.9
+    for cale, stat in fisiere:
+        if total <= tinta:
+            break
+        try:
+            os.remove(cale)
+            total -= stat.st_size
+        except OSError:
+            pass
+    _dimensiune_estimata = total
+
+
+def citeste(cheie):
+    """Returnează conținutul PDF din cache sau None; marchează intrarea ca folosită recent"""
+    cale = _cale(cheie)
+    try:
+        with open(cale, "rb") as fisier:
+            continut = fisier.read()
+        os.utime(cale)
+        return continut
+    except OSError:
+        return None
+
+
+def scrie(cheie, continut):
+    """Salvează un PDF în cache și aplică limita de dimensiune"""
+    global _dimensiune_estimata
+    cale = _cale(cheie)
+    os.makedirs(os.path.dirname(cale), exist_ok=True)
+    fd, temporar = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(cale))
+    with os.fdopen(fd, "wb") as fisier:
+        fisier.write(continut)
+    os.replace(temporar, cale)
+
+    with _lock:
+        if _dimensiune_estimata is None:
+            _dimensiune_estimata = sum(stat.st_size for _, stat in _fisiere())
+        else:
+            _dimensiune_estimata += len(continut)
+        if _dimensiune_estimata > _LIMITA_OCTETI:
+            _evacueaza()
+
+
+def pdf_din_date(date):
+    """
+    PDF-ul unei comenzi din datele simple, servit din cache când există
+
+    Returns:
+        bytes: Conținutul PDF
+    """
+    cheie = cheie_pdf(date)
+    continut = citeste(cheie)
+    if continut is None:
+        continut = genereaza_comanda_pdf(*obiecte_comanda(date)).getvalue()
+        scrie(cheie, continut)
+    return continut
+
+
+def pdf_comanda(comanda, beneficiar=None, hartie=None):
+    """
+    PDF-ul unei comenzi ORM, servit din cache când comanda nu s-a modificat
+
+    Returns:
+        io.BytesIO: Buffer-ul PDF (ca `genereaza_comanda_pdf`)
+    """
+    return io.BytesIO(pdf_din_date(date_comanda(comanda, beneficiar, hartie)))
@@ -0,0 +1,90 @@
+# app/services/cache_referinte.py
+"""
+Cache pentru datele de referință folosite în dropdown-uri (beneficiari, hârtii).
+
+Listele sunt păstrate în memorie cu `st.cache_data`, partajate între toate
+sesiunile procesului. Cheia cache-ului include un număr de versiune global,
+incrementat de `invalideaza_referinte()` după fiecare commit care modifică
+beneficiarii, sortimentele de hârtie sau stocul - astfel dropdown-urile nu
+mai interoghează baza la fiecare rerun, dar nici nu rămân neactualizate.
+
+Se returnează tuple simple (nu obiecte ORM), nelegate de vreo sesiune.
+"""
+import threading
+from collections import namedtuple
+import streamlit as st
+from models.beneficiari import Beneficiar
+from models.hartie import Hartie
+
+ReferintaBeneficiar = namedtuple("ReferintaBeneficiar", ["id", "nume"])
+
+ReferintaHartie = namedtuple("ReferintaHartie", [
+    "id",
+    "sortiment",
+    "format_hartie",
+    "gramaj",
+    "stoc",
+    "fsc_materie_prima",
+    "cod_fsc_materie_prima",
+])
+
+# Durata maximă de viață a unei intrări, ca plasă de siguranță pentru
+# modificări făcute direct în baza de date (scripturi, alte procese)
+TTL_SECUNDE = 600
+
+_lock = threading.Lock()
+_versiune = 0
+
+
+def versiune_referinte():
+    """Versiunea curentă a datelor de referință"""
+    return _versiune
+
+
+def invalideaza_referinte():
+    """Marchează datele de referință ca modificate - se apelează după commit"""
+    global _versiune
+    with _lock:
+        _versiune += 1
+
+
+@st.cache_data(ttl=TTL_SECUNDE, max_entries=4, show_spinner=False)
+def _incarca_beneficiari(_session, versiune):
+    rows = _session.query(Beneficiar.id, Beneficiar.nume).order_by(Beneficiar.nume).all()
+    return [ReferintaBeneficiar(*row) for row in rows]
+
+
+@st.cache_data(ttl=TTL_SECUNDE, max_entries=4, show_spinner=False)
+def _incarca_hartii(_session, versiune):
+    rows = _session.query(*[getattr(Hartie, camp) for camp in ReferintaHartie._fields]).order_by(Hartie.sortiment).all()
+    return [ReferintaHartie(*row) for row in rows]
+
+
+def lista_beneficiari(session):
+    """
+    Lista beneficiarilor sortată alfabetic
+
+    Args:
+        session: Sesiunea SQLAlchemy (folosită doar la reîncărcarea cache-ului)
+
+    Returns:
+        list[ReferintaBeneficiar]: Tuple (id, nume)
+    """
+    return _incarca_beneficiari(session, _versiune)
+
+
+def lista_hartii(session, doar_in_stoc=False):
+    """
+    Lista sortimentelor de hârtie sortată după sortiment
+
+    Args:
+        session: Sesiunea SQLAlchemy (folosită doar la reîncărcarea cache-ului)
+        doar_in_stoc: Returnează doar sortimentele cu stoc > 0
+
+    Returns:
+        list[ReferintaHartie]: Câmpurile necesare selectoarelor
+    """
+    rezultat = _incarca_hartii(session, _versiune)
+    if doar_in_stoc:
+        return [h for h in rezultat if h.stoc > 0]
+    return rezultat
@@ -0,0 +1,311 @@
+# app/services/calculator.py
+"""
+Calcule pentru consumul și greutatea hârtiei.
+
+Matricea de compatibilitate format hârtie - coală tipar este încărcată o
+singură dată, la importul modulului, într-o structură imuabilă. Aceeași
+matrice este oglindită în tabela `compatibilitate_coala`, astfel încât
+rapoartele SQL pot face JOIN pe ea.
+
+Funcțiile de calcul primesc coloane întregi (array, listă, Series sau un
+singur scalar) și returnează array-uri NumPy, deci rapoartele pe un an de
+comenzi se calculează fără bucle Python. Metodele modelelor delegă aici.
+"""
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+
+# Matricea de compatibilitate (conform PDF-ului): format hârtie -> {coală tipar: indice}
+_COMPATIBILITATE_IMPLICITA = {
+    "70 x 100": {
+        "330 x 480 mm": 4,
+        "345 x 330 mm": 6,
+        "330 x 700 mm": 3,
+        "230 x 480 mm": 6,
+        "SRA4 – 225 x 320 mm": 9,
+        "230 x 330 mm": 9,
+        "330 X 250 mm": 8,
+        "250 x 700 mm": 4,
+        "230 x 250 mm": 12,
+        "250 x 350 mm": 8
+    },
+    "71 x 101": {
+        "330 x 480 mm": 4,
+        "345 x 330 mm": 6,
+        "330 x 700 mm": 3,
+        "230 x 480 mm": 6,
+        "SRA4 – 225 x 320 mm": 9,
+        "230 x 330 mm": 9,
+        "330 X 250 mm": 8,
+        "250 x 700 mm": 4,
+        "230 x 250 mm": 12,
+        "250 x 350 mm": 8
+    },
+    "72 x 101": {
+        "330 x 480 mm": 4,
+        "345 x 330 mm": 6,
+        "330 x 700 mm": 3,
+        "230 x 480 mm": 6,
+        "SRA4 – 225 x 320 mm": 9,
+        "230 x 330 mm": 9,
+        "330 X 250 mm": 8,
+        "250 x 700 mm": 4,
+        "230 x 250 mm": 12,
+        "250 x 350 mm": 8
+    },
+    "72 x 102": {
+        "330 x 480 mm": 4,
+        "345 x 330 mm": 6,
+        "330 x 700 mm": 3,
+        "230 x 480 mm": 6,
+        "SRA4 – 225 x 320 mm": 9,
+        "230 x 330 mm": 9,
+        "330 X 250 mm": 8,
+        "250 x 700 mm": 4,
+        "230 x 250 mm": 12,
+        "250 x 350 mm": 8
+    },
+    "45 x 64": {
+        "SRA3 - 320 x 450 mm": 2,
+        "SRA4 – 225 x 320 mm": 4,
+        "210 x 450 mm": 3,
+        "225 x 640 mm": 2,
+        "A3 – 297 x 420 mm": 2
+    },
+    "SRA3": {
+        "SRA3 - 320 x 450 mm": 1,
+        "SRA4 – 225 x 320 mm": 2,
+        "A3 – 297 x 420 mm": 1
+    },
+    "50 x 70": {
+        "330 x 480 mm": 2,
+        "230 x 480 mm": 3,
+        "230 x 330 mm": 4,
+        "330 X 250 mm": 4,
+        "250 x 700 mm": 2,
+        "230 x 250 mm": 6,
+        "250 x 350 mm": 4
+    },
+    "A4": {
+        "A4 – 210 x 297 mm": 1
+    },
+    "64 x 90": {
+        "A4 – 210 x 297 mm": 8,
+        "210 x 450 mm": 6,
+        "225 x 640 mm": 4,
+        "300 x 640 mm": 3,
+        "300 x 320 mm": 6,
+        "A3 – 297 x 420 mm": 4
+    },
+    "61 x 86": {
+        "A4 – 210 x 297 mm": 8,
+        "A3 – 297 x 420 mm": 4
+    },
+    "A3": {
+        "A4 – 210 x 297 mm": 2,
+        "A3 – 297 x 420 mm": 1,
+        "305 x 430 mm": 1
+    },
+    "43 x 61": {
+        "A4 – 210 x 297 mm": 4,
+        "305 x 430 mm": 2,
+        "215 x 305 mm": 4,
+        "200 x 430 mm": 3
+    }
+}
+
+COMPATIBILITATE_HARTIE_COALA = MappingProxyType({
+    format_hartie: MappingProxyType(coale)
+    for format_hartie, coale in _COMPATIBILITATE_IMPLICITA.items()
+})
+
+# Index plat (format, coală) -> indice, pentru căutări O(1) și JOIN-uri vectorizate
+_INDEX_COMPATIBILITATE = pd.Series(
+    {
+        (format_hartie, coala): indice
+        for format_hartie, coale in COMPATIBILITATE_HARTIE_COALA.items()
+        for coala, indice in coale.items()
+    },
+    dtype="float64",
+)
+
+_FARA_COALE = MappingProxyType({})
+
+
+def coale_compatibile(format_hartie):
+    """
+    Colile de tipar compatibile cu un format de hârtie
+
+    Returns:
+        Mapping: {coală tipar: indice}; gol dacă formatul nu este cunoscut
+    """
+    return COMPATIBILITATE_HARTIE_COALA.get(format_hartie, _FARA_COALE)
+
+
+def indice(format_hartie, coala, implicit=1):
+    """
+    Indicele colii de tipar pentru un format de hârtie
+
+    Args:
+        format_hartie: Formatul colii mari (ex: "70 x 100")
+        coala: Coala de tipar (ex: "330 x 480 mm")
+        implicit: Valoarea returnată pentru combinații necunoscute
+
+    Returns:
+        int: Câte coli de tipar ies dintr-o coală mare
+    """
+    return coale_compatibile(format_hartie).get(coala, implicit)
+
+
+def _coloana(valori):
+    """Convertește un scalar, o listă sau o Series într-un array float (None -> NaN)"""
+    serie = pd.Series(np.atleast_1d(np.asarray(valori, dtype=object)))
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype="float64")
+
+
+def rotunjire_sus(valori, zecimale=3):
+    """Rotunjire în sus la numărul de zecimale (echivalentul math.ceil(x * 1000) / 1000)"""
+    factor = 10 ** zecimale
+    return np.ceil(_coloana(valori) * factor) / factor
+
+
+def consum_hartie(total_coli, formate_hartie, coale_tipar, indice_implicit=None):
+    """
+    Consumul de coli mari pentru mai multe comenzi deodată
+
+    consum = total_coli / indice(format, coală); 0 pentru combinații
+    necunoscute sau fără coli
+
+    Args:
+        total_coli: Coloana (array/Series) cu totalul colilor de tipar
+        formate_hartie: Coloana cu formatul hârtiei
+        coale_tipar: Coloana cu coala de tipar
+        indice_implicit: Indicele folosit pentru combinațiile necunoscute
+            (ex: 1, ca la scăderea stocului); implicit acestea nu consumă
+
+    Returns:
+        np.ndarray: Consumul pe comandă, în coli mari
+    """
+    chei = pd.MultiIndex.from_arrays([np.atleast_1d(np.asarray(formate_hartie, dtype=object)),
+                                      np.atleast_1d(np.asarray(coale_tipar, dtype=object))])
+    indici = _INDEX_COMPATIBILITATE.reindex(chei).to_numpy()
+    if indice_implicit is not None:
+        indici = np.where(np.isnan(indici), float(indice_implicit), indici)
+    coli = _coloana(total_coli)
+    valid = np.isfinite(indici) & (indici > 0) & np.isfinite(coli)
+    return np.divide(coli, indici, out=np.zeros_like(coli), where=valid)
+
+
+def nr_coli_tipar(tiraj, nr_pagini, nr_pagini_pe_coala):
+    """
+    Numărul de coli de tipar: ceil((tiraj * nr_pagini) / (2 * nr_pagini_pe_coala))
+
+    Returns:
+        np.ndarray: Valori întregi; 0 unde nr_pagini_pe_coala lipsește sau este 0
+    """
+    tiraj, nr_pagini, pe_coala = _coloana(tiraj), _coloana(nr_pagini), _coloana(nr_pagini_pe_coala)
+    valid = np.isfinite(pe_coala) & (pe_coala > 0)
+    coli = np.divide(tiraj * nr_pagini, 2 * pe_coala, out=np.zeros_like(tiraj), where=valid)
+    return np.ceil(np.nan_to_num(coli)).astype("int64")
+
+
+def total_coli(nr_coli_tipar, coli_prisoase):
+    """Totalul colilor: coli tipar + coli prisoase (prisoasele lipsă contează 0)"""
+    return (np.nan_to_num(_coloana(nr_coli_tipar)) + np.nan_to_num(_coloana(coli_prisoase))).astype("int64")
+
+
+def greutate_lucrare(latime, inaltime, nr_pagini, indice_corectie, gramaj, tiraj):
+    """
+    Greutatea lucrării în kg: latime * inaltime * nr_pagini * indice_corectie * gramaj * tiraj / (2 * 10^9)
+
+    Dimensiunile lucrării sunt în mm, gramajul în g/m².
+    """
+    return (_coloana(latime) * _coloana(inaltime) * _coloana(nr_pagini) * _coloana(indice_corectie)
+            * _coloana(gramaj) * _coloana(tiraj)) / (2 * 10**9)
+
+
+def greutate_coli(dimensiune_1, dimensiune_2, gramaj, nr_coli):
+    """Greutatea colilor mari în kg: (dim_1 * dim_2 * gramaj * nr_coli) / 10^7, dimensiuni în cm"""
+    return (_coloana(dimensiune_1) * _coloana(dimensiune_2) * _coloana(gramaj) * _coloana(nr_coli)) / 10**7
+
+
+def dimensiuni_format(formate_hartie):
+    """
+    Extrage dimensiunile în cm din formatul hârtiei (ex: "70 x 100" -> 70, 100)
+
+    Returns:
+        tuple: (np.ndarray latimi, np.ndarray inaltimi); NaN pentru formate fără dimensiuni (ex: "SRA3")
+    """
+    serie = pd.Series(np.atleast_1d(np.asarray(formate_hartie, dtype=object)), dtype="object").astype(str)
+    dimensiuni = serie.str.lower().str.extract(r"^\s*([\d.]+)\s*x\s*([\d.]+)")
+    return (pd.to_numeric(dimensiuni[0], errors="coerce").to_numpy(dtype="float64"),
+            pd.to_numeric(dimensiuni[1], errors="coerce").to_numpy(dtype="float64"))
+
+
+def greutate_coli_mari(formate_hartie, gramaj, coli_mari):
+    """
+    Greutatea colilor mari în kg, din formatul hârtiei, rotunjită în sus la 3 zecimale
+
+    Returns:
+        np.ndarray: NaN unde formatul nu are dimensiuni sau nu există coli mari
+    """
+    latime, inaltime = dimensiuni_format(formate_hartie)
+    return rotunjire_sus(greutate_coli(latime, inaltime, gramaj, coli_mari))
+
+
+# Limitele acceptate pentru factorul de conversie (greutate lucrare / greutate coli mari)
+FACTOR_CONVERSIE_MAXIM = 1
+FACTOR_CONVERSIE_MINIM = 0.5
+
+
+def factor_conversie(greutate, greutate_coli_mari):
+    """Factorul de conversie greutate lucrare / greutate coli mari; NaN unde nu se poate calcula"""
+    greutate, greutate_mari = _coloana(greutate), _coloana(greutate_coli_mari)
+    valid = np.isfinite(greutate_mari) & (greutate_mari > 0)
+    return np.divide(greutate, greutate_mari, out=np.full_like(greutate, np.nan), where=valid)
+
+
+def verifica_factor_conversie(factori):
+    """
+    Clasifică factorii de conversie
+
+    Returns:
+        np.ndarray: "peste_maxim" (> 1, date greșite), "sub_minim" (< 0.5, date
+            probabil incomplete), "ok", sau "" unde factorul nu există
+    """
+    factori = _coloana(factori)
+    return np.select(
+        [~np.isfinite(factori) | (factori == 0), factori > FACTOR_CONVERSIE_MAXIM, factori < FACTOR_CONVERSIE_MINIM],
+        ["", "peste_maxim", "sub_minim"],
+        default="ok",
+    )
+
+
+def randuri_compatibilitate():
+    """Matricea ca listă de tuple (format_hartie, coala_tipar, indice) - pentru tabela din DB"""
+    return [
+        (format_hartie, coala, int(indice))
+        for format_hartie, coale in COMPATIBILITATE_HARTIE_COALA.items()
+        for coala, indice in coale.items()
+    ]
+
+
+def sincronizeaza_compatibilitate(session):
+    """
+    Rescrie tabela `compatibilitate_coala` din matricea din cod
+
+    Args:
+        session: Sesiunea SQLAlchemy; commit-ul este făcut de apelant
+
+    Returns:
+        int: Numărul de rânduri scrise
+    """
+    from models.coale import CompatibilitateCoala
+
+    randuri = randuri_compatibilitate()
+    session.query(CompatibilitateCoala).delete()
+    session.add_all([
+        CompatibilitateCoala(format_hartie=format_hartie, coala_tipar=coala, indice=indice)
+        for format_hartie, coala, indice in randuri
+    ])
+    return len(randuri)
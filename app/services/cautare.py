@@ -0,0 +1,113 @@
+# app/services/cautare.py
+"""
+Căutări pe server pentru selectoarele cu multe opțiuni (vezi utils/cautare.py).
+
+În loc să încarce toate comenzile sau intrările de stoc într-un selectbox,
+pagina trimite textul tastat și primește doar primele `limita` potriviri,
+ca tuple (id, eticheta). Textul se caută cu ILIKE pe coloane cu index GIN
+pg_trgm: sub 3 caractere ca prefix ('ab%' - trigramele de început de
+cuvânt folosesc indexul), altfel oriunde în text ('%abc%'). Un număr
+caută și exact după cheia numerică (nr. comandă, id intrare), pe indexul unic.
+Fără text se returnează cele mai recente înregistrări.
+"""
+from collections import namedtuple
+from sqlalchemy import or_, select
+from models.comenzi import Comanda
+from models.beneficiari import Beneficiar
+from models.hartie import Hartie
+from models.stoc import Stoc
+
+# Numărul implicit de rezultate afișate într-un selector
+LIMITA_REZULTATE = 20
+
+# Sub această lungime pg_trgm nu poate folosi indexul pentru '%text%'
+LUNGIME_MINIMA_TRIGRAM = 3
+
+Optiune = namedtuple("Optiune", ["id", "eticheta"])
+
+
+def tipar_cautare(text):
+    """
+    Tiparul ILIKE pentru textul căutat, cu caracterele speciale escapate
+
+    Returns:
+        str: 'text%' pentru texte scurte, '%text%' în rest
+    """
+    text = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    if len(text) < LUNGIME_MINIMA_TRIGRAM:
+        return f"{text}%"
+    return f"%{text}%"
+
+
+def _conditie_text(text, coloane, coloana_numar=None):
+    tipar = tipar_cautare(text)
+    conditii = [coloana.ilike(tipar, escape="\\") for coloana in coloane]
+    if coloana_numar is not None and text.isdigit():
+        conditii.append(coloana_numar == int(text))
+    return or_(*conditii)
+
+
+def cauta_comenzi(session, text, conditii=(), limita=LIMITA_REZULTATE):
+    """
+    Comenzile care se potrivesc textului, cele mai recente primele
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        text: Nr. comandă, parte din numele lucrării, al beneficiarului sau nr. factură
+        conditii: Filtre suplimentare (ex: stare, beneficiar)
+        limita: Numărul maxim de rezultate
+
+    Returns:
+        list[Optiune]: (id comandă, „#nr - lucrare (beneficiar)”)
+    """
+    interogare = (
+        select(Comanda.id, Comanda.numar_comanda, Comanda.nume_lucrare, Comanda.data,
+               Comanda.nr_factura, Beneficiar.nume.label("beneficiar"))
+        .join(Beneficiar, Comanda.beneficiar_id == Beneficiar.id)
+        .where(*conditii)
+        .order_by(Comanda.data.desc(), Comanda.id.desc())
+        .limit(limita)
+    )
+    if text:
+        interogare = interogare.where(_conditie_text(
+            text, (Comanda.nume_lucrare, Beneficiar.nume, Comanda.nr_factura), Comanda.numar_comanda
+        ))
+
+    optiuni = []
+    for r in session.execute(interogare):
+        eticheta = f"#{int(r.numar_comanda)} - {r.nume_lucrare} ({r.beneficiar}) · {r.data.strftime('%d-%m-%Y')}"
+        if r.nr_factura:
+            eticheta += f" · Factura {r.nr_factura}"
+        optiuni.append(Optiune(r.id, eticheta))
+    return optiuni
+
+
+def cauta_intrari_stoc(session, text, limita=LIMITA_REZULTATE):
+    """
+    Intrările de stoc care se potrivesc textului, cele mai recente primele
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        text: Id-ul intrării sau parte din sortiment, nr. factură sau furnizor
+        limita: Numărul maxim de rezultate
+
+    Returns:
+        list[Optiune]: (id intrare, „id - data - sortiment - cantitate - factură - furnizor”)
+    """
+    interogare = (
+        select(Stoc.id, Stoc.data, Stoc.cantitate, Stoc.nr_factura, Stoc.furnizor,
+               Hartie.sortiment.label("sortiment"))
+        .join(Hartie, Stoc.hartie_id == Hartie.id)
+        .order_by(Stoc.data.desc(), Stoc.id.desc())
+        .limit(limita)
+    )
+    if text:
+        interogare = interogare.where(_conditie_text(
+            text, (Hartie.sortiment, Stoc.nr_factura, Stoc.furnizor), Stoc.id
+        ))
+
+    return [
+        Optiune(r.id, f"{r.id} - {r.data.strftime('%d-%m-%Y')} - {r.sortiment} - {r.cantitate:.2f} coli"
+                      f" - {r.nr_factura} - {r.furnizor}")
+        for r in session.execute(interogare)
+    ]
@@ -0,0 +1,184 @@
+# app/services/export.py
+"""
+Export Excel detaliat al comenzilor, cu memorie constantă.
+
+Rândurile sunt citite în loturi dintr-un cursor pe server (`yield_per`) și
+scrise imediat cu xlsxwriter în modul `constant_memory` (fiecare rând este
+eliberat după scriere), într-un fișier temporar pe disc. Indiferent de
+perioada exportată, în memorie se află cel mult un lot de rânduri; în
+`st.session_state` se păstrează doar calea fișierului.
+"""
+import os
+import tempfile
+import time
+import xlsxwriter
+from services import calculator
+from services.interogari_comenzi import query_comenzi, COLOANE_EXPORT
+
+# Numărul de rânduri citite dintr-o dată din cursorul pe server
+MARIME_LOT = 1000
+
+# Fișierele de export mai vechi de atât sunt șterse la următorul export
+VARSTA_MAXIMA_SECUNDE = 3600
+
+DIRECTOR_EXPORT = os.path.join(tempfile.gettempdir(), "copytop_export")
+
+# (antet, lățime coloană, format)
+COLOANE_EXCEL_DETALIAT = (
+    ("Nr. Comandă", 12, None),
+    ("Data", 12, None),
+    ("Beneficiar", 25, None),
+    ("Lucrare", 35, None),
+    ("Tiraj", 12, "numar"),
+    ("Tip Hârtie", 30, None),
+    ("Cod FSC", 15, None),
+    ("Certificare FSC", 15, None),
+    ("Greutate Lucrare (kg)", 20, "greutate"),
+    ("Greutate Hârtie Consumată (kg)", 20, "greutate"),
+    ("Nr. Factură", 15, None),
+    ("Data Facturii", 15, None),
+    ("Stare", 12, None),
+    ("Format Hârtie", 15, None),
+    ("Gramaj", 10, None),
+    ("Coli Mari Necesare", 15, "zecimal"),
+)
+
+
+def _sau_liniuta(valoare):
+    return valoare or "-"
+
+
+def _data(valoare):
+    return valoare.strftime("%d-%m-%Y") if valoare else "-"
+
+
+def _randuri(session, conditii, sumar):
+    """
+    Generează rândurile exportului, lot cu lot, actualizând totalurile din `sumar`
+
+    Greutatea hârtiei consumate se calculează doar pentru comenzile
+    finalizate sau facturate, vectorizat pe fiecare lot.
+    """
+    statement = query_comenzi(session, conditii, coloane=COLOANE_EXPORT).statement
+    rezultat = session.execute(statement.execution_options(yield_per=MARIME_LOT))
+
+    for lot in rezultat.partitions():
+        coli_mari = [r.coli_mari or 0.0 for r in lot]
+        consumata = [r.stare in ("Finalizată", "Facturată") and bool(r.coli_mari) for r in lot]
+        greutati = calculator.greutate_coli(
+            [r.dimensiune_1 for r in lot], [r.dimensiune_2 for r in lot], [r.gramaj for r in lot], coli_mari
+        )
+
+        for r, coli, este_consumata, greutate_hartie in zip(lot, coli_mari, consumata, greutati):
+            greutate_consumata = float(greutate_hartie) if este_consumata else 0.0
+            greutate = r.greutate or 0.0
+
+            sumar["Total comenzi"] += 1
+            sumar["Comenzi FSC"] += int(bool(r.certificare_fsc_produs))
+            sumar["Total greutate lucrări (kg)"] += greutate
+            sumar["Total hârtie consumată (kg)"] += greutate_consumata
+
+            yield (
+                int(r.numar_comanda),
+                _data(r.data),
+                r.beneficiar,
+                r.nume_lucrare,
+                r.tiraj,
+                r.sortiment,
+                _sau_liniuta(r.cod_fsc_produs),
+                _sau_liniuta(r.tip_certificare_fsc_produs),
+                greutate,
+                greutate_consumata,
+                _sau_liniuta(r.nr_factura),
+                _data(r.data_facturare),
+                r.stare,
+                r.format_hartie,
+                f"{r.gramaj}g",
+                coli,
+            )
+
+
+def curata_exporturi_vechi():
+    """Șterge fișierele de export temporare mai vechi de VARSTA_MAXIMA_SECUNDE"""
+    if not os.path.isdir(DIRECTOR_EXPORT):
+        return
+    limita = time.time() - VARSTA_MAXIMA_SECUNDE
+    for nume in os.listdir(DIRECTOR_EXPORT):
+        cale = os.path.join(DIRECTOR_EXPORT, nume)
+        try:
+            if os.path.getmtime(cale) < limita:
+                os.remove(cale)
+        except OSError:
+            pass
+
+
+def sterge_export(cale):
+    """Șterge fișierul unui export (dacă mai există)"""
+    if cale and os.path.exists(cale):
+        os.remove(cale)
+
+
+def export_comenzi_detaliat(session, conditii, perioada, randuri_preview=10):
+    """
+    Scrie exportul Excel detaliat într-un fișier temporar
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        conditii: Lista de condiții de filtrare pentru comenzi
+        perioada: Textul perioadei, afișat în sheet-ul „Sumar”
+        randuri_preview: Câte rânduri se păstrează pentru previzualizare
+
+    Returns:
+        tuple: (calea fișierului .xlsx sau None dacă nu există comenzi,
+                dict cu totalurile, listă cu primele rânduri pentru preview)
+    """
+    curata_exporturi_vechi()
+    os.makedirs(DIRECTOR_EXPORT, exist_ok=True)
+    fd, cale = tempfile.mkstemp(suffix=".xlsx", prefix="comenzi_detaliat_", dir=DIRECTOR_EXPORT)
+    os.close(fd)
+
+    sumar = {
+        "Total comenzi": 0,
+        "Comenzi FSC": 0,
+        "Total greutate lucrări (kg)": 0.0,
+        "Total hârtie consumată (kg)": 0.0,
+    }
+    preview = []
+
+    try:
+        workbook = xlsxwriter.Workbook(cale, {"constant_memory": True, "tmpdir": DIRECTOR_EXPORT})
+        formate = {
+            "antet": workbook.add_format({"bold": True, "bg_color": "#D3D3D3", "border": 1}),
+            "greutate": workbook.add_format({"bold": True, "font_color": "#006400", "num_format": "#,##0.000"}),
+            "numar": workbook.add_format({"num_format": "#,##0"}),
+            "zecimal": workbook.add_format({"num_format": "#,##0.00"}),
+        }
+
+        worksheet = workbook.add_worksheet("Comenzi Detaliate")
+        format_coloane = []
+        for col, (antet, latime, format_coloana) in enumerate(COLOANE_EXCEL_DETALIAT):
+            worksheet.set_column(col, col, latime)
+            worksheet.write(0, col, antet, formate["antet"])
+            format_coloane.append(formate.get(format_coloana))
+
+        # În modul constant_memory rândurile trebuie scrise strict în ordine
+        for nr_rand, rand in enumerate(_randuri(session, conditii, sumar), start=1):
+            for col, (valoare, format_celula) in enumerate(zip(rand, format_coloane)):
+                worksheet.write(nr_rand, col, valoare, format_celula)
+            if len(preview) < randuri_preview:
+                preview.append(rand)
+
+        foaie_sumar = workbook.add_worksheet("Sumar")
+        sumar_complet = dict(sumar, Perioada=perioada)
+        for col, (antet, valoare) in enumerate(sumar_complet.items()):
+            foaie_sumar.write(0, col, antet, formate["antet"])
+            foaie_sumar.write(1, col, valoare)
+        workbook.close()
+    except Exception:
+        sterge_export(cale)
+        raise
+
+    if sumar["Total comenzi"] == 0:
+        sterge_export(cale)
+        return None, sumar, preview
+    return cale, sumar, preview
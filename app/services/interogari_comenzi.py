@@ -0,0 +1,130 @@
+# app/services/interogari_comenzi.py
+"""
+Interogări partajate pentru listarea comenzilor.
+
+Toate listările din pagina de comenzi (tabelul principal, multiselect-ul
+PDF și exportul detaliat) selectează doar coloanele afișate, cu JOIN
+explicit pe beneficiar și hârtie, astfel încât nu se mai încarcă relațiile
+rând cu rând (N+1). Selectorul din editare caută pe server (services/cautare.py).
+"""
+import pandas as pd
+from models.comenzi import Comanda
+from models.beneficiari import Beneficiar
+from models.hartie import Hartie
+
+# Coloanele proiectate pentru tabelul „Lista Comenzi”
+COLOANE_LISTA = (
+    Comanda.id,
+    Comanda.numar_comanda,
+    Comanda.data,
+    Beneficiar.nume.label("beneficiar"),
+    Comanda.nume_lucrare,
+    Comanda.tiraj,
+    Hartie.sortiment.label("sortiment"),
+    Comanda.latime,
+    Comanda.inaltime,
+    Comanda.coala_tipar,
+    Comanda.nr_coli_tipar,
+    Comanda.coli_prisoase,
+    Comanda.cod_fsc_produs,
+    Comanda.tip_certificare_fsc_produs,
+    Comanda.stare,
+    Comanda.facturata,
+)
+
+# Coloanele proiectate pentru exportul Excel detaliat (services/export.py)
+COLOANE_EXPORT = (
+    Comanda.numar_comanda,
+    Comanda.data,
+    Beneficiar.nume.label("beneficiar"),
+    Comanda.nume_lucrare,
+    Comanda.tiraj,
+    Comanda.certificare_fsc_produs,
+    Comanda.cod_fsc_produs,
+    Comanda.tip_certificare_fsc_produs,
+    Comanda.greutate,
+    Comanda.coli_mari,
+    Comanda.nr_factura,
+    Comanda.data_facturare,
+    Comanda.stare,
+    Hartie.sortiment.label("sortiment"),
+    Hartie.format_hartie,
+    Hartie.gramaj,
+    Hartie.dimensiune_1,
+    Hartie.dimensiune_2,
+)
+
+
+def query_comenzi(session, conditii, coloane=COLOANE_LISTA):
+    """
+    Construiește interogarea proiectată pe coloane pentru comenzi
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        conditii: Lista de condiții de filtrare (expresii SQLAlchemy)
+        coloane: Coloanele selectate
+
+    Returns:
+        Query: Interogarea sortată descrescător după numărul comenzii
+    """
+    return (
+        session.query(*coloane)
+        .join(Beneficiar, Comanda.beneficiar_id == Beneficiar.id)
+        .join(Hartie, Comanda.hartie_id == Hartie.id)
+        .filter(*conditii)
+        .order_by(Comanda.numar_comanda.desc())
+    )
+
+
+def _dataframe(query, paginare=None):
+    """
+    Materializează o interogare proiectată într-un DataFrame cu numele coloanelor
+
+    Cu `paginare` (utils.paginare.PaginareKeyset) se citește doar pagina curentă.
+    """
+    coloane = [c["name"] for c in query.column_descriptions]
+    if paginare is not None:
+        rows = paginare.pagina(query, lambda r: (r.numar_comanda,))
+    else:
+        rows = query.all()
+    return pd.DataFrame.from_records(rows, columns=coloane)
+
+
+def _sau_liniuta(serie):
+    """Înlocuiește valorile goale cu „-” (echivalentul `valoare or "-"`)"""
+    return serie.where(serie.notna() & (serie != 0) & (serie != ""), "-")
+
+
+def lista_comenzi(session, conditii, paginare=None):
+    """
+    Returnează DataFrame-ul gata de afișat în tabelul „Lista Comenzi”
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        conditii: Lista de condiții de filtrare
+        paginare: PaginareKeyset pe `Comanda.numar_comanda` (opțional)
+
+    Returns:
+        pd.DataFrame: Un rând pe comandă; DataFrame gol dacă nu există comenzi
+    """
+    raw = _dataframe(query_comenzi(session, conditii), paginare)
+    if raw.empty:
+        return pd.DataFrame()
+
+    return pd.DataFrame({
+        "ID": raw["id"],  # Ascuns, folosit pentru identificare
+        "Nr. Comandă": raw["numar_comanda"].astype(int).astype(str),
+        "Data": pd.to_datetime(raw["data"]).dt.strftime("%d-%m-%Y"),
+        "Beneficiar": raw["beneficiar"],
+        "Nume Lucrare": raw["nume_lucrare"],
+        "Tiraj": raw["tiraj"],
+        "Hârtie": raw["sortiment"],
+        "Dimensiuni": raw["latime"].astype(str) + "x" + raw["inaltime"].astype(str) + "mm",
+        "Coală Tipar": _sau_liniuta(raw["coala_tipar"].astype(object)),
+        "Coli Tipar": _sau_liniuta(raw["nr_coli_tipar"].astype(object)),
+        "Coli Prisoase": raw["coli_prisoase"].fillna(0).astype(int),
+        "Cod FSC": _sau_liniuta(raw["cod_fsc_produs"].astype(object)),
+        "Tip Certificare": _sau_liniuta(raw["tip_certificare_fsc_produs"].astype(object)),
+        "Stare": raw["stare"],
+        "Facturată": raw["facturata"],  # Ascuns, folosit pentru validare
+    })
@@ -0,0 +1,96 @@
+# app/services/numerotare.py
+"""
+Alocarea numerelor de comandă.
+
+Numărul se alocă în momentul salvării, în aceeași tranzacție cu INSERT-ul,
+deci două comenzi introduse simultan nu mai primesc același număr.
+
+Două moduri (config.NUMEROTARE_COMENZI):
+- "secventa": `nextval('comenzi_numar_seq')` - O(1), fără blocări; o tranzacție
+  anulată lasă un gol în numerotare;
+- "fara_goluri": rândul "comenzi" din `contor_numerotare` este incrementat
+  cu UPDATE ... RETURNING și rămâne blocat până la commit - alocările
+  concurente se serializează, iar la rollback numărul se refolosește.
+"""
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from config import NUMEROTARE_COMENZI
+from models.comenzi import Comanda
+from models.numerotare import ContorNumerotare, SECVENTA_NUMAR_COMANDA, NUMAR_COMANDA_START
+
+CONTOR_COMENZI = "comenzi"
+
+
+def _fara_goluri():
+    return NUMEROTARE_COMENZI == "fara_goluri"
+
+
+def aloca_numar_comanda(session):
+    """
+    Alocă următorul număr de comandă în tranzacția curentă
+
+    Args:
+        session: Sesiunea SQLAlchemy în care se va insera comanda
+
+    Returns:
+        int: Numărul alocat
+    """
+    if _fara_goluri():
+        incrementeaza = (
+            ContorNumerotare.__table__.update()
+            .where(ContorNumerotare.nume == CONTOR_COMENZI)
+            .values(valoare=ContorNumerotare.valoare + 1)
+            .returning(ContorNumerotare.valoare)
+        )
+        valoare = session.execute(incrementeaza).scalar()
+        if valoare is None:
+            # Contorul lipsește (bază nemigrată) - se creează din ultima comandă;
+            # ON CONFLICT acoperă cazul în care altă sesiune l-a creat între timp
+            ultimul = session.query(Comanda.numar_comanda).order_by(Comanda.numar_comanda.desc()).limit(1).scalar()
+            session.execute(
+                insert(ContorNumerotare.__table__)
+                .values(nume=CONTOR_COMENZI, valoare=max(ultimul or 0, NUMAR_COMANDA_START - 1))
+                .on_conflict_do_nothing()
+            )
+            valoare = session.execute(incrementeaza).scalar()
+        return valoare
+
+    return session.execute(select(SECVENTA_NUMAR_COMANDA.next_value())).scalar()
+
+
+def urmatorul_numar_comanda(session):
+    """
+    Numărul pe care îl va primi probabil următoarea comandă (doar pentru afișare)
+
+    Nu alocă și nu blochează nimic - numărul definitiv este cel returnat
+    de `aloca_numar_comanda` la salvare.
+    """
+    if _fara_goluri():
+        valoare = session.query(ContorNumerotare.valoare).filter(ContorNumerotare.nume == CONTOR_COMENZI).scalar()
+        return max((valoare or 0) + 1, NUMAR_COMANDA_START)
+
+    ultima_valoare, apelata = session.execute(
+        text(f"SELECT last_value, is_called FROM {SECVENTA_NUMAR_COMANDA.name}")
+    ).one()
+    return ultima_valoare + 1 if apelata else ultima_valoare
+
+
+def sincronizeaza_numerotare(session):
+    """
+    Aduce secvența și contorul la cel mai mare număr de comandă existent
+
+    Se apelează la inițializarea bazei de date; nu face commit.
+    """
+    ultimul = session.query(Comanda.numar_comanda).order_by(Comanda.numar_comanda.desc()).limit(1).scalar()
+    if ultimul is None or ultimul < NUMAR_COMANDA_START:
+        return
+
+    session.execute(
+        text("SELECT setval(:secventa, GREATEST(:ultimul, (SELECT last_value FROM comenzi_numar_seq)))"),
+        {"secventa": SECVENTA_NUMAR_COMANDA.name, "ultimul": ultimul},
+    )
+    contor = session.query(ContorNumerotare).filter(ContorNumerotare.nume == CONTOR_COMENZI).with_for_update().first()
+    if contor is None:
+        session.add(ContorNumerotare(nume=CONTOR_COMENZI, valoare=ultimul))
+    elif contor.valoare < ultimul:
+        contor.valoare = ultimul
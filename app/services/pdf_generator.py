@@ -1,5 +1,5 @@
 # app/services/pdf_generator.py
-from reportlab.lib.pagesizes import A4
+from reportlab.lib.pagesizes import A4, landscape
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
@@ -8,6 +8,7 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
 import os
 from pathlib import Path
+from xml.sax.saxutils import escape
 
 def genereaza_pdf_comanda(comanda, beneficiar, hartie, output_dir="app/static/comenzi"):
     """
@@ -354,4 +355,144 @@ def genereaza_raport_stoc_pdf(data_inceput, data_sfarsit, hartii_raport, output_
     # Construiește documentul
     doc.build(story)
     
-    return filepath
\ No newline at end of file
+    return filepath
+
+
+def genereaza_raport_fsc_pdf(raport, output_dir="app/static/rapoarte"):
+    """
+    Generează raportul FSC în PDF (A4 landscape)
+    
+    Args:
+        raport: Rezultatul `services.rapoarte.raport_fsc` (același folosit pentru Excel)
+        output_dir: Directorul unde se salvează PDF-ul
+    
+    Returns:
+        str: Calea către fișierul PDF generat
+    """
+    
+    # Creează directorul dacă nu există
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    
+    # Numele fișierului
+    filename = f"raport_fsc_{raport.data_inceput.strftime('%Y%m%d')}_{raport.data_sfarsit.strftime('%Y%m%d')}.pdf"
+    filepath = os.path.join(output_dir, filename)
+    
+    # Creează documentul PDF
+    doc = SimpleDocTemplate(
+        filepath,
+        pagesize=landscape(A4),
+        rightMargin=1.5*cm,
+        leftMargin=1.5*cm,
+        topMargin=1.5*cm,
+        bottomMargin=1.5*cm
+    )
+    
+    # Stiluri
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=colors.darkblue
+    )
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=12,
+        spaceAfter=10,
+        textColor=colors.darkblue
+    )
+    cell_style = ParagraphStyle('Cell', parent=styles['Normal'], fontSize=7, leading=8)
+    
+    table_style = TableStyle([
+        # Header
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 8),
+        # Conținut
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 7),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+    ])
+    
+    # Conținutul documentului
+    story = []
+    
+    # Titlu
+    story.append(Paragraph(
+        f"RAPORT FSC<br/>{raport.data_inceput.strftime('%d/%m/%Y')} - {raport.data_sfarsit.strftime('%d/%m/%Y')}",
+        title_style
+    ))
+    story.append(Paragraph(
+        f"Beneficiar: {escape(raport.beneficiar)} | Comenzi: {len(raport.comenzi)} | Tiraj total: {raport.total_tiraj:,} | "
+        f"Valoare totală: {raport.total_valoare:.2f} RON | Consum hârtie: {raport.total_greutate:.3f} kg",
+        styles['Normal']
+    ))
+    story.append(Spacer(1, 15))
+    
+    if raport.comenzi:
+        # Sumar consum pe sortiment
+        story.append(Paragraph("SUMAR CONSUM HÂRTIE FSC", heading_style))
+        sumar_data = [["Hârtie", "Cod FSC Materie Primă", "Certificare", "Comenzi", "Consum (coli)", "Consum (kg)"]]
+        for h in raport.consum_hartie:
+            sumar_data.append([
+                Paragraph(escape(h.sortiment), cell_style),
+                h.cod_fsc_materie_prima or "N/A",
+                h.certificare_fsc_materie_prima or "N/A",
+                str(h.nr_comenzi),
+                f"{h.consum:.2f}",
+                f"{h.greutate_consum:.3f}"
+            ])
+        sumar_table = Table(sumar_data, colWidths=[8*cm, 4*cm, 4.5*cm, 2.5*cm, 3*cm, 3*cm], repeatRows=1)
+        sumar_table.setStyle(table_style)
+        story.append(sumar_table)
+        story.append(Spacer(1, 20))
+        
+        # Comenzile
+        story.append(Paragraph("COMENZI FSC", heading_style))
+        comenzi_data = [["Nr.", "Data", "Beneficiar", "Lucrare", "Tiraj", "Cod FSC", "Certificare",
+                         "Hârtie", "Cod Materie Primă", "Coli", "kg"]]
+        for c in raport.comenzi:
+            comenzi_data.append([
+                str(c.numar_comanda),
+                c.data.strftime("%d/%m/%Y"),
+                Paragraph(escape(c.beneficiar), cell_style),
+                Paragraph(escape(c.nume_lucrare), cell_style),
+                f"{c.tiraj:,}",
+                c.cod_fsc_produs or "N/A",
+                Paragraph(escape(c.tip_certificare_fsc_produs or "N/A"), cell_style),
+                Paragraph(escape(c.sortiment), cell_style),
+                c.cod_fsc_materie_prima or "N/A",
+                f"{c.consum:.2f}",
+                f"{c.greutate_consum:.3f}"
+            ])
+        comenzi_table = Table(
+            comenzi_data,
+            colWidths=[1.3*cm, 1.9*cm, 3.5*cm, 5*cm, 1.5*cm, 1.6*cm, 2.8*cm, 3.8*cm, 2.4*cm, 1.5*cm, 1.4*cm],
+            repeatRows=1
+        )
+        comenzi_table.setStyle(table_style)
+        story.append(comenzi_table)
+    else:
+        story.append(Paragraph("Nu există comenzi FSC facturate pentru perioada selectată.", styles['Normal']))
+    
+    # Footer
+    story.append(Spacer(1, 30))
+    footer_text = f"Raport generat pe {datetime.now().strftime('%d/%m/%Y la %H:%M')}"
+    story.append(Paragraph(footer_text, ParagraphStyle(
+        'Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        alignment=TA_CENTER,
+        textColor=colors.grey
+    )))
+    
+    # Construiește documentul
+    doc.build(story)
+    
+    return filepath
@@ -0,0 +1,135 @@
+# app/services/pdf_joburi.py
+"""
+Generarea PDF-urilor în procese separate.
+
+Randarea ReportLab este CPU-bound; pentru loturi mari comenzile sunt
+distribuite pe un `ProcessPoolExecutor` partajat de toate sesiunile
+procesului Streamlit. Procesele primesc doar date simple (dicționare),
+nu obiecte ORM - acestea nu pot fi serializate și țin de sesiunea
+bazei de date a paginii.
+
+Rezultatul este o arhivă ZIP (un PDF pe comandă) sau un singur PDF comun.
+Un PDF comun este un singur build ReportLab, deci rulează într-un singur
+proces din pool (fără a bloca firul paginii); ZIP-ul folosește toate procesele.
+"""
+import io
+import math
+import multiprocessing
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import PDF_WORKERI, PDF_PRAG_PARALEL
+from services import cache_pdf
+from utils.pdf_utils import (genereaza_comanda_pdf, genereaza_comenzi_pdf, obiecte_comanda,
+                             nume_fisier_comanda)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _pool():
+    """Pool-ul de procese, creat la prima utilizare"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            # "spawn": procesele noi nu moștenesc firele și conexiunile serverului Streamlit
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_WORKERI,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _randeaza_comenzi(lot):
+    """Rulează în procesul din pool: un PDF separat pentru fiecare comandă din lot"""
+    return [(nume_fisier_comanda(date), genereaza_comanda_pdf(*obiecte_comanda(date)).getvalue()) for date in lot]
+
+
+def _randeaza_pdf_comun(comenzi, doua_pe_a4):
+    """Rulează în procesul din pool: toate comenzile într-un singur PDF"""
+    return genereaza_comenzi_pdf([obiecte_comanda(date) for date in comenzi], doua_pe_a4=doua_pe_a4).getvalue()
+
+
+def genereaza_zip_comenzi(comenzi, progres=None):
+    """
+    Generează câte un PDF pentru fiecare comandă și le arhivează într-un ZIP
+
+    Args:
+        comenzi: Listă de dicționare returnate de `date_comanda`
+        progres: Funcție apelată cu (finalizate, total) după fiecare lot
+
+    Returns:
+        io.BytesIO: Arhiva ZIP
+    """
+    total = len(comenzi)
+    fisiere = {}
+
+    # Comenzile nemodificate de la ultima randare se iau din cache
+    chei = {nume_fisier_comanda(date): cache_pdf.cheie_pdf(date) for date in comenzi}
+    de_randat = []
+    for date in comenzi:
+        nume = nume_fisier_comanda(date)
+        continut = cache_pdf.citeste(chei[nume])
+        if continut is None:
+            de_randat.append(date)
+        else:
+            fisiere[nume] = continut
+    finalizate = len(fisiere)
+    if progres and finalizate:
+        progres(finalizate, total)
+
+    def salveaza(rezultat):
+        nonlocal finalizate
+        for nume, continut in rezultat:
+            fisiere[nume] = continut
+            cache_pdf.scrie(chei[nume], continut)
+        finalizate += len(rezultat)
+        if progres:
+            progres(finalizate, total)
+
+    if len(de_randat) < PDF_PRAG_PARALEL:
+        # Pentru puține comenzi pornirea proceselor costă mai mult decât randarea
+        for date in de_randat:
+            salveaza(_randeaza_comenzi([date]))
+    else:
+        # Loturi de mărime egală, câteva pe proces, pentru un progres fluid
+        marime_lot = max(1, math.ceil(len(de_randat) / (PDF_WORKERI * 4)))
+        loturi = [de_randat[i:i + marime_lot] for i in range(0, len(de_randat), marime_lot)]
+        viitoare = [_pool().submit(_randeaza_comenzi, lot) for lot in loturi]
+        for viitor in as_completed(viitoare):
+            salveaza(viitor.result())
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as arhiva:
+        # Ordinea din arhivă urmează ordinea comenzilor, nu ordinea finalizării
+        for date in comenzi:
+            nume = nume_fisier_comanda(date)
+            arhiva.writestr(nume, fisiere[nume])
+    buffer.seek(0)
+    return buffer
+
+
+def genereaza_pdf_comun(comenzi, doua_pe_a4=False):
+    """
+    Generează PDF-ul comun (un singur build) într-un proces din pool
+
+    Args:
+        comenzi: Listă de dicționare returnate de `date_comanda`
+        doua_pe_a4: Două comenzi pe o pagină A4 în loc de o comandă pe A5
+
+    Returns:
+        io.BytesIO: PDF-ul
+    """
+    if len(comenzi) < PDF_PRAG_PARALEL:
+        return io.BytesIO(_randeaza_pdf_comun(comenzi, doua_pe_a4))
+    return io.BytesIO(_pool().submit(_randeaza_pdf_comun, comenzi, doua_pe_a4).result())
+
+
+def executa_in_pool(functie, *args, **kwargs):
+    """
+    Rulează o funcție de generare (ex. un raport PDF) într-un proces din pool
+
+    Funcția trebuie să fie definită la nivel de modul, iar argumentele
+    trebuie să fie date simple (serializabile cu pickle).
+    """
+    return _pool().submit(functie, *args, **kwargs).result()
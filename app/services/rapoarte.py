@@ -0,0 +1,287 @@
+# app/services/rapoarte.py
+"""
+Agregări SQL pentru rapoarte.
+
+Rapoartele se calculează direct în PostgreSQL, într-o singură interogare
+grupată, în loc de câte o interogare per sortiment de hârtie.
+"""
+import io
+from collections import namedtuple
+import pandas as pd
+from sqlalchemy import func, cast, case, Float, select
+from models.beneficiari import Beneficiar
+from models.comenzi import Comanda
+from models.hartie import Hartie
+from models.coale import CompatibilitateCoala
+from services import registru_stoc
+from services.sumare import select_totaluri
+
+
+def raport_miscari_stoc(session, data_inceput, data_sfarsit):
+    """
+    Calculează mișcările de stoc pe sortimente pentru o perioadă, din registrul de stoc
+
+    Stocul inițial și cel final sunt soldurile din `miscari_stoc` la
+    începutul și la sfârșitul perioadei; intrările sunt intrările în stoc
+    (inclusiv modificările și anulările lor și stocul inițial al hârtiilor
+    noi), ieșirile - consumul net al
+    comenzilor (consum minus restituiri). Corecțiile de inventar apar doar
+    în diferență.
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        data_inceput: Data de început a perioadei
+        data_sfarsit: Data de sfârșit a perioadei
+
+    Returns:
+        list: Dicționare cu cheile așteptate de `genereaza_raport_stoc_pdf`
+            (sortiment, stoc_initial, intrari, iesiri, stoc_final, diferenta)
+    """
+    stoc_initial = registru_stoc.sold_initial_perioada(data_inceput)
+    stoc_final = func.coalesce(registru_stoc.sold_la_data(data_sfarsit), 0.0)
+
+    rows = (
+        session.query(
+            Hartie.sortiment.label("sortiment"),
+            stoc_initial.label("stoc_initial"),
+            registru_stoc.suma_miscari(data_inceput, data_sfarsit, registru_stoc.TIPURI_INTRARI).label("intrari"),
+            (0.0 - registru_stoc.suma_miscari(data_inceput, data_sfarsit, registru_stoc.TIPURI_IESIRI)).label("iesiri"),
+            stoc_final.label("stoc_final"),
+            (stoc_final - stoc_initial).label("diferenta"),
+        )
+        .order_by(Hartie.sortiment)
+        .all()
+    )
+
+    return [row._asdict() for row in rows]
+
+
+def raport_beneficiari(session, data_inceput=None, data_sfarsit=None, limita=None,
+                       ordonare="valoare", facturata=None):
+    """
+    Totalurile comenzilor pe beneficiar (GROUP BY beneficiar_id), doar rândurile agregate
+
+    Lunile complete vin din `sumar_lunar_beneficiar`, marginile perioadei
+    din `comenzi` (vezi services/sumare.py); numele se adaugă prin join.
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        data_inceput: Prima zi inclusă (None = de la prima comandă)
+        data_sfarsit: Ultima zi inclusă (None = până la ultima comandă)
+        limita: Primii N beneficiari după `ordonare` (None = toți)
+        ordonare: "valoare" sau "nr_comenzi" (descrescător)
+        facturata: True/False pentru a filtra după facturare, None pentru toate
+
+    Returns:
+        list: Rânduri cu câmpurile beneficiar_id, nume, nr_comenzi, tiraj, valoare
+    """
+    totaluri = select_totaluri("beneficiar", data_inceput, data_sfarsit, facturata).subquery()
+    interogare = (
+        select(
+            totaluri.c.id.label("beneficiar_id"),
+            Beneficiar.nume.label("nume"),
+            totaluri.c.nr_comenzi,
+            totaluri.c.tiraj,
+            totaluri.c.valoare,
+        )
+        .join(Beneficiar, Beneficiar.id == totaluri.c.id)
+        .where(totaluri.c.nr_comenzi > 0)
+        .order_by(totaluri.c[ordonare].desc(), Beneficiar.nume)
+    )
+    if limita:
+        interogare = interogare.limit(limita)
+    return session.execute(interogare).all()
+
+
+ComandaFSC = namedtuple("ComandaFSC", [
+    "numar_comanda",
+    "data",
+    "beneficiar",
+    "nume_lucrare",
+    "po_client",
+    "tiraj",
+    "cod_fsc_produs",
+    "tip_certificare_fsc_produs",
+    "hartie_id",
+    "sortiment",
+    "cod_fsc_materie_prima",
+    "certificare_fsc_materie_prima",
+    "total_coli",
+    "consum",
+    "greutate_consum",
+    "pret",
+])
+
+ConsumHartieFSC = namedtuple("ConsumHartieFSC", [
+    "sortiment",
+    "cod_fsc_materie_prima",
+    "certificare_fsc_materie_prima",
+    "nr_comenzi",
+    "consum",
+    "greutate_consum",
+])
+
+# Rezultatul raportului FSC - din el se generează afișarea, Excel-ul și PDF-ul
+RaportFSC = namedtuple("RaportFSC", [
+    "data_inceput",
+    "data_sfarsit",
+    "beneficiar",
+    "comenzi",
+    "consum_hartie",
+    "total_tiraj",
+    "total_valoare",
+    "total_greutate",
+])
+
+
+def raport_fsc(session, data_inceput, data_sfarsit, beneficiar_id=None, beneficiar="Toți beneficiarii"):
+    """
+    Raportul FSC (lanț de custodie) pentru comenzile certificate și facturate
+
+    O singură interogare aduce comanda, beneficiarul, certificarea produsului,
+    certificarea materiei prime și consumul de hârtie calculat în SQL
+    (total_coli / indicele colii de tipar, ca la scăderea stocului;
+    greutatea în kg din dimensiunile și gramajul hârtiei). Sumarul pe
+    sortiment se agregă din același rezultat.
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        data_inceput: Data de început a perioadei
+        data_sfarsit: Data de sfârșit a perioadei
+        beneficiar_id: Filtrare opțională după beneficiar
+        beneficiar: Numele afișat al filtrului de beneficiar
+
+    Returns:
+        RaportFSC: Comenzile, consumul pe sortiment și totalurile
+    """
+    # Ca registrul de stoc: indicele 1 pentru combinațiile lipsă din matrice, 0 fără coală de tipar
+    indice_coala = func.coalesce(func.nullif(CompatibilitateCoala.indice, 0), 1)
+    consum = case(
+        (Comanda.coala_tipar.isnot(None) & (Comanda.total_coli > 0), Comanda.total_coli / cast(indice_coala, Float)),
+        else_=0.0,
+    )
+    greutate_consum = consum * Hartie.dimensiune_1 * Hartie.dimensiune_2 * Hartie.gramaj / 10**7
+
+    conditii = [
+        Comanda.certificare_fsc_produs == True,
+        Comanda.facturata == True,
+        Comanda.data >= data_inceput,
+        Comanda.data <= data_sfarsit,
+    ]
+    if beneficiar_id:
+        conditii.append(Comanda.beneficiar_id == beneficiar_id)
+
+    rows = (
+        session.query(
+            Comanda.numar_comanda,
+            Comanda.data,
+            Beneficiar.nume,
+            Comanda.nume_lucrare,
+            Comanda.po_client,
+            Comanda.tiraj,
+            Comanda.cod_fsc_produs,
+            Comanda.tip_certificare_fsc_produs,
+            Hartie.id,
+            Hartie.sortiment,
+            Hartie.cod_fsc_materie_prima,
+            Hartie.certificare_fsc_materie_prima,
+            Comanda.total_coli,
+            consum,
+            greutate_consum,
+            Comanda.pret,
+        )
+        .join(Beneficiar, Comanda.beneficiar_id == Beneficiar.id)
+        .join(Hartie, Comanda.hartie_id == Hartie.id)
+        .outerjoin(
+            CompatibilitateCoala,
+            (CompatibilitateCoala.format_hartie == Hartie.format_hartie)
+            & (CompatibilitateCoala.coala_tipar == Comanda.coala_tipar),
+        )
+        .filter(*conditii)
+        .order_by(Comanda.data, Comanda.numar_comanda)
+        .all()
+    )
+    comenzi = [ComandaFSC(*row) for row in rows]
+
+    pe_hartie = {}
+    for comanda in comenzi:
+        sumar = pe_hartie.setdefault(comanda.hartie_id, [comanda, 0, 0.0, 0.0])
+        sumar[1] += 1
+        sumar[2] += comanda.consum
+        sumar[3] += comanda.greutate_consum
+    consum_hartie = [
+        ConsumHartieFSC(c.sortiment, c.cod_fsc_materie_prima, c.certificare_fsc_materie_prima, nr, total, greutate)
+        for c, nr, total, greutate in sorted(pe_hartie.values(), key=lambda s: s[0].sortiment)
+    ]
+
+    return RaportFSC(
+        data_inceput=data_inceput,
+        data_sfarsit=data_sfarsit,
+        beneficiar=beneficiar,
+        comenzi=comenzi,
+        consum_hartie=consum_hartie,
+        total_tiraj=sum(c.tiraj for c in comenzi),
+        total_valoare=sum(c.pret or 0.0 for c in comenzi),
+        total_greutate=sum(c.greutate_consum for c in comenzi),
+    )
+
+
+def tabele_raport_fsc(raport):
+    """
+    Tabelele raportului FSC, pentru afișare și Excel
+
+    Returns:
+        tuple: (DataFrame comenzi, DataFrame consum pe sortiment, DataFrame statistici)
+    """
+    df_comenzi = pd.DataFrame([{
+        "Nr. Comandă": c.numar_comanda,
+        "Data": c.data.strftime("%d-%m-%Y"),
+        "Beneficiar": c.beneficiar,
+        "Lucrare": c.nume_lucrare,
+        "PO Client": c.po_client or "-",
+        "Tiraj": c.tiraj,
+        "Cod FSC Produs": c.cod_fsc_produs or "N/A",
+        "Certificare Produs": c.tip_certificare_fsc_produs or "N/A",
+        "Hârtie": c.sortiment,
+        "Cod FSC Materie Primă": c.cod_fsc_materie_prima or "N/A",
+        "Certificare Materie Primă": c.certificare_fsc_materie_prima or "N/A",
+        "Consum Hârtie (coli)": round(c.consum, 2),
+        "Consum Hârtie (kg)": round(c.greutate_consum, 3),
+        "Preț (RON)": round(c.pret, 2) if c.pret else None,
+    } for c in raport.comenzi])
+
+    df_consum = pd.DataFrame([{
+        "Hârtie": h.sortiment,
+        "Cod FSC Materie Primă": h.cod_fsc_materie_prima or "N/A",
+        "Certificare Materie Primă": h.certificare_fsc_materie_prima or "N/A",
+        "Comenzi": h.nr_comenzi,
+        "Consum Total (coli)": round(h.consum, 2),
+        "Consum Total (kg)": round(h.greutate_consum, 3),
+    } for h in raport.consum_hartie])
+
+    df_statistici = pd.DataFrame([
+        ["Perioada", f"{raport.data_inceput.strftime('%d/%m/%Y')} - {raport.data_sfarsit.strftime('%d/%m/%Y')}"],
+        ["Beneficiar", raport.beneficiar],
+        ["Total comenzi FSC", len(raport.comenzi)],
+        ["Tiraj total", raport.total_tiraj],
+        ["Valoare totală (RON)", round(raport.total_valoare, 2)],
+        ["Consum total hârtie (kg)", round(raport.total_greutate, 3)],
+    ], columns=["Indicator", "Valoare"])
+
+    return df_comenzi, df_consum, df_statistici
+
+
+def excel_raport_fsc(raport):
+    """
+    Excel-ul raportului FSC, în memorie
+
+    Returns:
+        bytes: Conținutul fișierului .xlsx
+    """
+    df_comenzi, df_consum, df_statistici = tabele_raport_fsc(raport)
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+        df_comenzi.to_excel(writer, sheet_name="Comenzi FSC", index=False)
+        df_consum.to_excel(writer, sheet_name="Sumar Consum", index=False)
+        df_statistici.to_excel(writer, sheet_name="Statistici", index=False)
+    return buffer.getvalue()
@@ -0,0 +1,173 @@
+# app/services/registru_stoc.py
+"""
+Registrul de stoc (tabela `miscari_stoc`).
+
+Orice modificare a stocului unei hârtii - intrare, consum sau restituire
+pentru o comandă, modificarea/anularea unei intrări, corecție - se
+înregistrează ca mișcare append-only, cu soldul rezultat. `Hartie.stoc`
+rămâne soldul curent, actualizat în aceeași tranzacție printr-un singur
+UPDATE atomic:
+
+    UPDATE hartie SET stoc = stoc + :delta, versiune = versiune + 1
+    WHERE id = :id AND stoc + :delta >= 0 RETURNING stoc
+
+Verificarea stocului disponibil se face în aceeași instrucțiune (fără
+citire în Python urmată de scriere), iar rândul hârtiei rămâne blocat până
+la commit - mișcările concurente pe aceeași hârtie se serializează și nu
+se mai pierd actualizări. Versiunea incrementată semnalează conflictul
+formularelor de editare a hârtiei deschise între timp (utils/concurenta.py).
+
+Mișcările sunt datate cu ziua înregistrării; stocul la o dată este soldul
+ultimei mișcări a hârtiei până la acea dată - o căutare în indexul
+(hartie_id, data, id), fără reluarea istoricului.
+
+Funcțiile nu fac commit.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+from sqlalchemy import and_, func, select, update
+from models.hartie import Hartie
+from models.miscari_stoc import MiscareStoc
+from services import calculator
+
+# O mișcare de înregistrat; cantitate pozitivă = intrare, negativă = ieșire
+Miscare = namedtuple("Miscare", ["cantitate", "tip", "comanda_id", "stoc_id", "descriere"],
+                     defaults=(None, None, None))
+
+# Tipurile de mișcări raportate ca intrări, respectiv ieșiri
+TIPURI_INTRARI = ("sold_initial", "intrare", "modificare_intrare", "anulare_intrare")
+TIPURI_IESIRI = ("consum", "restituire")
+
+
+class StocInsuficient(Exception):
+    """Mișcarea ar face stocul hârtiei negativ"""
+
+    def __init__(self, sortiment, necesar, disponibil):
+        self.sortiment = sortiment
+        self.necesar = necesar
+        self.disponibil = disponibil
+        super().__init__(
+            f"Stoc insuficient pentru {sortiment}! Necesare: {necesar:.2f} coli, Disponibile: {disponibil:.2f} coli"
+        )
+
+
+def consum_comanda(total_coli, format_hartie, coala_tipar):
+    """Consumul de coli mari al unei comenzi, ca la finalizare (indice 1 pentru combinații necunoscute)"""
+    if not total_coli or total_coli <= 0 or not coala_tipar:
+        return 0.0
+    return float(calculator.consum_hartie([total_coli], [format_hartie], [coala_tipar], indice_implicit=1)[0])
+
+
+def inregistreaza_miscari(session, hartie_id, miscari, permite_negativ=False):
+    """
+    Aplică mai multe mișcări pe stocul unei hârtii, cu un singur UPDATE
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        hartie_id: ID-ul hârtiei
+        miscari: Listă de `Miscare`
+        permite_negativ: Dacă False, o scădere sub zero ridică StocInsuficient
+
+    Returns:
+        float: Soldul nou al hârtiei
+    """
+    miscari = [m for m in miscari if m.cantitate]
+    if not miscari:
+        return session.query(Hartie.stoc).filter(Hartie.id == hartie_id).scalar()
+
+    delta = sum(m.cantitate for m in miscari)
+    actualizare = (
+        update(Hartie)
+        .where(Hartie.id == hartie_id)
+        .values(
+            stoc=Hartie.stoc + delta,
+            # Formularele de editare deschise înainte de mișcare vor semnala conflictul
+            versiune=Hartie.versiune + 1,
+        )
+        .returning(Hartie.stoc)
+    )
+    if delta < 0 and not permite_negativ:
+        actualizare = actualizare.where(Hartie.stoc + delta >= 0)
+    sold = session.execute(actualizare).scalar()
+
+    if sold is None:
+        hartie = session.query(Hartie.sortiment, Hartie.stoc).filter(Hartie.id == hartie_id).first()
+        if hartie is None:
+            raise ValueError(f"Hârtia cu ID {hartie_id} nu există!")
+        raise StocInsuficient(hartie.sortiment, -delta, hartie.stoc)
+
+    # Soldurile intermediare, în ordinea mișcărilor; ultimul este exact soldul returnat
+    sold_curent = sold - delta
+    azi = date.today()
+    for i, miscare in enumerate(miscari):
+        sold_curent = sold if i == len(miscari) - 1 else sold_curent + miscare.cantitate
+        session.add(MiscareStoc(hartie_id=hartie_id, data=azi, sold=sold_curent, **miscare._asdict()))
+    return sold
+
+
+def inregistreaza_miscare(session, hartie_id, cantitate, tip, permite_negativ=False, **detalii):
+    """
+    Aplică o singură mișcare pe stocul unei hârtii (vezi `inregistreaza_miscari`)
+
+    Args:
+        detalii: comanda_id, stoc_id, descriere
+
+    Returns:
+        float: Soldul nou al hârtiei
+    """
+    return inregistreaza_miscari(session, hartie_id, [Miscare(cantitate, tip, **detalii)], permite_negativ)
+
+
+def corecteaza_stoc(session, hartie_id, stoc_nou, descriere=None):
+    """
+    Aduce stocul unei hârtii la o valoare dată (inventar), printr-o mișcare de corecție
+
+    Returns:
+        float: Diferența înregistrată (0 dacă stocul era deja la valoarea cerută)
+    """
+    stoc_actual = session.query(Hartie.stoc).filter(Hartie.id == hartie_id).with_for_update().scalar()
+    diferenta = stoc_nou - (stoc_actual or 0.0)
+    if abs(diferenta) < 1e-9:
+        return 0.0
+    inregistreaza_miscare(session, hartie_id, diferenta, "corectie", permite_negativ=True, descriere=descriere)
+    return diferenta
+
+
+def sold_la_data(data):
+    """Subinterogare corelată: soldul hârtiei la sfârșitul zilei `data` (NULL fără mișcări până atunci)"""
+    return (
+        select(MiscareStoc.sold)
+        .where(MiscareStoc.hartie_id == Hartie.id, MiscareStoc.data <= data)
+        .order_by(MiscareStoc.data.desc(), MiscareStoc.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def stoc_la_data(session, data):
+    """
+    Stocul fiecărei hârtii la sfârșitul unei zile
+
+    Returns:
+        dict: {hartie_id: stoc}
+    """
+    return dict(session.execute(select(Hartie.id, func.coalesce(sold_la_data(data), 0.0))).all())
+
+
+def suma_miscari(data_inceput, data_sfarsit, tipuri):
+    """Subinterogare corelată: suma mișcărilor hârtiei de tipurile date într-o perioadă"""
+    return (
+        select(func.coalesce(func.sum(MiscareStoc.cantitate), 0.0))
+        .where(and_(
+            MiscareStoc.hartie_id == Hartie.id,
+            MiscareStoc.data >= data_inceput,
+            MiscareStoc.data <= data_sfarsit,
+            MiscareStoc.tip.in_(tipuri),
+        ))
+        .scalar_subquery()
+    )
+
+
+def sold_initial_perioada(data_inceput):
+    """Soldul la începutul unei perioade (sfârșitul zilei precedente)"""
+    return func.coalesce(sold_la_data(data_inceput - timedelta(days=1)), 0.0)
@@ -0,0 +1,157 @@
+# app/services/stari_comenzi.py
+"""
+Tranziții de stare pentru comenzi, aplicate în lot.
+
+Finalizarea unei comenzi scade din stoc consumul de hârtie
+(total_coli / indicele colii de tipar), iar revenirea la „In lucru”
+îl restituie. Pentru un lot de comenzi:
+- comenzile și sortimentele de hârtie implicate sunt blocate o singură dată
+  (SELECT ... FOR UPDATE, hârtiile în ordinea id-ului, pentru a evita deadlock-uri);
+- stocul este validat agregat, pe sortiment;
+- se execută un singur UPDATE pe sortiment și câte unul pentru fiecare stare țintă;
+- fiecare consum/restituire se înregistrează în registrul de stoc (`miscari_stoc`);
+- totul se confirmă într-un singur commit (sau nimic, la eroare).
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+from models.comenzi import Comanda
+from models.hartie import Hartie
+from services import calculator
+from services.registru_stoc import Miscare, inregistreaza_miscari
+
+STARI_MANUALE = ("In lucru", "Finalizată")
+
+
+def schimba_starea_comenzi(session, comenzi_ids: Iterable[int], stare_noua: str) -> Tuple[bool, str]:
+    """
+    Schimbă starea mai multor comenzi în aceeași stare, într-o singură tranzacție
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        comenzi_ids: ID-urile comenzilor
+        stare_noua: "Finalizată" (scade stocul) sau "In lucru" (restituie stocul)
+
+    Returns:
+        Tuple[bool, str]: (success, message)
+    """
+    return aplica_tranzitii(session, {comanda_id: stare_noua for comanda_id in comenzi_ids})
+
+
+def aplica_tranzitii(session, stari_noi: Dict[int, str], confirma: bool = True) -> Tuple[bool, str]:
+    """
+    Aplică stări noi (posibil diferite) pentru mai multe comenzi, într-o singură tranzacție
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        stari_noi: Dicționar {id comandă: stare nouă}
+        confirma: False lasă commit-ul apelantului, pentru a salva tranziția împreună
+            cu alte modificări ale comenzii (la eroare se face totuși rollback)
+
+    Returns:
+        Tuple[bool, str]: (success, message)
+    """
+    if any(stare not in STARI_MANUALE for stare in stari_noi.values()):
+        return False, "⚠️ Starea 'Facturată' se setează automat din modulul de Facturare!"
+
+    stari_noi = {int(comanda_id): stare for comanda_id, stare in stari_noi.items()}
+    comenzi_ids = sorted(stari_noi)
+    if not comenzi_ids:
+        return True, "Nu există comenzi de actualizat."
+
+    try:
+        comenzi = (
+            session.query(Comanda.id, Comanda.numar_comanda, Comanda.stare, Comanda.facturata,
+                          Comanda.total_coli, Comanda.coala_tipar, Comanda.hartie_id)
+            .filter(Comanda.id.in_(comenzi_ids))
+            .order_by(Comanda.id)
+            .with_for_update()
+            .all()
+        )
+
+        facturate = [c for c in comenzi if c.facturata]
+        if facturate:
+            session.rollback()
+            numere = ", ".join(f"#{int(c.numar_comanda)}" for c in facturate)
+            return False, f"⚠️ Comenzile {numere} sunt facturate și nu pot fi modificate!"
+
+        # Comenzile deja în starea cerută nu mișcă stocul
+        de_modificat = [c for c in comenzi if c.stare != stari_noi[c.id]]
+        if not de_modificat:
+            session.rollback()
+            return True, "Nu există comenzi de actualizat."
+
+        hartii = {
+            h.id: h for h in session.query(Hartie.id, Hartie.sortiment, Hartie.stoc, Hartie.format_hartie)
+            .filter(Hartie.id.in_({c.hartie_id for c in de_modificat}))
+            .order_by(Hartie.id)
+            .with_for_update()
+            .all()
+        }
+
+        cu_consum = [c for c in de_modificat if c.total_coli and c.total_coli > 0 and c.coala_tipar]
+        lipsa_hartie = [c for c in cu_consum if c.hartie_id not in hartii]
+        if lipsa_hartie:
+            session.rollback()
+            numere = ", ".join(f"#{int(c.numar_comanda)}" for c in lipsa_hartie)
+            return False, f"Eroare: Hârtia nu a fost găsită pentru comenzile {numere}!"
+
+        consumuri = calculator.consum_hartie(
+            [c.total_coli for c in cu_consum],
+            [hartii[c.hartie_id].format_hartie for c in cu_consum],
+            [c.coala_tipar for c in cu_consum],
+            indice_implicit=1,
+        ) if cu_consum else []
+
+        # Finalizarea scade stocul, revenirea din „Finalizată” la „In lucru” îl restituie
+        delta_pe_hartie = defaultdict(float)
+        miscari_pe_hartie = defaultdict(list)
+        for comanda, consum in zip(cu_consum, consumuri):
+            if stari_noi[comanda.id] == "Finalizată":
+                miscare = Miscare(-float(consum), "consum", comanda.id)
+            elif comanda.stare == "Finalizată":
+                miscare = Miscare(float(consum), "restituire", comanda.id)
+            else:
+                continue
+            delta_pe_hartie[comanda.hartie_id] += miscare.cantitate
+            miscari_pe_hartie[comanda.hartie_id].append(
+                miscare._replace(descriere=f"Comanda #{int(comanda.numar_comanda)}")
+            )
+
+        insuficient = [
+            f"{hartii[h_id].sortiment} (necesare: {-delta:.2f} coli, disponibile: {hartii[h_id].stoc:.2f} coli)"
+            for h_id, delta in delta_pe_hartie.items()
+            if hartii[h_id].stoc + delta < 0
+        ]
+        if insuficient:
+            session.rollback()
+            return False, "❌ Stoc insuficient pentru: " + "; ".join(insuficient)
+
+        # Un UPDATE pe sortiment, cu câte o mișcare în registru pentru fiecare comandă
+        for h_id, miscari in miscari_pe_hartie.items():
+            inregistreaza_miscari(session, h_id, miscari)
+
+        # Un UPDATE pentru fiecare stare țintă (cel mult două)
+        pe_stare = defaultdict(list)
+        for comanda in de_modificat:
+            pe_stare[stari_noi[comanda.id]].append(comanda.id)
+        for stare, ids in pe_stare.items():
+            session.query(Comanda).filter(Comanda.id.in_(ids)).update(
+                {Comanda.stare: stare, Comanda.versiune: Comanda.versiune + 1}, synchronize_session=False
+            )
+        if confirma:
+            session.commit()
+        # UPDATE-urile de mai sus ocolesc sesiunea - starea și versiunea se recitesc
+        session.expire_all()
+
+        mesaje = []
+        if pe_stare.get("Finalizată"):
+            mesaje.append(f"{len(pe_stare['Finalizată'])} comenzi finalizate")
+        if pe_stare.get("In lucru"):
+            mesaje.append(f"{len(pe_stare['In lucru'])} comenzi revenite la 'In lucru'")
+        total_stoc = sum(delta_pe_hartie.values())
+        detalii_stoc = f" Stoc actualizat: {total_stoc:+.2f} coli" if total_stoc else ""
+        return True, f"✅ {', '.join(mesaje)}!{detalii_stoc}"
+
+    except Exception as e:
+        session.rollback()
+        return False, f"Eroare la actualizare: {e}"
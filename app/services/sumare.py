@@ -0,0 +1,267 @@
+# app/services/sumare.py
+"""
+Sumare lunare pentru rapoarte (pe lună × beneficiar și pe lună × hârtie).
+
+Tabelele `sumar_lunar_beneficiar` și `sumar_lunar_hartie` păstrează, pentru
+fiecare lună și separat pentru comenzile facturate/nefacturate: numărul de
+comenzi, tirajul, totalul colilor de tipar, consumul în coli mari
+(total_coli / indicele colii de tipar, din `compatibilitate_coala`; 0 pentru
+combinațiile necunoscute) și valoarea.
+
+Întreținere:
+- incremental: orice commit care adaugă, modifică sau șterge comenzi
+  recalculează, în aceeași tranzacție, doar lunile atinse (evenimentele
+  sesiunii sunt înregistrate în models/__init__.py). Actualizările în masă
+  (`query.update`) nu trec prin aceste evenimente - cele existente modifică
+  doar starea, care nu intră în sumare;
+- complet: `reconstruieste_sumare` - rulat de scheduler (backup_scheduler.py)
+  și de scriptul de migrare, acoperă modificările făcute direct în baza de
+  date sau schimbarea matricei de compatibilitate.
+
+Rapoartele citesc lunile complete din sumare și doar zilele de la marginile
+perioadei (luni incomplete) din `comenzi`.
+"""
+import logging
+from datetime import timedelta
+from itertools import chain
+from sqlalchemy import BigInteger, Date, Float, and_, cast, delete, func, inspect, or_, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert
+from models.coale import CompatibilitateCoala
+from models.comenzi import Comanda
+from models.hartie import Hartie
+from models.sumare import SumarLunarBeneficiar, SumarLunarHartie
+
+logger = logging.getLogger(__name__)
+
+# Cheia din `session.info` cu lunile de recalculat la commit
+_CHEIE_LUNI = "sumare_luni_modificate"
+# Marcaj pentru reconstrucția completă (lună necunoscută, format de hârtie schimbat)
+_TOATE = "toate"
+
+# Câmpurile comenzii care influențează sumarele; total_coli este generat în baza de date
+# din tiraj, nr_pagini, nr_pagini_pe_coala și coli_prisoase
+CAMPURI_RELEVANTE = ("data", "beneficiar_id", "hartie_id", "facturata", "tiraj", "nr_pagini",
+                     "nr_pagini_pe_coala", "coli_prisoase", "coala_tipar", "pret")
+
+# Refreshurile concurente se serializează (DELETE + INSERT pe aceleași luni)
+_CHEIE_BLOCARE = 720_015
+
+# Tabela sumar și coloana comenzii pentru fiecare dimensiune
+DIMENSIUNI = {
+    "beneficiar": (SumarLunarBeneficiar, SumarLunarBeneficiar.beneficiar_id, Comanda.beneficiar_id),
+    "hartie": (SumarLunarHartie, SumarLunarHartie.hartie_id, Comanda.hartie_id),
+}
+
+MASURI = ("nr_comenzi", "tiraj", "total_coli", "consum", "valoare")
+
+_tabele_disponibile = None
+
+
+def luna(data):
+    """Prima zi a lunii unei date"""
+    return data.replace(day=1)
+
+
+def _luna_urmatoare(data):
+    return (data.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _masuri_comenzi():
+    consum = func.coalesce(Comanda.total_coli / cast(CompatibilitateCoala.indice, Float), 0.0)
+    return (
+        func.count(Comanda.id).label("nr_comenzi"),
+        func.coalesce(func.sum(Comanda.tiraj), 0).label("tiraj"),
+        func.coalesce(func.sum(Comanda.total_coli), 0).label("total_coli"),
+        func.coalesce(func.sum(consum), 0.0).label("consum"),
+        func.coalesce(func.sum(Comanda.pret), 0.0).label("valoare"),
+    )
+
+
+def _din_comenzi(*coloane):
+    """SELECT agregat din comenzi, cu indicele colii de tipar pentru consum"""
+    return (
+        select(*coloane, *_masuri_comenzi())
+        .select_from(Comanda)
+        .join(Hartie, Comanda.hartie_id == Hartie.id)
+        .outerjoin(
+            CompatibilitateCoala,
+            (CompatibilitateCoala.format_hartie == Hartie.format_hartie)
+            & (CompatibilitateCoala.coala_tipar == Comanda.coala_tipar),
+        )
+        .group_by(*coloane)
+    )
+
+
+def _tabele_exista(session):
+    # Baza nemigrată nu trebuie să blocheze salvarea comenzilor
+    global _tabele_disponibile
+    if _tabele_disponibile is None:
+        _tabele_disponibile = all(
+            session.execute(text("SELECT to_regclass(:tabela)"), {"tabela": model.__tablename__}).scalar()
+            for model, _, _ in DIMENSIUNI.values()
+        )
+        if not _tabele_disponibile:
+            logger.warning("Tabelele de sumar lipsesc - rulați script_migrare.py")
+    return _tabele_disponibile
+
+
+def _recalculeaza(session, conditie_sumar, conditie_comenzi):
+    session.flush()
+    session.execute(select(func.pg_advisory_xact_lock(_CHEIE_BLOCARE)))
+    luna_comenzii = cast(func.date_trunc("month", Comanda.data), Date).label("luna")
+    for model, coloana_sumar, coloana_comanda in DIMENSIUNI.values():
+        stergere = delete(model)
+        if conditie_sumar is not None:
+            stergere = stergere.where(conditie_sumar(model))
+        session.execute(stergere)
+
+        agregare = _din_comenzi(luna_comenzii, coloana_comanda.label(coloana_sumar.key), Comanda.facturata)
+        if conditie_comenzi is not None:
+            agregare = agregare.where(conditie_comenzi)
+        session.execute(
+            insert(model).from_select(["luna", coloana_sumar.key, "facturata", *MASURI], agregare)
+        )
+
+
+def reimprospateaza_luni(session, luni):
+    """
+    Recalculează sumarele pentru lunile date, în tranzacția curentă (fără commit)
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        luni: Date din lunile de recalculat (orice zi a lunii)
+    """
+    luni = sorted({luna(l) for l in luni})
+    if not luni:
+        return
+    _recalculeaza(
+        session,
+        lambda model: model.luna.in_(luni),
+        # Intervale pe `data`, pentru a folosi indexul ix_comenzi_data
+        or_(*[and_(Comanda.data >= l, Comanda.data < _luna_urmatoare(l)) for l in luni]),
+    )
+
+
+def reconstruieste_sumare(session):
+    """Recalculează toate sumarele, în tranzacția curentă (fără commit)"""
+    _recalculeaza(session, None, None)
+
+
+def _luni_comanda(comanda, sterse=False):
+    # Istoricul câmpului `data` conține atât luna veche, cât și pe cea nouă
+    istoric = inspect(comanda).attrs.data.history
+    luni = {luna(d) for d in chain(istoric.added, istoric.unchanged, istoric.deleted) if d}
+    if not luni and not sterse:
+        luni.add(luna(comanda.data))
+    return luni or {_TOATE}
+
+
+def inregistreaza_modificari(session, flush_context):
+    """Eveniment after_flush: reține lunile atinse de comenzile salvate"""
+    luni = session.info.setdefault(_CHEIE_LUNI, set())
+    for obiect in session.new:
+        if isinstance(obiect, Comanda):
+            luni |= _luni_comanda(obiect)
+    for obiect in session.dirty:
+        if isinstance(obiect, Comanda):
+            stare = inspect(obiect)
+            if any(stare.attrs[camp].history.has_changes() for camp in CAMPURI_RELEVANTE):
+                luni |= _luni_comanda(obiect)
+        elif isinstance(obiect, Hartie) and inspect(obiect).attrs.format_hartie.history.has_changes():
+            # Formatul hârtiei schimbă indicele (deci consumul) în toate lunile
+            luni.add(_TOATE)
+    for obiect in session.deleted:
+        if isinstance(obiect, Comanda):
+            luni |= _luni_comanda(obiect, sterse=True)
+    if not luni:
+        session.info.pop(_CHEIE_LUNI, None)
+
+
+def actualizeaza_la_commit(session):
+    """Eveniment before_commit: recalculează lunile atinse în tranzacția care se confirmă"""
+    session.flush()
+    luni = session.info.pop(_CHEIE_LUNI, None)
+    if not luni or not _tabele_exista(session):
+        return
+    if _TOATE in luni:
+        reconstruieste_sumare(session)
+    else:
+        reimprospateaza_luni(session, luni)
+
+
+def renunta_la_rollback(session):
+    """Eveniment after_rollback: modificările anulate nu mai trebuie recalculate"""
+    session.info.pop(_CHEIE_LUNI, None)
+
+
+def _limite_luni_complete(data_inceput, data_sfarsit):
+    """Intervalul [prima, sfarsit) al lunilor cuprinse complet în perioadă (None = nelimitat)"""
+    prima = None
+    if data_inceput is not None:
+        prima = data_inceput if data_inceput.day == 1 else _luna_urmatoare(data_inceput)
+    sfarsit = None if data_sfarsit is None else luna(data_sfarsit + timedelta(days=1))
+    return prima, sfarsit
+
+
+def select_totaluri(dimensiune, data_inceput=None, data_sfarsit=None, facturata=None):
+    """
+    SELECT-ul grupat pe dimensiune (coloane: id + măsuri) pentru o perioadă
+
+    Lunile complete se citesc din sumare; zilele din lunile incomplete de la
+    marginile perioadei se agregă direct din `comenzi`. Poate fi folosit
+    ca subinterogare (join cu nume, ordonare, limită).
+    """
+    model, coloana_sumar, coloana_comanda = DIMENSIUNI[dimensiune]
+    prima, sfarsit = _limite_luni_complete(data_inceput, data_sfarsit)
+    parti = []
+
+    if prima is not None and sfarsit is not None and prima >= sfarsit:
+        # Nicio lună completă - totul din comenzi
+        margini = [and_(Comanda.data >= data_inceput, Comanda.data <= data_sfarsit)]
+    else:
+        conditii = [model.luna >= prima] if prima is not None else []
+        if sfarsit is not None:
+            conditii.append(model.luna < sfarsit)
+        if facturata is not None:
+            conditii.append(model.facturata == facturata)
+        parti.append(
+            select(coloana_sumar.label("id"), *[getattr(model, masura).label(masura) for masura in MASURI])
+            .where(*conditii)
+        )
+        margini = []
+        if data_inceput is not None and data_inceput < prima:
+            margini.append(and_(Comanda.data >= data_inceput, Comanda.data < prima))
+        if data_sfarsit is not None and sfarsit <= data_sfarsit:
+            margini.append(and_(Comanda.data >= sfarsit, Comanda.data <= data_sfarsit))
+
+    if margini:
+        conditii = [or_(*margini)]
+        if facturata is not None:
+            conditii.append(Comanda.facturata == facturata)
+        parti.append(_din_comenzi(coloana_comanda.label("id")).where(*conditii))
+
+    totaluri = union_all(*parti).subquery() if len(parti) > 1 else parti[0].subquery()
+    return (
+        select(totaluri.c.id, *[
+            cast(func.sum(totaluri.c[masura]), Float if masura in ("consum", "valoare") else BigInteger).label(masura)
+            for masura in MASURI
+        ])
+        .group_by(totaluri.c.id)
+    )
+
+
+def totaluri_pe_perioada(session, dimensiune, data_inceput=None, data_sfarsit=None, facturata=None):
+    """
+    Totalurile comenzilor pe beneficiar sau pe hârtie pentru o perioadă
+
+    Args:
+        session: Sesiunea SQLAlchemy
+        dimensiune: "beneficiar" sau "hartie"
+        data_inceput: Prima zi inclusă (None = fără limită)
+        data_sfarsit: Ultima zi inclusă (None = fără limită)
+        facturata: True/False pentru a filtra după facturare, None pentru toate
+
+    Returns:
+        list: Rânduri cu câmpurile id, nr_comenzi, tiraj, total_coli, consum, valoare
+    """
+    return session.execute(select_totaluri(dimensiune, data_inceput, data_sfarsit, facturata)).all()
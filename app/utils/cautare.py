@@ -0,0 +1,87 @@
+# app/utils/cautare.py
+"""
+Selector cu căutare pe server pentru listele mari (comenzi, intrări de stoc).
+
+Un câmp de text și un selectbox cu doar primele N potriviri, returnate de o
+funcție de căutare din services/cautare.py. Browserul primește cel mult
+N etichete la fiecare rerun, oricât de mare ar fi tabela. Dacă rezultatele
+se schimbă și opțiunea aleasă nu mai este printre ele, selectbox-ul revine
+la primul rezultat.
+"""
+import streamlit as st
+from services.cautare import LIMITA_REZULTATE
+
+
+def selector_cautare(key, eticheta, cauta, limita=LIMITA_REZULTATE, optional=False,
+                     placeholder="Nr., nume, factură...", help=None):
+    """
+    Afișează căutarea și selectorul, returnează id-ul opțiunii alese
+
+    Args:
+        key: Cheie unică în session_state pentru acest selector
+        eticheta: Textul selectbox-ului
+        cauta: Funcție (text, limita) -> list[Optiune]
+        limita: Numărul maxim de opțiuni afișate
+        optional: Adaugă o opțiune goală (implicit nimic selectat)
+        placeholder: Textul ajutător din câmpul de căutare
+        help: Explicația afișată lângă selectbox
+
+    Returns:
+        int | None: Id-ul opțiunii alese sau None (nicio potrivire / nimic selectat)
+    """
+    text = st.text_input(f"🔍 Caută - {eticheta.rstrip(':')}", key=f"{key}_text",
+                         placeholder=placeholder).strip()
+
+    # Un rezultat în plus arată dacă lista a fost trunchiată
+    optiuni = cauta(text, limita + 1)
+    trunchiata = len(optiuni) > limita
+    optiuni = optiuni[:limita]
+
+    if not optiuni:
+        st.info("Niciun rezultat pentru căutarea introdusă." if text else "Nu există înregistrări.")
+        return None
+
+    etichete = {o.id: o.eticheta for o in optiuni}
+    ids = ([None] if optional else []) + list(etichete)
+    ales = st.selectbox(eticheta, ids, format_func=lambda i: "" if i is None else etichete[i],
+                        key=f"{key}_selectie", help=help)
+    if trunchiata:
+        st.caption(f"Sunt afișate primele {limita} rezultate - restrânge căutarea pentru altele.")
+    return ales
+
+
+def selector_cautare_multiplu(key, eticheta, cauta, limita=LIMITA_REZULTATE,
+                              placeholder="Nr., nume, factură...", help=None):
+    """
+    Ca `selector_cautare`, dar cu selecție multiplă păstrată între căutări
+
+    Opțiunile sunt rezultatele căutării curente plus cele deja alese, deci
+    se pot aduna înregistrări din mai multe căutări succesive.
+
+    Returns:
+        list[int]: Id-urile alese, în ordinea selecției
+    """
+    alese = st.session_state.setdefault(f"{key}_alese", {})
+    text = st.text_input(f"🔍 Caută - {eticheta.rstrip(':')}", key=f"{key}_text",
+                         placeholder=placeholder).strip()
+
+    optiuni = cauta(text, limita + 1)
+    trunchiata = len(optiuni) > limita
+
+    # Rezultatele primele, ca o alegere din ele să nu schimbe lista de opțiuni (și widget-ul)
+    etichete = {o.id: o.eticheta for o in optiuni[:limita]}
+    for id_ales, eticheta_aleasa in alese.items():
+        etichete.setdefault(id_ales, eticheta_aleasa)
+
+    ids = st.multiselect(eticheta, list(etichete), default=list(alese), format_func=etichete.get,
+                         key=f"{key}_selectie", help=help)
+    st.session_state[f"{key}_alese"] = {i: etichete[i] for i in ids}
+    if trunchiata:
+        st.caption(f"Sunt afișate primele {limita} rezultate - restrânge căutarea pentru altele.")
+    return ids
+
+
+def reseteaza_selector_multiplu(key):
+    """Golește selecția și căutarea unui `selector_cautare_multiplu`"""
+    for sufix in ("alese", "text", "selectie"):
+        st.session_state.pop(f"{key}_{sufix}", None)
@@ -0,0 +1,47 @@
+# app/utils/concurenta.py
+"""
+Blocare optimistă pentru formularele de editare.
+
+`Hartie` și `Comanda` au o coloană `versiune` (version_id_col): orice
+UPDATE prin ORM verifică în WHERE versiunea citită și o incrementează, iar
+dacă rândul s-a modificat între timp ORM-ul ridică StaleDataError.
+Actualizările în masă (tranziții de stare, registrul de stoc) incrementează
+versiunea explicit.
+
+Un formular Streamlit se salvează într-o rulare nouă a paginii, care
+recitește obiectul din baza de date; de aceea versiunea văzută la
+deschiderea formularului se reține în `st.session_state` și se compară
+la salvare.
+"""
+import streamlit as st
+
+MESAJ_CONFLICT = (
+    "⚠️ {} a fost modificată de alt utilizator după deschiderea formularului. "
+    "Datele au fost reîncărcate - verifică-le și salvează din nou."
+)
+
+
+def retine_versiune(cheie, obiect):
+    """Reține versiunea obiectului la prima afișare a formularului de editare"""
+    retinuta = st.session_state.get(cheie)
+    if retinuta is None or retinuta[0] != obiect.id:
+        st.session_state[cheie] = (obiect.id, obiect.versiune)
+
+
+def uita_versiune(cheie):
+    """Renunță la versiunea reținută (formular închis, salvat sau în conflict)"""
+    st.session_state.pop(cheie, None)
+
+
+def modificat_intre_timp(cheie, obiect):
+    """True dacă obiectul are altă versiune decât cea de la deschiderea formularului"""
+    retinuta = st.session_state.get(cheie)
+    return retinuta is not None and retinuta[0] == obiect.id and retinuta[1] != obiect.versiune
+
+
+def raporteaza_conflict(session, cheie, denumire):
+    """Anulează tranzacția și afișează conflictul; formularul se redeschide cu datele noi"""
+    session.rollback()
+    uita_versiune(cheie)
+    st.error(MESAJ_CONFLICT.format(denumire))
+
@@ -0,0 +1,28 @@
+# app/utils/navigare.py
+"""
+Navigare între secțiunile unei pagini, cu execuție doar pentru secțiunea activă.
+
+`st.tabs` execută la fiecare rulare corpul tuturor taburilor (doar
+afișarea lor este ascunsă), deci orice interacțiune plătea interogările
+tuturor taburilor. Aici secțiunile sunt funcții, iar un selector orizontal
+o alege pe cea care se execută. Selecția se păstrează în `st.session_state`,
+deci rămâne activă și după `st.rerun()`.
+"""
+import streamlit as st
+
+
+def afiseaza_sectiunea(key, sectiuni, *args, **kwargs):
+    """
+    Afișează selectorul de secțiuni și execută doar secțiunea activă
+
+    Args:
+        key: Cheie unică în session_state pentru pagina curentă
+        sectiuni: Dicționar {titlu: funcție}, în ordinea afișării
+        *args, **kwargs: Transmise funcției secțiunii active (ex: sesiunea)
+
+    Returns:
+        Rezultatul funcției secțiunii active
+    """
+    activa = st.radio("Secțiune", list(sectiuni), key=key, horizontal=True, label_visibility="collapsed")
+    st.divider()
+    return sectiuni[activa](*args, **kwargs)
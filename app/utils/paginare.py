@@ -0,0 +1,119 @@
+# app/utils/paginare.py
+"""
+Paginare pe server (keyset / seek) pentru tabelele mari din Streamlit.
+
+În loc de OFFSET, fiecare pagină este citită cu o condiție de tip
+`(cheie) < (ultima cheie afișată)` pe o coloană indexată, deci timpul de
+randare nu crește odată cu istoricul. Numărul total se obține cu un
+`COUNT` separat, fără materializarea rândurilor.
+"""
+import math
+import streamlit as st
+from sqlalchemy import tuple_
+
+MARIMI_PAGINA = (25, 50, 100, 200)
+
+
+class PaginareKeyset:
+    """Stare și controale pentru paginarea keyset a unei interogări"""
+
+    def __init__(self, key, chei, descrescator=True, marimi=MARIMI_PAGINA):
+        """
+        Args:
+            key: Cheie unică în session_state pentru acest tabel
+            chei: Expresiile SQLAlchemy după care se sortează (ultima trebuie să fie unică)
+            descrescator: True pentru cele mai noi înregistrări primele
+            marimi: Opțiunile pentru numărul de rânduri pe pagină
+        """
+        self.key = key
+        self.chei = list(chei)
+        self.descrescator = descrescator
+        self.marimi = marimi
+        self.total = 0
+        self._ultima_cheie = None
+
+        if key not in st.session_state:
+            st.session_state[key] = {"cursori": [None], "marime": marimi[0], "semnatura": None}
+        self._stare = st.session_state[key]
+
+    @property
+    def pagina_curenta(self):
+        """Indexul (de la 0) al paginii afișate"""
+        return len(self._stare["cursori"]) - 1
+
+    @property
+    def marime(self):
+        return self._stare["marime"]
+
+    def _semnatura(self, query):
+        """Identifică filtrele interogării - la schimbarea lor paginarea se resetează"""
+        compilat = query.statement.compile()
+        return hash((str(compilat), repr(sorted(compilat.params.items()))))
+
+    def _reseteaza(self):
+        self._stare["cursori"] = [None]
+
+    def pagina(self, query, cheie_rand):
+        """
+        Returnează rândurile paginii curente
+
+        Args:
+            query: Interogarea filtrată (fără ORDER BY / LIMIT)
+            cheie_rand: Funcție care extrage din rând valorile cheilor de sortare
+
+        Returns:
+            list: Rândurile paginii curente
+        """
+        semnatura = self._semnatura(query)
+        if semnatura != self._stare["semnatura"]:
+            self._stare["semnatura"] = semnatura
+            self._reseteaza()
+
+        self.total = query.order_by(None).count()
+
+        ordine = [c.desc() for c in self.chei] if self.descrescator else list(self.chei)
+        query_pagina = query.order_by(None).order_by(*ordine)
+
+        cursor = self._stare["cursori"][-1]
+        if cursor is not None:
+            if self.descrescator:
+                query_pagina = query_pagina.filter(tuple_(*self.chei) < tuple_(*cursor))
+            else:
+                query_pagina = query_pagina.filter(tuple_(*self.chei) > tuple_(*cursor))
+
+        rows = query_pagina.limit(self.marime).all()
+        self._ultima_cheie = tuple(cheie_rand(rows[-1])) if rows else None
+        return rows
+
+    def _urmator(self, cheie):
+        self._stare["cursori"].append(cheie)
+
+    def _anterior(self):
+        if len(self._stare["cursori"]) > 1:
+            self._stare["cursori"].pop()
+
+    def _schimba_marime(self):
+        self._stare["marime"] = st.session_state[f"{self.key}_marime"]
+        self._reseteaza()
+
+    def controale(self):
+        """Afișează navigarea între pagini și selectorul de mărime"""
+        nr_pagini = max(1, math.ceil(self.total / self.marime))
+        are_urmator = self._ultima_cheie is not None and self.pagina_curenta + 1 < nr_pagini
+
+        col1, col2, col3, col4 = st.columns([1, 1, 2, 1])
+        with col1:
+            st.button("⏮ Prima", key=f"{self.key}_prima", disabled=self.pagina_curenta == 0,
+                      on_click=self._reseteaza, use_container_width=True)
+        with col2:
+            st.button("◀ Anterior", key=f"{self.key}_anterior", disabled=self.pagina_curenta == 0,
+                      on_click=self._anterior, use_container_width=True)
+        with col3:
+            st.button("Următor ▶", key=f"{self.key}_urmator", disabled=not are_urmator,
+                      on_click=self._urmator, args=(self._ultima_cheie,), use_container_width=True)
+        with col4:
+            st.selectbox("Rânduri/pagină", self.marimi, index=self.marimi.index(self.marime),
+                         key=f"{self.key}_marime", on_change=self._schimba_marime,
+                         label_visibility="collapsed")
+
+        st.caption(f"Pagina {self.pagina_curenta + 1} din {nr_pagini} · {self.total} înregistrări")
@@ -1,294 +1,352 @@
 # app/utils/pdf_utils.py
-from reportlab.lib.pagesizes import A4, A5
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, KeepTogether
+from reportlab.lib.pagesizes import A4, A5, landscape
+from reportlab.platypus import (SimpleDocTemplate, BaseDocTemplate, PageTemplate, Frame, Paragraph, Spacer,
+                                Table, TableStyle, KeepTogether, PageBreak, FrameBreak)
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm, mm
 from reportlab.lib import colors
 from reportlab.pdfgen import canvas
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
 import io
+from types import SimpleNamespace
 from datetime import datetime
 
-def genereaza_comanda_pdf(comanda, beneficiar, hartie):
+# Versiunea șablonului - se incrementează la orice modificare a aspectului PDF-ului
+# comenzii (invalidează PDF-urile din services/cache_pdf.py)
+VERSIUNE_SABLON = 1
+
+# Stilurile sunt construite o singură dată, la importul modulului, și
+# refolosite pentru fiecare comandă (inclusiv în generarea în lot)
+_PADDING_CASETA = [
+    ('LEFTPADDING', (0, 0), (-1, -1), 3),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+]
+
+STIL_ANTET = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+    ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
+])
+
+# Casete cu text bold (beneficiar, lucrare, tiraj - 10pt; FSC, coală, plastifiere - 9pt)
+STIL_CASETA_10 = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+] + _PADDING_CASETA)
+
+STIL_CASETA_9 = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+] + _PADDING_CASETA)
+
+STIL_DESCRIERE = TableStyle([
+    ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),  # Prima linie bold
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),     # Restul normal
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),     # Grid pe toate celulele
+] + _PADDING_CASETA + [
+    ('BACKGROUND', (0, 0), (0, 0), colors.lightgrey),  # Header cu fundal gri
+])
+
+STIL_HARTIE_COLI = TableStyle([
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+] + _PADDING_CASETA)
+
+STIL_FINISARE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('LEFTPADDING', (0, 0), (-1, -1), 3),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+    ('TOPPADDING', (0, 0), (-1, -1), 1.5),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 1.5),
+])
+
+STIL_DETALII = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+] + _PADDING_CASETA)
+
+# Folosim Paragraph pentru hârtie pentru a permite text wrapping pe 2 rânduri
+STIL_HARTIE = ParagraphStyle(
+    'HartieStyle',
+    parent=getSampleStyleSheet()['Normal'],
+    fontName='Helvetica-Bold',
+    fontSize=9,
+    leading=11,
+    alignment=TA_LEFT
+)
+
+# Margini comandă: 15mm stânga (pentru găurire/arhivare), 5mm dreapta, 5mm sus/jos
+MARGINE_STANGA = 15*mm
+MARGINE_DREAPTA = 5*mm
+MARGINE_SUS = 5*mm
+MARGINE_JOS = 5*mm
+
+
+def _caseta(randuri, stil, colWidths=(12.8*cm,), rowHeights=None):
+    tabel = Table(randuri, colWidths=list(colWidths), rowHeights=rowHeights)
+    tabel.setStyle(stil)
+    return tabel
+
+
+def _bifa(valoare):
+    return "[X]" if valoare else "[ ]"
+
+
+def continut_comanda(comanda, beneficiar, hartie):
     """
-    Generează PDF pentru comandă exact conform formularului din comanda.pdf
+    Construiește elementele (flowables) unei comenzi, pentru o pagină A5
+
+    Args:
+        comanda, beneficiar, hartie: Obiecte cu atributele modelelor
+            (instanțe ORM sau obiecte simple cu aceleași câmpuri)
+
+    Returns:
+        list: Elementele gata de adăugat într-un document ReportLab
     """
-    # Creează buffer pentru PDF
-    buffer = io.BytesIO()
-    
-    # Configurare document - A5 format (148 x 210 mm)
-    # Margini: 15mm stânga (pentru găurire/arhivare), 5mm dreapta, 5mm sus/jos
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A5,
-        rightMargin=5*mm,
-        leftMargin=15*mm,
-        topMargin=5*mm,
-        bottomMargin=5*mm
-    )
-    
-    # Stiluri
-    styles = getSampleStyleSheet()
-    
-    # Construire conținut
     story = []
     
     # Header cu echipament, număr comandă și dată
     data_comanda = comanda.data.strftime("%d-%m-%Y")
     numar_comanda_int = int(comanda.numar_comanda) if comanda.numar_comanda else comanda.numar_comanda
-    header_data = [
-        [comanda.echipament, f"COMANDA NR. {numar_comanda_int}/{data_comanda}"]
-    ]
-    header_table = Table(header_data, colWidths=[6.4*cm, 6.4*cm], rowHeights=[6*mm])
-    header_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 11),
-        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-        ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
-    ]))
-    story.append(header_table)
+    story.append(_caseta(
+        [[comanda.echipament, f"COMANDA NR. {numar_comanda_int}/{data_comanda}"]],
+        STIL_ANTET, colWidths=(6.4*cm, 6.4*cm), rowHeights=[6*mm]
+    ))
     story.append(Spacer(1, 2*mm))
     
     # BENEFICIAR
-    beneficiar_data = [
-        [f"BENEFICIAR: {beneficiar.nume}"]
-    ]
-    beneficiar_table = Table(beneficiar_data, colWidths=[12.8*cm])
-    beneficiar_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    story.append(beneficiar_table)
+    story.append(_caseta([[f"BENEFICIAR: {beneficiar.nume}"]], STIL_CASETA_10))
     story.append(Spacer(1, 1.5*mm))
     
     # LUCRARE
-    lucrare_data = [
-        [f"LUCRARE: {comanda.nume_lucrare}"]
-    ]
-    lucrare_table = Table(lucrare_data, colWidths=[12.8*cm])
-    lucrare_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    story.append(lucrare_table)
+    story.append(_caseta([[f"LUCRARE: {comanda.nume_lucrare}"]], STIL_CASETA_10))
     story.append(Spacer(1, 1.5*mm))
     
     # TIRAJ și PO CLIENT pe același rând
-    tiraj_po_data = [
-        [f"TIRAJ: {comanda.tiraj}", f"PO CLIENT: {comanda.po_client or ''}"]
-    ]
-    tiraj_po_table = Table(tiraj_po_data, colWidths=[6.4*cm, 6.4*cm])
-    tiraj_po_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    story.append(tiraj_po_table)
+    story.append(_caseta(
+        [[f"TIRAJ: {comanda.tiraj}", f"PO CLIENT: {comanda.po_client or ''}"]],
+        STIL_CASETA_10, colWidths=(6.4*cm, 6.4*cm)
+    ))
     story.append(Spacer(1, 1.5*mm))
     
     # DESCRIERE LUCRARE (mai mare cu bordură)
     descriere_text = comanda.descriere_lucrare or ""
     greutate_text = f"{comanda.greutate:.3f}" if comanda.greutate else "-"
-    descriere_data = [
-        ["DESCRIERE LUCRARE"],
-        [descriere_text],
-        [f"Format: {comanda.latime} x {comanda.inaltime} mm / Nr. pagini: {comanda.nr_pagini} / Greutate: {greutate_text} kg"]
-    ]
-    descriere_table = Table(descriere_data, colWidths=[12.8*cm], rowHeights=[5*mm, 10*mm, 5*mm])
-    descriere_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),  # Prima linie bold
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),     # Restul normal
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),     # Grid pe toate celulele
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-        ('BACKGROUND', (0, 0), (0, 0), colors.lightgrey),  # Header cu fundal gri
-    ]))
-    story.append(descriere_table)
+    story.append(_caseta(
+        [
+            ["DESCRIERE LUCRARE"],
+            [descriere_text],
+            [f"Format: {comanda.latime} x {comanda.inaltime} mm / Nr. pagini: {comanda.nr_pagini} / Greutate: {greutate_text} kg"]
+        ],
+        STIL_DESCRIERE, rowHeights=[5*mm, 10*mm, 5*mm]
+    ))
     story.append(Spacer(1, 1.5*mm))
     
     # CERTIFICARE FSC
-    fsc_checkbox = "[X]" if comanda.certificare_fsc_produs else "[ ]"
-    fsc_text = f"{fsc_checkbox} CERTIFICARE FSC: {comanda.cod_fsc_produs or ''}/{comanda.tip_certificare_fsc_produs or ''}"
-    fsc_data = [
-        [fsc_text]
-    ]
-    fsc_table = Table(fsc_data, colWidths=[12.8*cm])
-    fsc_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    story.append(fsc_table)
+    fsc_text = f"{_bifa(comanda.certificare_fsc_produs)} CERTIFICARE FSC: {comanda.cod_fsc_produs or ''}/{comanda.tip_certificare_fsc_produs or ''}"
+    story.append(_caseta([[fsc_text]], STIL_CASETA_9))
     story.append(Spacer(1, 1.5*mm))
     
     # COALA TIPAR, NR. CULORI și NR. PAG/COALA - toate pe același rând
     nr_pag_coala = getattr(comanda, 'nr_pagini_pe_coala', 2)
-    coala_culori_data = [
-        [f"COALA TIPAR: {comanda.coala_tipar or ''} / NR. CULORI: {comanda.nr_culori} / NR. PAG/COALA: {nr_pag_coala}"]
-    ]
-    coala_culori_table = Table(coala_culori_data, colWidths=[12.8*cm])
-    coala_culori_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    story.append(coala_culori_table)
+    story.append(_caseta(
+        [[f"COALA TIPAR: {comanda.coala_tipar or ''} / NR. CULORI: {comanda.nr_culori} / NR. PAG/COALA: {nr_pag_coala}"]],
+        STIL_CASETA_9
+    ))
     story.append(Spacer(1, 1.5*mm))
     
     # HARTIE, NR. COLI TIPAR și COLI PRISOASE
-    # Folosim Paragraph pentru a permite text wrapping pe 2 rânduri
-    hartie_style = ParagraphStyle(
-        'HartieStyle',
-        parent=styles['Normal'],
-        fontName='Helvetica-Bold',
-        fontSize=9,
-        leading=11,
-        alignment=TA_LEFT
-    )
-    
-    hartie_paragraph = Paragraph(f"HARTIE/GRAMAJ: {hartie.sortiment} ({hartie.gramaj}g)", hartie_style)
-    
-    hartie_coli_data = [
-        [hartie_paragraph],
-        [f"NR. COLI TIPAR: {comanda.nr_coli_tipar or '-'} / COLI PRISOASE: _____________"]
-    ]
-    hartie_coli_table = Table(hartie_coli_data, colWidths=[12.8*cm], rowHeights=[None, 5*mm])
-    hartie_coli_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    story.append(hartie_coli_table)
+    hartie_paragraph = Paragraph(f"HARTIE/GRAMAJ: {hartie.sortiment} ({hartie.gramaj}g)", STIL_HARTIE)
+    story.append(_caseta(
+        [
+            [hartie_paragraph],
+            [f"NR. COLI TIPAR: {comanda.nr_coli_tipar or '-'} / COLI PRISOASE: _____________"]
+        ],
+        STIL_HARTIE_COLI, rowHeights=[None, 5*mm]
+    ))
     story.append(Spacer(1, 1.5*mm))
     
     # PLASTIFIERE
-    plastifiere_data = [
-        [f"PLASTIFIERE: {comanda.plastifiere or ''}"]
-    ]
-    plastifiere_table = Table(plastifiere_data, colWidths=[12.8*cm])
-    plastifiere_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    story.append(plastifiere_table)
+    story.append(_caseta([[f"PLASTIFIERE: {comanda.plastifiere or ''}"]], STIL_CASETA_9))
     story.append(Spacer(1, 1.5*mm))
     
     # FINISARE cu checkboxuri
-    big_checkbox = "[X]" if comanda.big else "[ ]"
-    capsat_checkbox = "[X]" if comanda.capsat else "[ ]"
-    colturi_checkbox = "[X]" if comanda.colturi_rotunde else "[ ]"
-    perfor_checkbox = "[X]" if comanda.perfor else "[ ]"
-    spiralare_checkbox = "[X]" if comanda.spiralare else "[ ]"
-    stantare_checkbox = "[X]" if comanda.stantare else "[ ]"
-    lipire_checkbox = "[X]" if comanda.lipire else "[ ]"
-    wobbler_checkbox = "[X]" if comanda.codita_wobbler else "[ ]"
-    laminare_checkbox = "[X]" if comanda.laminare else "[ ]"
-    taiere_checkbox = "[X]" if comanda.taiere_cutter else "[ ]"
-    
     nr_biguri_text = f" ({comanda.nr_biguri})" if comanda.big and comanda.nr_biguri else ""
-    finisare_line1 = f"FINISARE: Big {big_checkbox}{nr_biguri_text}  Capsat {capsat_checkbox}  Colturi rotunde {colturi_checkbox}  Perfor {perfor_checkbox}"
-    finisare_line2 = f"{spiralare_checkbox} Spiralare  {stantare_checkbox} Stantare  {lipire_checkbox} Lipire {wobbler_checkbox} Codita wobbler"
+    finisare_line1 = (f"FINISARE: Big {_bifa(comanda.big)}{nr_biguri_text}  Capsat {_bifa(comanda.capsat)}  "
+                      f"Colturi rotunde {_bifa(comanda.colturi_rotunde)}  Perfor {_bifa(comanda.perfor)}")
+    finisare_line2 = (f"{_bifa(comanda.spiralare)} Spiralare  {_bifa(comanda.stantare)} Stantare  "
+                      f"{_bifa(comanda.lipire)} Lipire {_bifa(comanda.codita_wobbler)} Codita wobbler")
     
     # Laminare cu detalii
-    laminare_text = ""
     if comanda.laminare:
-        laminare_text = f"{laminare_checkbox} Laminare -> Format {comanda.format_laminare or ''} -> Nr. {comanda.numar_laminari or ''}"
+        laminare_text = f"{_bifa(comanda.laminare)} Laminare -> Format {comanda.format_laminare or ''} -> Nr. {comanda.numar_laminari or ''}"
     else:
-        laminare_text = f"{laminare_checkbox} Laminare -> Format _______ -> Nr. ___"
+        laminare_text = f"{_bifa(comanda.laminare)} Laminare -> Format _______ -> Nr. ___"
     
-    finisare_data = [
-        [finisare_line1],
-        [finisare_line2],
-        [laminare_text],
-        [f"{taiere_checkbox} Taiere Cutter Plotter"]
-    ]
-    finisare_table = Table(finisare_data, colWidths=[12.8*cm])
-    finisare_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 1.5),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 1.5),
-    ]))
-    story.append(finisare_table)
+    story.append(_caseta(
+        [
+            [finisare_line1],
+            [finisare_line2],
+            [laminare_text],
+            [f"{_bifa(comanda.taiere_cutter)} Taiere Cutter Plotter"]
+        ],
+        STIL_FINISARE
+    ))
     story.append(Spacer(1, 1.5*mm))
     
     # DETALII FINISARE și LIVRARE
-    detalii_data = [
-        [f"Detalii finisare: {comanda.detalii_finisare or ''}"],
-        [f"Livrare: {comanda.detalii_livrare or ''}"]
-    ]
-    detalii_table = Table(detalii_data, colWidths=[12.8*cm], rowHeights=[10*mm, 10*mm])
-    detalii_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-    story.append(detalii_table)
+    story.append(_caseta(
+        [
+            [f"Detalii finisare: {comanda.detalii_finisare or ''}"],
+            [f"Livrare: {comanda.detalii_livrare or ''}"]
+        ],
+        STIL_DETALII, rowHeights=[10*mm, 10*mm]
+    ))
+    
+    return story
+
+def genereaza_comanda_pdf(comanda, beneficiar, hartie):
+    """
+    Generează PDF pentru comandă exact conform formularului din comanda.pdf
+    """
+    # Creează buffer pentru PDF
+    buffer = io.BytesIO()
+    
+    # Configurare document - A5 format (148 x 210 mm)
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A5,
+        rightMargin=MARGINE_DREAPTA,
+        leftMargin=MARGINE_STANGA,
+        topMargin=MARGINE_SUS,
+        bottomMargin=MARGINE_JOS
+    )
     
     # Construire PDF
-    doc.build(story)
+    doc.build(continut_comanda(comanda, beneficiar, hartie))
     
     # Returnează buffer
     buffer.seek(0)
     return buffer
 
+def genereaza_comenzi_pdf(comenzi, doua_pe_a4=False):
+    """
+    Generează un singur PDF cu mai multe comenzi, într-un singur build ReportLab
+
+    Args:
+        comenzi: Listă de tuple (comanda, beneficiar, hartie)
+        doua_pe_a4: False - o comandă pe fiecare pagină A5;
+            True - câte două comenzi alăturate pe o pagină A4 landscape
+
+    Returns:
+        io.BytesIO: Buffer-ul PDF
+    """
+    buffer = io.BytesIO()
+    
+    if doua_pe_a4:
+        # A4 landscape = două pagini A5 portret alăturate, fiecare cu marginile comenzii
+        latime, inaltime = landscape(A4)
+        cadre = [
+            Frame(
+                x * latime / 2, 0, latime / 2, inaltime,
+                leftPadding=MARGINE_STANGA, rightPadding=MARGINE_DREAPTA,
+                topPadding=MARGINE_SUS, bottomPadding=MARGINE_JOS,
+                id=f"comanda_{x}"
+            )
+            for x in range(2)
+        ]
+        doc = BaseDocTemplate(buffer, pagesize=(latime, inaltime))
+        doc.addPageTemplates([PageTemplate(id="doua_a5", frames=cadre)])
+        separator = FrameBreak
+    else:
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A5,
+            rightMargin=MARGINE_DREAPTA,
+            leftMargin=MARGINE_STANGA,
+            topMargin=MARGINE_SUS,
+            bottomMargin=MARGINE_JOS
+        )
+        separator = PageBreak
+    
+    story = []
+    for index, (comanda, beneficiar, hartie) in enumerate(comenzi):
+        if index:
+            story.append(separator())
+        story.extend(continut_comanda(comanda, beneficiar, hartie))
+    
+    doc.build(story)
+    buffer.seek(0)
+    return buffer
+
+# Date simple (serializabile) pentru randare - folosite de procesele de randare și de cache
+# Câmpurile folosite de utils.pdf_utils.continut_comanda
+CAMPURI_COMANDA = (
+    "numar_comanda", "data", "echipament", "nume_lucrare", "po_client", "tiraj",
+    "descriere_lucrare", "latime", "inaltime", "nr_pagini", "greutate",
+    "certificare_fsc_produs", "cod_fsc_produs", "tip_certificare_fsc_produs",
+    "coala_tipar", "nr_culori", "nr_pagini_pe_coala", "nr_coli_tipar", "plastifiere",
+    "big", "nr_biguri", "capsat", "colturi_rotunde", "perfor", "spiralare", "stantare",
+    "lipire", "codita_wobbler", "laminare", "format_laminare", "numar_laminari",
+    "taiere_cutter", "detalii_finisare", "detalii_livrare",
+)
+CAMPURI_BENEFICIAR = ("nume",)
+CAMPURI_HARTIE = ("sortiment", "gramaj")
+
+
+def date_comanda(comanda, beneficiar=None, hartie=None):
+    """
+    Extrage dintr-o comandă ORM datele simple necesare randării
+
+    Returns:
+        dict: {"comanda": {...}, "beneficiar": {...}, "hartie": {...}}
+    """
+    beneficiar = beneficiar or comanda.beneficiar
+    hartie = hartie or comanda.hartie
+    return {
+        "comanda": {camp: getattr(comanda, camp) for camp in CAMPURI_COMANDA},
+        "beneficiar": {camp: getattr(beneficiar, camp) for camp in CAMPURI_BENEFICIAR},
+        "hartie": {camp: getattr(hartie, camp) for camp in CAMPURI_HARTIE},
+    }
+
+
+def nume_fisier_comanda(date):
+    """Numele fișierului PDF al unei comenzi (din datele simple)"""
+    comanda = date["comanda"]
+    return f"comanda_{int(comanda['numar_comanda'])}_{comanda['data'].strftime('%Y%m%d')}.pdf"
+
+
+def obiecte_comanda(date):
+    """Obiecte simple cu atributele așteptate de `continut_comanda`, din datele simple"""
+    return (
+        SimpleNamespace(**date["comanda"]),
+        SimpleNamespace(**date["beneficiar"]),
+        SimpleNamespace(**date["hartie"]),
+    )
+
+
 def adauga_buton_export_pdf(comanda, beneficiar, hartie):
     """
     Adaugă buton de export PDF în Streamlit pentru o comandă
@@ -317,12 +375,13 @@ def export_comanda_pdf_button(session, comanda_id):
     Funcție helper pentru butonul de export în pagina de comenzi
     """
     import streamlit as st
-    from models.comenzi import Comanda
+    from sqlalchemy.orm import undefer_group
+    from models.comenzi import Comanda, GRUP_TEXTE
     from models.beneficiari import Beneficiar
     from models.hartie import Hartie
     
     try:
-        comanda = session.query(Comanda).get(comanda_id)
+        comanda = session.query(Comanda).options(undefer_group(GRUP_TEXTE)).get(comanda_id)
         beneficiar = session.query(Beneficiar).get(comanda.beneficiar_id)
         hartie = session.query(Hartie).get(comanda.hartie_id)
         